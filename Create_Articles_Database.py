@@ -2,11 +2,15 @@
 Database Setup Script - Creates the database and tables
 """
 import sqlite3
+from published_at import backfill
 
 # Connect to database (creates it if it doesn't exist)
 conn = sqlite3.connect('articles.db')
 cursor = conn.cursor()
 
+# WAL journal lets readers (exports, read API) run alongside the scraper's writes
+cursor.execute("PRAGMA journal_mode=WAL")
+
 cursor.execute('''
     CREATE TABLE IF NOT EXISTS ARTICLES (
         Domain TEXT,
@@ -16,10 +20,47 @@ cursor.execute('''
         Date TEXT,
         Title TEXT,
         Content TEXT,
+        ContentHash TEXT,
+        FirstSeen REAL,
+        LastChecked REAL,
+        LastChanged REAL,
+        CheckCount INTEGER DEFAULT 0,
+        ChangeCount INTEGER DEFAULT 0,
+        NextCheck REAL,
+        PublishedAt INTEGER,
         PRIMARY KEY (Domain, URL)
     )
 ''')
 
+# Recrawl and publication timestamp columns (recrawl_scheduler.py, published_at.py) for older databases
+existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(ARTICLES)")}
+for column, declared in [('ContentHash', 'TEXT'), ('FirstSeen', 'REAL'), ('LastChecked', 'REAL'),
+                         ('LastChanged', 'REAL'), ('CheckCount', 'INTEGER DEFAULT 0'),
+                         ('ChangeCount', 'INTEGER DEFAULT 0'), ('NextCheck', 'REAL'), ('PublishedAt', 'INTEGER')]:
+    if column not in existing_columns:
+        cursor.execute(f"ALTER TABLE ARTICLES ADD COLUMN {column} {declared}")
+
+# Newest-first pages per domain (read_api.py): index entries are ordered by (Domain, rowid)
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_domain ON ARTICLES (Domain)")
+
+# Articles due for a recrawl, most overdue first (recrawl_scheduler.py)
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_next_check ON ARTICLES (NextCheck)")
+conn.commit()
+
+# Parse PublishedAt for rows stored before the column existed (chunked, before the indexes are built)
+backfill('articles.db')
+
+# Latest N per domain / all articles in a time window (read_api.py order=published, since, until).
+# Both carry the summary columns, so those reads never touch the table rows.
+cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_articles_domain_published
+    ON ARTICLES (Domain, PublishedAt, URL, Author, Date, Time, Title)
+''')
+cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_articles_published
+    ON ARTICLES (PublishedAt, Domain, URL, Author, Date, Time, Title)
+''')
+
 print("XPATHS table created successfully!")
 
 # Second table will be added here later
@@ -0,0 +1,29 @@
+"""
+Database Setup Script - Creates the FEEDS table used by feed_discovery.py
+"""
+import sqlite3
+
+# Connect to database (creates it if it doesn't exist)
+conn = sqlite3.connect('articles.db')
+cursor = conn.cursor()
+
+# One row per sitemap / RSS / Atom feed, with its polling high-water marks
+cursor.execute('''
+    CREATE TABLE IF NOT EXISTS FEEDS (
+        FeedURL TEXT PRIMARY KEY,
+        Domain TEXT,
+        HighWaterMark TEXT,
+        SeenGUIDs TEXT,
+        ETag TEXT,
+        HTTPLastModified TEXT,
+        LastPolled TIMESTAMP
+    )
+''')
+
+print("FEEDS table created successfully!")
+
+# Commit changes and close connection
+conn.commit()
+conn.close()
+
+print("Database setup complete!")
@@ -0,0 +1,35 @@
+"""
+Database Setup Script - Creates the LLM_USAGE ledger table used by llm_ledger.py
+One append-only row per LLM call
+"""
+import sqlite3
+
+# Connect to database (creates it if it doesn't exist)
+conn = sqlite3.connect('articles.db')
+cursor = conn.cursor()
+
+cursor.execute('''
+    CREATE TABLE IF NOT EXISTS LLM_USAGE (
+        CalledAt TIMESTAMP,
+        Domain TEXT,
+        URL TEXT,
+        CallType TEXT,
+        Model TEXT,
+        PromptTokens INTEGER,
+        CompletionTokens INTEGER,
+        LatencyMs INTEGER,
+        Success INTEGER
+    )
+''')
+
+# Aggregates are per domain or per time range
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_domain ON LLM_USAGE (Domain)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_called_at ON LLM_USAGE (CalledAt)")
+
+print("LLM_USAGE table created successfully!")
+
+# Commit changes and close connection
+conn.commit()
+conn.close()
+
+print("Database setup complete!")
@@ -0,0 +1,26 @@
+"""
+Database Setup Script - Creates the REPAIR_QUEUE table
+URLs whose per-URL budget ran out before every field was extracted wait here for a repair run
+"""
+import sqlite3
+
+# Connect to database (creates it if it doesn't exist)
+conn = sqlite3.connect('articles.db')
+cursor = conn.cursor()
+
+cursor.execute('''
+    CREATE TABLE IF NOT EXISTS REPAIR_QUEUE (
+        URL TEXT PRIMARY KEY,
+        Domain TEXT,
+        FailedFields TEXT,
+        QueuedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+''')
+
+print("REPAIR_QUEUE table created successfully!")
+
+# Commit changes and close connection
+conn.commit()
+conn.close()
+
+print("Database setup complete!")
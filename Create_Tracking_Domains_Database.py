@@ -16,11 +16,21 @@ cursor.execute('''
         DateXPath TEXT,
         TimeXPath TEXT,
         ContentXPath TEXT,
-        LastUpdated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        LastUpdated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        TemplateFingerprint TEXT,
+        RelearningSince REAL,
+        Encoding TEXT
     )
 ''')
 conn.commit()
 
+# Template-change detection (template_fingerprint.py) and page encoding columns for databases created before them
+existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(TRACKING_DOMAINS)")}
+for column, declared in [('TemplateFingerprint', 'TEXT'), ('RelearningSince', 'REAL'), ('Encoding', 'TEXT')]:
+    if column not in existing_columns:
+        cursor.execute(f"ALTER TABLE TRACKING_DOMAINS ADD COLUMN {column} {declared}")
+conn.commit()
+
 print("XPATHS table created successfully!")
 
 # Second table will be added here later
@@ -6,6 +6,14 @@ import os
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
+# Token usage of the most recent call, read by main_scraper.py for the LLM_USAGE ledger
+last_usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+
+def remember_usage(response_ai):
+    usage = getattr(response_ai, 'usage', None)
+    last_usage['prompt_tokens'] = getattr(usage, 'prompt_tokens', 0) or 0
+    last_usage['completion_tokens'] = getattr(usage, 'completion_tokens', 0) or 0
+
 SYSTEM_PROMPT = """
 Analyze this HTML structure and generate the XPATH selectors,
 
@@ -42,10 +50,7 @@ Return ONLY the JSON object, nothing else."""
 
 def generate_initial_xpaths(cleaned_html, client):
 
-    # Initialize OpenAI client
-    # ===========================
-
-    client = OpenAI(api_key=api_key)
+    # Uses the caller's OpenAI client (and its timeout settings)
     user_prompt = cleaned_html
     #FEED THE PAGE INTO THE LLM AND GET NEW XPATH
 
@@ -57,6 +62,7 @@ def generate_initial_xpaths(cleaned_html, client):
         ],
         temperature=0.3
     )
+    remember_usage(response_ai)
     # Get the response content
     ai_response = response_ai.choices[0].message.content.strip()
     print("OpenAI Response:")
@@ -140,6 +146,7 @@ def retry_failed_xpaths(failed_fields, feedback, current_xpaths, cleaned_html, c
         ],
         temperature=0.3
     )
+    remember_usage(response_ai)
 
     ai_response = response_ai.choices[0].message.content.strip()
     # print("OpenAI Correction Response:")
@@ -216,6 +223,7 @@ def direct_llm_extraction(failed_fields, feedback, cleaned_html, client):
         ],
         temperature=0.3
     )
+    remember_usage(response_ai)
     
     ai_response = response_ai.choices[0].message.content.strip()
     # print("LLM Direct Extraction Response:")
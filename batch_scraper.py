@@ -1,158 +1,336 @@
 import subprocess
 import sys
+import os
+import gzip
+import json
+import tempfile
 import time
+from collections import deque
 from datetime import datetime
+from itertools import chain
 import argparse
+import sqlite3
+from domain_scheduler import schedule_stream
+from profiler import ProfileAggregator
+from field_validator import FIELDS
+from result_stream import ResultStream, STREAM_BUFFER
 
 
-def read_urls_from_file(file_path):
+MAX_DEFERRALS = 3          # times a URL is pushed back while its domain's template is relearned
+DEFER_WAIT_SECONDS = 10    # pause before re-running a deferred URL
+KILL_SECONDS = 300         # scraper process kill without --url-deadline (stage timeouts normally end it first)
+SCHEDULE_WINDOW = 1000     # URLs held in memory for scheduling by domain (the rest of a domain waits on disk)
+MAX_FAILED_SHOWN = 50      # failed URLs repeated in the end-of-batch summary (all are in the log)
+
+
+def iter_urls(source):
     """
-    Read URLs from a text file (one URL per line).
+    Stream URLs from a text file, a gzip file (.gz) or stdin ('-'), one URL per line.
+    Lines are read as they are needed, so any size of input runs in constant memory.
+    """
+    if source == '-':
+        f = sys.stdin
+    elif source.endswith('.gz'):
+        f = gzip.open(source, 'rt', encoding='utf-8')
+    else:
+        f = open(source, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            url = line.strip()
+            # Skip empty lines and comments
+            if url and not url.startswith('#'):
+                yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def drain(queue):
+    """Yield from a deque until it is empty, including items appended while iterating."""
+    while queue:
+        yield queue.popleft()
+
+
+def read_repair_queue(db_path='articles.db'):
+    """URLs stored with partial results because their budget ran out (oldest first)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT URL FROM REPAIR_QUEUE ORDER BY QueuedAt")]
+    finally:
+        conn.close()
+
+
+def read_run_result(result_file):
+    """Read (and remove) the JSON result main_scraper.py writes to SCRAPER_RESULT_FILE."""
+    try:
+        with open(result_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+    finally:
+        if os.path.exists(result_file):
+            os.remove(result_file)
+
+
+def parse_fields(value):
+    """Comma-separated field subset for --fields, e.g. 'title,date,time'."""
+    fields = [field.strip().lower() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELDS]
+    if not fields or unknown:
+        raise argparse.ArgumentTypeError(f"fields must be a comma-separated subset of {','.join(FIELDS)}, got '{value}'")
+    return fields
+
+
+def scrape_url(url, scraper_script="main_scraper.py", env=None, timeout=60, fields=None):
+    """
+    Run main_scraper.py for a single URL.
     
     Args:
-        file_path (str): Path to the text file
+        url (str): Article URL
+        scraper_script (str): Path to main_scraper.py
+        env (dict): Environment for the scraper process (default: current environment)
+        timeout (int): Seconds before the scraper process is killed
+        fields (list): Only scrape these fields, the others are left as stored (default: all fields)
     
     Returns:
-        list: List of URLs (empty lines and comments are filtered out)
+        tuple: (success, error, run_result) - run_result is the JSON main_scraper.py reported
     """
-    urls = []
+    env = dict(env if env is not None else os.environ)
+    fd, result_file = tempfile.mkstemp(prefix='scrape_result_', suffix='.json')
+    os.close(fd)
+    env['SCRAPER_RESULT_FILE'] = result_file
+    if fields:
+        env['SCRAPE_FIELDS'] = ','.join(fields)
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                url = line.strip()
-                # Skip empty lines and comments
-                if url and not url.startswith('#'):
-                    urls.append(url)
-        
-        return urls
-    
-    except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found!")
-        sys.exit(1)
+        # Call main_scraper.py with URL piped to stdin
+        result = subprocess.run(
+            ['python3', scraper_script],
+            input=url + '\n',
+            text=True,
+            capture_output=False,  # Show output in real-time
+            timeout=timeout,
+            env=env
+        )
+    except subprocess.TimeoutExpired:
+        read_run_result(result_file)
+        return False, f'Timeout ({timeout}s)', {}
     except Exception as e:
-        print(f"Error reading file: {str(e)}")
-        sys.exit(1)
+        read_run_result(result_file)
+        return False, str(e), {}
+    
+    run_result = read_run_result(result_file)
+    if result.returncode == 0:
+        return True, None, run_result
+    
+    reason = f" ({run_result['status']})" if run_result.get('status') else ""
+    if run_result.get('timed_out_stage'):
+        reason = f" (timeout in stage '{run_result['timed_out_stage']}')"
+    return False, f'Script exited with code {result.returncode}{reason}', run_result
 
 
-def batch_scrape(input_file, scraper_script="main_scraper.py", delay=2, log_file=None):
+def batch_scrape(input_file=None, scraper_script="main_scraper.py", delay=2, log_file=None, memory_budget=0,
+                 urls=None, schedule=True, url_deadline=0, llm_budget=0, profile_dir=None, profile_top=10,
+                 window=SCHEDULE_WINDOW, fields=None, stream=None):
     """
     Scrape multiple URLs by calling main_scraper.py for each URL.
+    URLs are consumed as a stream and results are logged as they finish, so memory stays
+    constant however long the input is.
     
     Args:
-        input_file (str): Path to file containing URLs
+        input_file (str): Path to file containing URLs (.gz files and '-' for stdin work too)
         scraper_script (str): Path to main_scraper.py
         delay (int): Delay in seconds between requests
-        log_file (str): Optional path to log file for results
+        log_file (str): Optional path to log file for results, written incrementally
+        memory_budget (int): Per-worker memory budget in MB, enables low-memory mode (0 = unlimited)
+        urls (iterable): URLs to scrape instead of reading input_file (e.g. from feed_discovery.py)
+        schedule (bool): Interleave URLs by domain, learned domains first (False keeps file order)
+        url_deadline (float): Per-URL deadline in seconds, checked between pipeline stages (0 = none)
+        llm_budget (int): Max LLM calls per URL (0 = no limit)
+        profile_dir (str): Sample every run and write the merged profile here (None = no profiling)
+        profile_top (int): Number of slowest URLs listed in the profile report
+        window (int): URLs held in memory for scheduling by domain
+        fields (list): Field subset to scrape, e.g. ['title', 'date', 'time'] (default: all fields)
+        stream (ResultStream): Publish every stored article here as soon as its URL finishes
     """
     
-    # Read URLs
-    urls = read_urls_from_file(input_file)
-    total_urls = len(urls)
-    
-    if total_urls == 0:
-        print("No URLs found in the file!")
-        return
+    # Stream URLs (a list passed in also gives the total for progress output)
+    total_urls = len(urls) if hasattr(urls, '__len__') else None
+    if urls is None:
+        if input_file != '-' and not os.path.exists(input_file):
+            print(f"Error: File '{input_file}' not found!")
+            sys.exit(1)
+        urls = iter_urls(input_file)
     
     print(f"\n{'='*60}")
     print(f"BATCH SCRAPER")
     print(f"{'='*60}")
-    print(f"Total URLs to process: {total_urls}")
+    print(f"Input: {f'{total_urls} URLs' if total_urls is not None else ('stdin' if input_file == '-' else input_file)}")
     print(f"Scraper script: {scraper_script}")
     print(f"Delay between requests: {delay}s")
+    if schedule:
+        print(f"Scheduling: by domain, up to {window} URLs held in memory")
+        urls = schedule_stream(urls, window=window)
+    if memory_budget:
+        print(f"Memory budget per worker: {memory_budget} MB (low-memory mode)")
+    if url_deadline or llm_budget:
+        print(f"Per-URL budget: {url_deadline or 'no'} s deadline, {llm_budget or 'unlimited'} LLM calls")
+    if profile_dir:
+        print(f"Profiling: on, report in {profile_dir}")
+    if fields:
+        print(f"Fields: {', '.join(fields)} (other stored fields left untouched)")
+    if stream:
+        print(f"Streaming articles to: {stream.target}")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
     
-    # Track results
-    successful = []
-    failed = []
+    # Track results (counts only, every URL goes to the log as it finishes)
+    counts = {'successful': 0, 'failed': 0}
+    failed_shown = []
+    rss_stats = {'peak': 0.0, 'total': 0.0, 'count': 0}
+    profiles = ProfileAggregator(top_n=profile_top) if profile_dir else None
+    deferred = deque()
+    deferrals = {}
+    log = ResultLog(log_file) if log_file else None
+
+    # Worker environment (memory and per-URL budgets)
+    env = dict(os.environ)
+    if memory_budget:
+        env['MEMORY_BUDGET_MB'] = str(memory_budget)
+    env['URL_DEADLINE_SECONDS'] = str(url_deadline)
+    env['MAX_LLM_CALLS_PER_URL'] = str(llm_budget)
+    if profile_dir:
+        env['SCRAPER_PROFILE'] = '1'
+    # The process kill is only a safety net behind the in-pipeline deadline and stage timeouts
+    timeout = int(url_deadline) + 30 if url_deadline else KILL_SECONDS
     
-    # Process each URL
-    for idx, url in enumerate(urls, 1):
+    # Process each URL (deferred URLs are retried after the input is exhausted)
+    idx = 0
+    for url in chain(urls, drain(deferred)):
+        if idx and delay:
+            print(f"\nWaiting {delay}s before next request...")
+            time.sleep(delay)
+        idx += 1
+        progress = f"[{idx}/{total_urls}]" if total_urls is not None else f"[{idx}]"
         print(f"\n{'='*60}")
-        print(f"[{idx}/{total_urls}] Processing: {url}")
+        print(f"{progress} Processing: {url}")
         print(f"{'='*60}")
         
-        try:
-            # Call main_scraper.py with URL piped to stdin
-            result = subprocess.run(
-                ['python3', scraper_script],
-                input=url + '\n',
-                text=True,
-                capture_output=False,  # Show output in real-time
-                timeout=60  # 60 second timeout per URL
-            )
-            
-            if result.returncode == 0:
-                successful.append(url)
-                print(f"\n[{idx}/{total_urls}] Successfully processed!")
-            else:
-                failed.append({'url': url, 'error': f'Script exited with code {result.returncode}'})
-                print(f"\n[{idx}/{total_urls}] Failed with exit code {result.returncode}")
+        if deferrals.get(url):
+            time.sleep(DEFER_WAIT_SECONDS)
         
-        except subprocess.TimeoutExpired:
-            failed.append({'url': url, 'error': 'Timeout (60s)'})
-            print(f"\n[{idx}/{total_urls}] Timeout - took longer than 60 seconds")
+        success, error, run_result = scrape_url(url, scraper_script=scraper_script, env=env, timeout=timeout,
+                                                fields=fields)
         
-        except Exception as e:
-            failed.append({'url': url, 'error': str(e)})
-            print(f"\n[{idx}/{total_urls}] Error: {str(e)}")
+        # Another run is relearning this domain's redesigned template, try again later
+        if run_result.get('status') == 'deferred' and deferrals.get(url, 0) < MAX_DEFERRALS:
+            deferrals[url] = deferrals.get(url, 0) + 1
+            deferred.append(url)
+            print(f"\n{progress} Deferred: template of '{run_result.get('domain')}' is being relearned")
+            continue
+        deferrals.pop(url, None)
         
-        # Add delay between requests (except for last one)
-        if idx < total_urls:
-            print(f"\nWaiting {delay}s before next request...")
-            time.sleep(delay)
+        if run_result.get('peak_rss_mb'):
+            rss_stats['peak'] = max(rss_stats['peak'], run_result['peak_rss_mb'])
+            rss_stats['total'] += run_result['peak_rss_mb']
+            rss_stats['count'] += 1
+        
+        if profiles and run_result.get('profile'):
+            profiles.add(url, run_result['profile'])
+        
+        if log:
+            log.write(url, error if not success else None)
+        
+        if success:
+            counts['successful'] += 1
+            # Published before anything else, blocks while a slow consumer's buffer is full
+            if stream and run_result.get('article'):
+                stream.publish(run_result['article'])
+            if run_result.get('status') == 'unchanged':
+                print(f"\n{progress} Unchanged since the last scrape, nothing rewritten")
+            elif run_result.get('client_rendered'):
+                print(f"\n{progress} Client-rendered page, stored fields from embedded JSON (no LLM)")
+            elif run_result.get('timed_out_stage'):
+                queued = ", queued for repair" if run_result.get('queued_for_repair') else ""
+                print(f"\n{progress} Processed after timeout in stage '{run_result['timed_out_stage']}'{queued}")
+            elif run_result.get('llm_error'):
+                queued = ", queued for repair" if run_result.get('queued_for_repair') else ""
+                print(f"\n{progress} Processed after LLM error ({run_result['llm_error']}){queued}")
+            elif run_result.get('queued_for_repair'):
+                print(f"\n{progress} Partially processed (budget exhausted), queued for repair")
+            else:
+                print(f"\n{progress} Successfully processed!")
+        else:
+            counts['failed'] += 1
+            if len(failed_shown) < MAX_FAILED_SHOWN:
+                failed_shown.append({'url': url, 'error': error})
+            print(f"\n{progress} Failed: {error}")
+    
+    processed = counts['successful'] + counts['failed']
+    if processed == 0:
+        print("No URLs found in the input!")
+        if log:
+            log.close(counts, rss_stats)
+        return
     
     # Print summary
     print(f"\n{'='*60}")
     print(f"BATCH SCRAPING COMPLETED")
     print(f"{'='*60}")
-    print(f"Total URLs processed: {total_urls}")
-    print(f"✓ Successful: {len(successful)}")
-    print(f"✗ Failed: {len(failed)}")
-    print(f"Success rate: {(len(successful)/total_urls*100):.1f}%")
+    print(f"Total URLs processed: {processed}")
+    print(f"✓ Successful: {counts['successful']}")
+    print(f"✗ Failed: {counts['failed']}")
+    print(f"Success rate: {(counts['successful']/processed*100):.1f}%")
+    if rss_stats['count']:
+        print(f"Worker memory (RSS): peak {rss_stats['peak']:.1f} MB, "
+              f"average {rss_stats['total']/rss_stats['count']:.1f} MB")
     print(f"Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
     
     # Show failed URLs if any
-    if failed:
+    if failed_shown:
         print("\nFailed URLs:")
-        for fail in failed:
+        for fail in failed_shown:
             print(f"{fail['url']}")
             print(f"Error: {fail['error']}\n")
+        if counts['failed'] > len(failed_shown):
+            print(f"... and {counts['failed'] - len(failed_shown)} more" + (f" (see {log_file})" if log_file else ""))
+    
+    if log:
+        log.close(counts, rss_stats)
     
-    # Write log file if specified
-    if log_file:
-        write_log(successful, failed, log_file, total_urls)
+    if profiles:
+        profiles.write(profile_dir)
 
 
-def write_log(successful, failed, log_file, total_urls):
-    """Write scraping results to a log file."""
-    try:
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write(f"Batch Scraping Log\n")
-            f.write(f"{'='*60}\n")
-            f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total URLs: {total_urls}\n")
-            f.write(f"Successful: {len(successful)}\n")
-            f.write(f"Failed: {len(failed)}\n")
-            f.write(f"{'='*60}\n\n")
-            
-            f.write(f"SUCCESSFUL ({len(successful)})\n")
-            f.write(f"{'-'*60}\n")
-            for url in successful:
-                f.write(f"{url}\n")
-            
-            f.write(f"\n\nFAILED ({len(failed)})\n")
-            f.write(f"{'-'*60}\n")
-            for fail in failed:
-                f.write(f"URL: {fail['url']}\n")
-                f.write(f"Error: {fail['error']}\n\n")
-        
-        print(f"✓ Log file saved: {log_file}")
-    
-    except Exception as e:
-        print(f"✗ Could not write log file: {str(e)}")
+class ResultLog:
+    """Batch log written line by line as URLs finish, with the totals appended at the end."""
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.file = open(log_file, 'w', encoding='utf-8', buffering=1)
+        self.file.write(f"Batch Scraping Log\n")
+        self.file.write(f"{'='*60}\n")
+        self.file.write(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.file.write(f"{'='*60}\n\n")
+
+    def write(self, url, error=None):
+        if error is None:
+            self.file.write(f"SUCCESS\t{url}\n")
+        else:
+            self.file.write(f"FAILED\t{url}\t{error}\n")
+
+    def close(self, counts, rss_stats=None):
+        self.file.write(f"\n{'='*60}\n")
+        self.file.write(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.file.write(f"Total URLs: {counts['successful'] + counts['failed']}\n")
+        self.file.write(f"Successful: {counts['successful']}\n")
+        self.file.write(f"Failed: {counts['failed']}\n")
+        if rss_stats and rss_stats['count']:
+            self.file.write(f"Peak worker RSS: {rss_stats['peak']:.1f} MB\n")
+            self.file.write(f"Average worker RSS: {rss_stats['total']/rss_stats['count']:.1f} MB\n")
+        self.file.close()
+        print(f"✓ Log file saved: {self.log_file}")
 
 
 if __name__ == "__main__":
@@ -165,6 +343,18 @@ Examples:
   python batch_scraper.py urls.txt --delay 3
   python batch_scraper.py urls.txt --scraper /path/to/main_scraper.py --delay 5
   python batch_scraper.py urls.txt --delay 3 --log results.log
+  python batch_scraper.py urls.txt --memory-budget 256
+  python batch_scraper.py --discover   (scrape new items from tracked sitemaps / RSS feeds)
+  python batch_scraper.py urls.txt --file-order   (no domain scheduling)
+  python batch_scraper.py urls.txt --url-deadline 30 --llm-budget 2
+  python batch_scraper.py --repair     (re-scrape URLs stored with partial results, no budget)
+  python batch_scraper.py --recrawl 200  (revisit the 200 most overdue stored articles)
+  python batch_scraper.py urls.txt --fields title,date,time   (headline monitoring, no content)
+  python batch_scraper.py urls.txt --stream - | indexer      (stored articles as NDJSON on stdout)
+  python batch_scraper.py urls.txt --stream unix:/run/alerts.sock
+  python batch_scraper.py urls.txt --profile profile/ --profile-top 20
+  python batch_scraper.py backfill.txt.gz --log backfill.log   (streamed, constant memory)
+  feed_discovery.py --poll | python batch_scraper.py -        (URLs from stdin)
   
 Input file format (urls.txt):
   https://example.com/article1
@@ -176,7 +366,8 @@ Input file format (urls.txt):
     
     parser.add_argument(
         'input_file',
-        help='Path to text file containing URLs (one per line)'
+        nargs='?',
+        help='Path to text file containing URLs (one per line), a .gz file, or - for stdin'
     )
     
     parser.add_argument(
@@ -199,7 +390,127 @@ Input file format (urls.txt):
         help='Path to log file for results (optional)'
     )
     
+    parser.add_argument(
+        '--memory-budget',
+        type=int,
+        default=0,
+        help='Per-worker memory budget in MB; enables low-memory page processing (default: 0 = unlimited)'
+    )
+    
+    parser.add_argument(
+        '--discover',
+        action='store_true',
+        help='Scrape new URLs from the sitemaps / RSS feeds stored in FEEDS (see feed_discovery.py)'
+    )
+    
+    parser.add_argument(
+        '--file-order',
+        action='store_true',
+        help='Process URLs in file order instead of interleaving them by domain'
+    )
+    
+    parser.add_argument(
+        '--url-deadline',
+        type=float,
+        default=0,
+        help='Per-URL deadline in seconds; later LLM stages are skipped when it is close (default: none)'
+    )
+    
+    parser.add_argument(
+        '--llm-budget',
+        type=int,
+        default=0,
+        help='Max LLM calls per URL (default: unlimited)'
+    )
+    
+    parser.add_argument(
+        '--repair',
+        action='store_true',
+        help='Re-scrape URLs from REPAIR_QUEUE (partial results left by an exhausted budget)'
+    )
+    
+    parser.add_argument(
+        '--recrawl',
+        type=int,
+        metavar='N',
+        help='Revisit up to N stored articles whose adaptive recrawl time has passed'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        type=str,
+        metavar='DIR',
+        help='Sample every run and write stacks.folded, functions.txt, stages.txt and slowest_urls.txt to DIR'
+    )
+    
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=10,
+        help='Number of slowest URLs listed with --profile (default: 10)'
+    )
+    
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=SCHEDULE_WINDOW,
+        help=f'URLs held in memory for scheduling by domain (default: {SCHEDULE_WINDOW})'
+    )
+    
+    parser.add_argument(
+        '--fields',
+        type=parse_fields,
+        help=f"Only scrape these fields (comma-separated subset of {','.join(FIELDS)}); the others stay as stored"
+    )
+    
+    parser.add_argument(
+        '--stream',
+        type=str,
+        metavar='TARGET',
+        help='Also publish stored articles as NDJSON to - (stdout), unix:/path.sock or a file (see result_stream.py)'
+    )
+    
+    parser.add_argument(
+        '--stream-buffer',
+        type=int,
+        default=STREAM_BUFFER,
+        help=f'Articles buffered for a slow stream consumer before the batch waits (default: {STREAM_BUFFER})'
+    )
+    
     args = parser.parse_args()
     
+    if not args.input_file and not args.discover and not args.repair and not args.recrawl:
+        parser.error('an input file, --discover, --repair or --recrawl is required')
+    
+    # Opened first, so with --stream - no progress output reaches stdout
+    stream = None
+    if args.stream:
+        try:
+            stream = ResultStream(args.stream, buffer=args.stream_buffer)
+        except OSError as e:
+            print(f"Error: cannot open result stream '{args.stream}': {e}")
+            sys.exit(1)
+    
+    urls = None
+    if args.discover:
+        from feed_discovery import poll_feeds
+        urls = poll_feeds()
+        if args.input_file:
+            urls = chain(iter_urls(args.input_file), urls)
+    if args.repair:
+        urls = chain(urls or (iter_urls(args.input_file) if args.input_file else []), read_repair_queue())
+    if args.recrawl:
+        from recrawl_scheduler import due_urls
+        urls = chain(urls or (iter_urls(args.input_file) if args.input_file else []), due_urls(limit=args.recrawl))
+    
     # Run batch scraper
-    batch_scrape(args.input_file, scraper_script=args.scraper, delay=args.delay, log_file=args.log)
\ No newline at end of file
+    try:
+        batch_scrape(args.input_file, scraper_script=args.scraper, delay=args.delay, log_file=args.log,
+                     memory_budget=args.memory_budget, urls=urls, schedule=not args.file_order,
+                     url_deadline=args.url_deadline, llm_budget=args.llm_budget,
+                     profile_dir=args.profile, profile_top=args.profile_top, window=args.window,
+                     fields=args.fields, stream=stream)
+    finally:
+        if stream:
+            stream.close()
+            print(f"✓ {stream.summary()}")
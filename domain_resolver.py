@@ -0,0 +1,92 @@
+"""
+Offline, memoized domain resolution
+Every component that keys data by domain (TRACKING_DOMAINS, ARTICLES, the batch scheduler,
+the job queue) resolves it here. The Public Suffix List comes from a local snapshot and is
+never fetched during a run:
+    - suffix_snapshot.dat in this directory, written by `python domain_resolver.py --refresh`
+    - otherwise the snapshot bundled with the tldextract package
+Lookups are memoized per host, so each host is resolved once per process.
+
+DOMAIN_KEY (.env) picks the key stored in the database:
+    domain       - registrable label without suffix, e.g. 'indianexpress' (default, the historic key)
+    registrable  - registrable domain, e.g. 'indianexpress.com' or 'bbc.co.uk'
+    host         - full host name, e.g. 'epaper.indianexpress.com'
+"""
+
+import argparse
+import os
+import sys
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import tldextract
+
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'suffix_snapshot.dat')
+PUBLIC_SUFFIX_LIST_URL = 'https://publicsuffix.org/list/public_suffix_list.dat'
+DOMAIN_KEYS = ('domain', 'registrable', 'host')
+DOMAIN_KEY = os.getenv("DOMAIN_KEY", "domain")
+
+
+@lru_cache(maxsize=1)
+def suffix_extractor():
+    """tldextract instance that reads the local snapshot and never touches the network or a cache dir."""
+    if os.path.exists(SNAPSHOT_FILE):
+        return tldextract.TLDExtract(
+            suffix_list_urls=(f"file://{SNAPSHOT_FILE}",), cache_dir=None, fallback_to_snapshot=True
+        )
+    return tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None, fallback_to_snapshot=True)
+
+
+@lru_cache(maxsize=65536)
+def resolve_host(host, key=DOMAIN_KEY):
+    """Domain key for a host name (memoized)."""
+    if key == 'host':
+        return host
+    extracted = suffix_extractor()(host)
+    if key == 'registrable':
+        return ".".join(part for part in (extracted.domain, extracted.suffix) if part) or host
+    return extracted.domain or host
+
+
+def resolve_domain(url, key=DOMAIN_KEY):
+    """Domain key for a URL, see DOMAIN_KEY."""
+    if key not in DOMAIN_KEYS:
+        raise ValueError(f"DOMAIN_KEY must be one of {DOMAIN_KEYS}, got '{key}'")
+    host = (urlsplit(url if '//' in url else f"//{url}").hostname or "").rstrip('.')
+    return resolve_host(host, key)
+
+
+def refresh_snapshot(url=PUBLIC_SUFFIX_LIST_URL):
+    """Download the current Public Suffix List into suffix_snapshot.dat (explicit, never automatic)."""
+    import requests
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    if '// ===BEGIN ICANN DOMAINS===' not in response.text:
+        raise ValueError("Downloaded file does not look like the Public Suffix List")
+    tmp_file = SNAPSHOT_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    os.replace(tmp_file, SNAPSHOT_FILE)
+    suffix_extractor.cache_clear()
+    resolve_host.cache_clear()
+    return len(response.text.splitlines())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Offline domain resolution (Public Suffix List snapshot)')
+    parser.add_argument('--refresh', action='store_true', help=f'Download the Public Suffix List to {SNAPSHOT_FILE}')
+    parser.add_argument('--key', choices=DOMAIN_KEYS, default=DOMAIN_KEY, help=f'Domain key (default: {DOMAIN_KEY})')
+    parser.add_argument('urls', nargs='*', help='URLs to resolve')
+    args = parser.parse_args()
+
+    if args.refresh:
+        try:
+            lines = refresh_snapshot()
+        except Exception as e:
+            print(f"Error: could not refresh the suffix snapshot: {e}")
+            sys.exit(1)
+        print(f"Suffix snapshot updated ({lines} lines): {SNAPSHOT_FILE}")
+
+    for url in args.urls:
+        print(f"{resolve_domain(url, args.key)}\t{url}")
@@ -0,0 +1,171 @@
+"""
+Domain-aware batch scheduling
+Groups input URLs by domain and interleaves them so one large publisher cannot stall the batch.
+
+Order produced by schedule_urls():
+    - Domains are served round-robin, one URL per domain per round
+    - Domains already in TRACKING_DOMAINS (XPaths learned) come first in every round,
+      smallest backlog first, so they complete fastest
+    - A new domain contributes a single pioneer URL in the first round; its pioneer learns the
+      XPaths before any other URL of that domain runs, and the rest then fans out
+
+schedule_stream() applies the same order to a stream of URLs in bounded memory: every domain keeps
+a few URLs in memory and its further URLs wait in a temporary SQLite file, so input sorted by
+domain still comes out interleaved.
+"""
+
+import sqlite3
+from collections import deque
+
+from domain_resolver import resolve_domain
+
+
+def url_domain(url):
+    """Domain key, the same one main_scraper.py stores XPaths under."""
+    return resolve_domain(url)
+
+
+def load_known_domains(db_path='articles.db'):
+    """Domains that already have learned XPaths (empty if the database is not set up yet)."""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            return {row[0] for row in conn.execute("SELECT Domain FROM TRACKING_DOMAINS")}
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return set()
+
+
+def schedule_urls(urls, known_domains):
+    """
+    Reorder URLs for cache locality and fairness.
+
+    Args:
+        urls (iterable): URLs in input order
+        known_domains (set): Domains with learned XPaths
+
+    Yields:
+        str: URLs in scheduled order
+    """
+    groups = {}
+    for url in urls:
+        groups.setdefault(url_domain(url), deque()).append(url)
+
+    learned = sorted((d for d in groups if d in known_domains), key=lambda d: len(groups[d]))
+    new = [d for d in groups if d not in known_domains]
+
+    rounds = learned + new
+    while rounds:
+        next_round = []
+        for domain in rounds:
+            yield groups[domain].popleft()
+            if groups[domain]:
+                next_round.append(domain)
+        rounds = next_round
+
+
+class DomainBuffers:
+    """
+    Per-domain URL queues in bounded memory.
+    Up to `cap` URLs per domain are held in memory; later URLs of a domain are spilled to a
+    temporary SQLite file and read back in order as the domain drains.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.memory = {}        # domain -> deque of URLs, in first-seen domain order
+        self.spilled = {}       # domain -> URLs waiting on disk
+        self.in_memory = 0
+        self.spilled_total = 0
+        self.spill = None
+        self.seq = 0
+
+    def add(self, domain, url):
+        queue = self.memory.setdefault(domain, deque())
+        if len(queue) < self.cap and not self.spilled.get(domain):
+            queue.append(url)
+            self.in_memory += 1
+            return
+        if self.spill is None:
+            # '' is a private temporary database on disk, deleted on close
+            self.spill = sqlite3.connect('')
+            self.spill.execute("CREATE TABLE SPILL (Seq INTEGER PRIMARY KEY, Domain TEXT, URL TEXT)")
+            self.spill.execute("CREATE INDEX SPILL_DOMAIN ON SPILL (Domain, Seq)")
+        self.seq += 1
+        self.spill.execute("INSERT INTO SPILL VALUES (?, ?, ?)", (self.seq, domain, url))
+        self.spilled[domain] = self.spilled.get(domain, 0) + 1
+        self.spilled_total += 1
+
+    def backlog(self, domain):
+        return len(self.memory[domain]) + self.spilled.get(domain, 0)
+
+    def pop(self, domain):
+        """Next URL of a domain, the domain is dropped once it has none left."""
+        queue = self.memory[domain]
+        url = queue.popleft()
+        self.in_memory -= 1
+        if not queue and self.spilled.get(domain):
+            rows = self.spill.execute(
+                "SELECT Seq, URL FROM SPILL WHERE Domain = ? ORDER BY Seq LIMIT ?", (domain, self.cap)
+            ).fetchall()
+            self.spill.execute("DELETE FROM SPILL WHERE Domain = ? AND Seq <= ?", (domain, rows[-1][0]))
+            queue.extend(row[1] for row in rows)
+            self.in_memory += len(rows)
+            self.spilled[domain] -= len(rows)
+            self.spilled_total -= len(rows)
+        if not queue:
+            del self.memory[domain]
+            self.spilled.pop(domain, None)
+        return url
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+
+
+def schedule_stream(urls, window=1000, db_path='articles.db', domain_cap=None, read_ahead=None):
+    """
+    Schedule an unbounded URL stream in the schedule_urls() order, holding at most about
+    `window` URLs in memory.
+
+    Every domain keeps up to domain_cap URLs in memory (default window // 10), its further URLs
+    wait on disk. Input is read ahead until `window` URLs are in memory or read_ahead URLs
+    (default 100 * window) wait on disk, then one round (one URL per buffered domain) is
+    served, so a publisher filling the top of the input cannot stall the domains behind it.
+    Known domains are reloaded every `window` URLs, so domains learned meanwhile count as learned.
+    """
+    urls = iter(urls)
+    buffers = DomainBuffers(domain_cap or max(1, window // 10))
+    read_ahead = read_ahead if read_ahead is not None else 100 * window
+    known_domains = set()
+    since_reload = window
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and buffers.in_memory < window and buffers.spilled_total < read_ahead:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                else:
+                    buffers.add(url_domain(url), url)
+            if not buffers.memory:
+                return
+
+            if since_reload >= window:
+                known_domains = load_known_domains(db_path)
+                since_reload = 0
+            learned = sorted((d for d in buffers.memory if d in known_domains), key=buffers.backlog)
+            new = [d for d in buffers.memory if d not in known_domains]
+            for domain in learned + new:
+                since_reload += 1
+                yield buffers.pop(domain)
+    finally:
+        buffers.close()
+
+
+def describe_schedule(urls, known_domains):
+    """One-line summary of how a batch splits into learned and new domains."""
+    domains = {url_domain(url) for url in urls}
+    learned = len(domains & set(known_domains))
+    return f"{len(domains)} domains ({learned} learned, {len(domains) - learned} new, one pioneer URL each)"
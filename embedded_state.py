@@ -0,0 +1,182 @@
+"""
+Client-rendered page detection and embedded-JSON extraction
+Some publishers ship an almost empty HTML shell and render the article with JavaScript from a
+state blob (__NEXT_DATA__, window.__INITIAL_STATE__, ...). XPaths and LLM calls cannot find
+text that is not in the HTML, so such pages are detected before extraction and their fields
+are read from the state blob instead.
+"""
+
+import json
+from collections import deque
+from lxml import etree, html
+from field_validator import check_field
+from structured_metadata import author_names, split_published
+
+
+# <script id="..."> holding framework state as plain JSON
+STATE_SCRIPT_IDS = {'__NEXT_DATA__', '__NUXT_DATA__', '__APOLLO_STATE__', '__INITIAL_STATE__', '__PRELOADED_STATE__'}
+# Inline scripts assigning state to a global
+STATE_ASSIGNMENTS = (
+    'window.__INITIAL_STATE__', 'window.__PRELOADED_STATE__', 'window.__APOLLO_STATE__',
+    'window.__NUXT__', 'window.__DATA__', 'window.__STATE__'
+)
+# Mount points of single-page app frameworks
+APP_ROOT_XPATH = "//*[@id='__next' or @id='__nuxt' or @id='root' or @id='app' or @ng-version]"
+
+# A page is a shell when it has little visible text AND script payload or app markers dominate
+MIN_PARAGRAPHS = 3            # paragraphs with at least PARAGRAPH_MIN_CHARS characters
+PARAGRAPH_MIN_CHARS = 40
+MIN_TEXT_CHARS = 600          # visible body text, scripts and styles excluded
+SCRIPT_TEXT_RATIO = 3         # script bytes per visible text character
+MAX_STATE_NODES = 200000      # JSON nodes walked per page when looking for the article object
+
+# Keys that hold article fields in common CMS / framework state shapes
+TITLE_KEYS = ('headline', 'title', 'seoTitle')
+BODY_KEYS = ('articleBody', 'body', 'content', 'text', 'storyText', 'bodyHtml', 'html')
+AUTHOR_KEYS = ('author', 'authors', 'byline', 'authorName')
+PUBLISHED_KEYS = ('datePublished', 'publishedAt', 'published_at', 'publishDate', 'publishedDate',
+                  'firstPublished', 'createdAt', 'date')
+
+
+def is_state_script(elem):
+    """True for a <script> that carries framework state (kept by the low-memory loader)."""
+    if elem.get('id') in STATE_SCRIPT_IDS:
+        return True
+    text = (elem.text or "").lstrip()[:64]
+    return text.startswith(STATE_ASSIGNMENTS)
+
+
+def iter_state_blobs(tree):
+    """Yield every framework state blob on the page as parsed JSON."""
+    decoder = json.JSONDecoder(strict=False)
+    for script in tree.iter('script'):
+        if not is_state_script(script):
+            continue
+        raw = (script.text or "").strip()
+        if script.get('id') not in STATE_SCRIPT_IDS:
+            # window.__X__ = {...};  -> decode the object literal after '='
+            start = raw.find('{')
+            if start < 0:
+                continue
+            raw = raw[start:]
+        try:
+            data, _ = decoder.raw_decode(raw)
+        except ValueError:
+            continue  # JavaScript, not JSON (e.g. Nuxt's function-wrapped state)
+        yield data
+
+
+def classify_page(tree, script_bytes=None):
+    """
+    Cheap pre-extraction check for client-rendered pages.
+    script_bytes: script text counted while parsing, for a tree whose scripts were already emptied.
+
+    Returns:
+        dict: {'shell': bool, 'text_chars': int, 'paragraphs': int, 'script_bytes': int,
+               'state_blobs': int, 'app_root': bool}
+    """
+    text_chars = sum(len(t.strip()) for t in tree.xpath(
+        "//body//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::noscript)]"
+    ))
+    paragraphs = int(tree.xpath(f"count(//p[string-length(normalize-space()) >= {PARAGRAPH_MIN_CHARS}])"))
+    if script_bytes is None:
+        script_bytes = sum(len(s.text or "") for s in tree.iter('script'))
+    state_blobs = sum(1 for s in tree.iter('script') if is_state_script(s))
+    app_root = bool(tree.xpath(APP_ROOT_XPATH))
+
+    little_text = paragraphs < MIN_PARAGRAPHS and text_chars < MIN_TEXT_CHARS
+    script_heavy = script_bytes > text_chars * SCRIPT_TEXT_RATIO
+    return {
+        'shell': little_text and (state_blobs > 0 or app_root or script_heavy),
+        'text_chars': text_chars,
+        'paragraphs': paragraphs,
+        'script_bytes': script_bytes,
+        'state_blobs': state_blobs,
+        'app_root': app_root,
+    }
+
+
+# EMBEDDED-JSON EXTRACTION
+# ===============================================
+
+def flatten_text(value):
+    """Article body from a string (plain or HTML) or a list of rich-text blocks."""
+    if isinstance(value, str):
+        if '<' in value and '>' in value:
+            try:
+                return " ".join(html.fromstring(value).text_content().split())
+            except (etree.ParserError, ValueError):
+                pass
+        return " ".join(value.split())
+    if isinstance(value, list):
+        parts = [flatten_text(v) for v in value]
+        return " ".join(p for p in parts if p)
+    if isinstance(value, dict):
+        for key in ('text', 'content', 'html', 'value', 'children'):
+            if key in value:
+                return flatten_text(value[key])
+    return ""
+
+
+def first_value(obj, keys):
+    for key in keys:
+        if obj.get(key):
+            return obj[key]
+    return None
+
+
+def iter_dicts(data):
+    """Walk a JSON document breadth-first, bounded by MAX_STATE_NODES."""
+    queue = deque([data])
+    walked = 0
+    while queue and walked < MAX_STATE_NODES:
+        node = queue.popleft()
+        walked += 1
+        if isinstance(node, dict):
+            yield node
+            queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            queue.extend(v for v in node if isinstance(v, (dict, list)))
+
+
+def article_from_object(obj):
+    """Candidate fields from one state object, or None if it does not look like an article."""
+    title = first_value(obj, TITLE_KEYS)
+    if not isinstance(title, str):
+        return None
+    body = flatten_text(first_value(obj, BODY_KEYS))
+    if not body:
+        return None
+
+    fields = {'title': title, 'content': body}
+    author = first_value(obj, AUTHOR_KEYS)
+    if author:
+        fields['author'] = author_names(author)
+    date_text, time_text = split_published(first_value(obj, PUBLISHED_KEYS))
+    fields['date'] = date_text
+    fields['time'] = time_text
+    return fields
+
+
+def extract_embedded_article(tree):
+    """
+    Extract article fields from framework state blobs.
+    The object with the longest body that has a title is taken as the article.
+
+    Returns:
+        dict: Only the fields that pass validation, e.g. {'title': ..., 'content': ...}
+    """
+    best = None
+    for blob in iter_state_blobs(tree):
+        for obj in iter_dicts(blob):
+            fields = article_from_object(obj)
+            if fields and (best is None or len(fields['content']) > len(best['content'])):
+                best = fields
+
+    if not best:
+        return {}
+    return {
+        field: value.strip()
+        for field, value in best.items()
+        if isinstance(value, str) and check_field(field, value) is None
+    }
@@ -0,0 +1,259 @@
+"""
+Bulk export of the ARTICLES table to newline-delimited JSON, Parquet or Arrow IPC files.
+
+Rows are streamed in rowid order, one chunk at a time, over a read-only connection.
+Each chunk is its own short read, so the scraper can keep writing while an export runs.
+Partitioned exports walk the (Domain) index one domain at a time, so only one file is open at once.
+Incremental exports continue from the rowid watermark saved by the previous run
+(INSERT OR REPLACE gives re-scraped articles a new rowid, so updates are exported again).
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+
+FORMATS = {
+    'jsonl': {'extension': '.jsonl', 'compression': ['none', 'gzip']},
+    'parquet': {'extension': '.parquet', 'compression': ['none', 'snappy', 'gzip', 'zstd']},
+    'arrow': {'extension': '.arrow', 'compression': ['none', 'lz4', 'zstd']},
+}
+
+
+def connect_read_only(db_path, check_same_thread=True):
+    """Read-only connection, it never takes the write lock the scraper needs."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+def article_columns(conn):
+    """Column names and declared types of ARTICLES, in table order."""
+    return [(row[1], (row[2] or "").upper()) for row in conn.execute("PRAGMA table_info(ARTICLES)")]
+
+
+def iter_chunks(conn, after_rowid, up_to_rowid, chunk_size, by_domain=False, domain=None):
+    """
+    Yield lists of row dicts in rowid order using keyset pagination.
+    Only one chunk is materialised at a time. With by_domain only rows of `domain` are read
+    (None = rows without a domain), through the (Domain) index.
+    """
+    columns = [name for name, _ in article_columns(conn)]
+    query = (
+        f"SELECT rowid, {', '.join(columns)} FROM ARTICLES "
+        f"WHERE {'Domain IS ? AND ' if by_domain else ''}rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?"
+    )
+    last_rowid = after_rowid
+    while True:
+        params = (last_rowid, up_to_rowid, chunk_size)
+        rows = conn.execute(query, ((domain,) + params) if by_domain else params).fetchall()
+        if not rows:
+            return
+        last_rowid = rows[-1][0]
+        yield [dict(zip(columns, row[1:])) for row in rows]
+
+
+def iter_domains(conn):
+    """Distinct Domain values (None first if some rows have none), one index lookup each."""
+    if conn.execute("SELECT 1 FROM ARTICLES WHERE Domain IS NULL LIMIT 1").fetchone():
+        yield None
+    domain = conn.execute("SELECT MIN(Domain) FROM ARTICLES").fetchone()[0]
+    while domain is not None:
+        yield domain
+        domain = conn.execute("SELECT MIN(Domain) FROM ARTICLES WHERE Domain > ?", (domain,)).fetchone()[0]
+
+
+def load_watermark(state_file):
+    if not state_file or not os.path.exists(state_file):
+        return 0
+    with open(state_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('last_rowid', 0)
+
+
+def save_watermark(state_file, last_rowid, rows_exported):
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'last_rowid': last_rowid,
+            'rows_exported': rows_exported,
+            'exported_at': datetime.now().isoformat(timespec='seconds')
+        }, f, indent=2)
+
+
+def partition_dir(output_dir, domain):
+    """Hive-style per-domain directory (domain=<name>), safe for any domain string."""
+    safe = re.sub(r'[^A-Za-z0-9._-]', '_', domain or 'unknown')
+    return os.path.join(output_dir, f"domain={safe}")
+
+
+class JsonlWriter:
+    def __init__(self, path, compression):
+        if compression == 'gzip':
+            self.file = gzip.open(path + '.gz', 'wt', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowWriter:
+    """Parquet or Arrow IPC writer, each chunk becomes one row group / record batch."""
+
+    def __init__(self, path, fmt, schema, compression):
+        import pyarrow as pa
+        self.pa = pa
+        self.schema = schema
+        codec = None if compression == 'none' else compression
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, schema, compression=codec or 'none')
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=codec)
+            self.writer = pa.ipc.new_file(path, schema, options=options)
+
+    def write(self, rows):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def arrow_schema(columns):
+    """Explicit schema from the declared column types, so all-NULL chunks keep their types."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("Error: Parquet/Arrow export needs pyarrow (pip install pyarrow)")
+        sys.exit(1)
+
+    def arrow_type(declared):
+        if 'INT' in declared:
+            return pa.int64()
+        if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+            return pa.float64()
+        return pa.string()
+
+    return pa.schema([(name, arrow_type(declared)) for name, declared in columns])
+
+
+def export_articles(db_path, output_dir, fmt='jsonl', compression='none', chunk_size=5000,
+                    partition_by_domain=False, state_file=None, incremental=False):
+    """
+    Stream ARTICLES to files in output_dir.
+
+    Args:
+        db_path (str): Path to articles.db
+        output_dir (str): Directory for the exported files
+        fmt (str): 'jsonl', 'parquet' or 'arrow'
+        compression (str): Codec, see FORMATS
+        chunk_size (int): Rows fetched and written per chunk
+        partition_by_domain (bool): One file per domain under domain=<name>/
+        state_file (str): JSON file holding the last exported rowid
+        incremental (bool): Only export rows added since the watermark in state_file
+
+    Returns:
+        int: Number of rows exported
+    """
+    if compression not in FORMATS[fmt]['compression']:
+        raise ValueError(f"Compression '{compression}' not supported for {fmt}: {FORMATS[fmt]['compression']}")
+
+    conn = connect_read_only(db_path)
+    after_rowid = load_watermark(state_file) if incremental else 0
+    # Fix the upper bound now, rows written during the export go to the next run
+    up_to_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM ARTICLES").fetchone()[0]
+
+    if up_to_rowid <= after_rowid:
+        print(f"Nothing new to export (watermark rowid {after_rowid})")
+        conn.close()
+        return 0
+
+    schema = arrow_schema(article_columns(conn)) if fmt != 'jsonl' else None
+    file_name = f"articles-{after_rowid + 1}-{up_to_rowid}{FORMATS[fmt]['extension']}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    exported = 0
+
+    def open_writer(key):
+        directory = partition_dir(output_dir, key) if partition_by_domain else output_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, file_name)
+        if fmt == 'jsonl':
+            return JsonlWriter(path, compression)
+        return ArrowWriter(path, fmt, schema, compression)
+
+    # One domain at a time, each writer is closed before the next opens, however many domains there are
+    if partition_by_domain:
+        parts = ((domain, iter_chunks(conn, after_rowid, up_to_rowid, chunk_size, by_domain=True, domain=domain))
+                 for domain in iter_domains(conn))
+    else:
+        parts = [(None, iter_chunks(conn, after_rowid, up_to_rowid, chunk_size))]
+
+    try:
+        for key, chunks in parts:
+            writer = None
+            try:
+                for chunk in chunks:
+                    # Opened on the first row, so domains without new rows get no file
+                    writer = writer or open_writer(key)
+                    writer.write(chunk)
+                    exported += len(chunk)
+                    print(f"Exported {exported} rows...")
+            finally:
+                if writer:
+                    writer.close()
+    finally:
+        conn.close()
+
+    # Only move the watermark once every file is complete
+    if state_file:
+        save_watermark(state_file, up_to_rowid, exported)
+
+    return exported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Stream the ARTICLES table to JSONL, Parquet or Arrow IPC files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python export_articles.py exports/
+  python export_articles.py exports/ --format jsonl --compression gzip
+  python export_articles.py exports/ --format parquet --compression zstd --partition-by-domain
+  python export_articles.py exports/ --incremental --state export_state.json
+        """
+    )
+
+    parser.add_argument('output_dir', help='Directory for exported files')
+    parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    parser.add_argument('--format', choices=list(FORMATS), default='jsonl', help='Output format (default: jsonl)')
+    parser.add_argument('--compression', default='none',
+                        help='jsonl: none/gzip, parquet: none/snappy/gzip/zstd, arrow: none/lz4/zstd (default: none)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per chunk (default: 5000)')
+    parser.add_argument('--partition-by-domain', action='store_true', help='Write one file per domain')
+    parser.add_argument('--state', default='export_state.json',
+                        help='Watermark file for incremental exports (default: export_state.json)')
+    parser.add_argument('--incremental', action='store_true', help='Only export rows added since the last export')
+
+    args = parser.parse_args()
+
+    try:
+        total = export_articles(
+            args.db, args.output_dir, fmt=args.format, compression=args.compression,
+            chunk_size=args.chunk_size, partition_by_domain=args.partition_by_domain,
+            state_file=args.state, incremental=args.incremental
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Export complete: {total} rows written to {args.output_dir}")
@@ -0,0 +1,363 @@
+"""
+Sitemap and RSS/Atom feed discovery with incremental polling
+
+Feeds are found for the domains in TRACKING_DOMAINS (robots.txt Sitemap lines and
+<link rel="alternate"> feeds on the home page) and stored in the FEEDS table.
+Each poll streams the feed through lxml iterparse and yields the items whose GUID/URL was not
+seen before. The feed's high-water mark (newest lastmod/pubDate seen) is only a coarse lower
+bound: items older than it by more than LOOKBACK_SECONDS are skipped, so items sharing the newest
+timestamp or showing up late with an older date are still found. Child sitemaps of an index are
+read newest first, and those not modified since the high-water mark are skipped.
+Seen GUIDs are stored with their item timestamp (undated items with the last poll that listed
+them) and the newest MAX_SEEN_GUIDS inside the lookback window are kept.
+Conditional GETs (ETag / Last-Modified) skip unchanged feeds entirely.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlparse
+
+import requests
+from dateutil import parser as date_parser
+from lxml import etree, html
+
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+REQUEST_TIMEOUT = 30
+MAX_SEEN_GUIDS = 5000          # GUIDs remembered per feed (must cover the lookback window)
+LOOKBACK_SECONDS = 2 * 86400   # items this much older than the high-water mark are still checked by GUID
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+MAX_CHILD_SITEMAPS = 5         # child sitemaps followed per sitemap index per poll
+FALLBACK_FEED_PATHS = ['/sitemap-news.xml', '/news-sitemap.xml', '/sitemap_news.xml', '/feed', '/rss']
+FEED_LINK_TYPES = ('application/rss+xml', 'application/atom+xml')
+
+
+def local_name(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ""
+
+
+def normalize_timestamp(value):
+    """Parse a feed date into a sortable UTC ISO string ('' if unparseable)."""
+    if not value:
+        return ""
+    try:
+        dt = date_parser.parse(value.strip())
+    except (ValueError, OverflowError):
+        return ""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def lookback_cutoff(high_water_mark):
+    """Oldest item timestamp still checked against the seen GUIDs ('' = no lower bound)."""
+    if not high_water_mark:
+        return ""
+    newest = datetime.strptime(high_water_mark, TIMESTAMP_FORMAT)
+    return (newest - timedelta(seconds=LOOKBACK_SECONDS)).strftime(TIMESTAMP_FORMAT)
+
+
+def load_seen(raw, high_water_mark, polled_at):
+    """SeenGUIDs column -> {guid: timestamp} (plain GUID lists of older rows count as seen at the high-water mark)."""
+    seen = {}
+    for entry in json.loads(raw) if raw else []:
+        if isinstance(entry, str):
+            seen[entry] = high_water_mark or polled_at
+        else:
+            seen[entry[1]] = entry[0]
+    return seen
+
+
+def trim_seen(seen, newest):
+    """Newest-first [timestamp, guid] pairs to store: inside the lookback window, at most MAX_SEEN_GUIDS."""
+    cutoff = lookback_cutoff(newest)
+    kept = sorted(([timestamp, guid] for guid, timestamp in seen.items() if timestamp >= cutoff), reverse=True)
+    return kept[:MAX_SEEN_GUIDS]
+
+
+# FEED DISCOVERY
+# ===============================================
+
+def site_root(url):
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def find_feeds(root_url):
+    """Find sitemap and RSS/Atom feed URLs for a site (robots.txt first, then home page links)."""
+    feeds = []
+
+    try:
+        robots = requests.get(urljoin(root_url, '/robots.txt'), headers=HEADERS, timeout=REQUEST_TIMEOUT)
+        if robots.ok:
+            for line in robots.text.splitlines():
+                if line.lower().startswith('sitemap:'):
+                    feeds.append(line.split(':', 1)[1].strip())
+    except requests.RequestException as e:
+        print(f"Could not read robots.txt for {root_url}: {e}")
+
+    try:
+        home = requests.get(root_url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+        if home.ok:
+            tree = html.fromstring(home.content)
+            for link in tree.xpath("//link[@rel='alternate'][@href]"):
+                if (link.get('type') or '').lower() in FEED_LINK_TYPES:
+                    feeds.append(urljoin(root_url, link.get('href')))
+    except (requests.RequestException, etree.ParserError) as e:
+        print(f"Could not read home page of {root_url}: {e}")
+
+    # Common news feed locations, only probed when nothing was advertised
+    if not feeds:
+        for path in FALLBACK_FEED_PATHS:
+            candidate = urljoin(root_url, path)
+            try:
+                probe = requests.head(candidate, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+                if probe.ok:
+                    feeds.append(candidate)
+            except requests.RequestException:
+                continue
+
+    # Prefer news sitemaps over full-archive sitemaps
+    feeds = list(dict.fromkeys(feeds))
+    news_feeds = [f for f in feeds if 'news' in f.lower() or 'rss' in f.lower() or 'feed' in f.lower()]
+    return news_feeds or feeds
+
+
+def add_feed(conn, domain, feed_url):
+    conn.execute("INSERT OR IGNORE INTO FEEDS (FeedURL, Domain, SeenGUIDs) VALUES (?, ?, '[]')", (feed_url, domain))
+    conn.commit()
+
+
+def discover_feeds_for_tracked_domains(conn):
+    """Find and store feeds for every TRACKING_DOMAINS domain that has none yet."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT Domain FROM TRACKING_DOMAINS
+        WHERE Domain NOT IN (SELECT DISTINCT Domain FROM FEEDS WHERE Domain IS NOT NULL)
+    ''')
+    domains = [row[0] for row in cursor.fetchall()]
+
+    for domain in domains:
+        # The site host comes from an article already scraped for this domain
+        cursor.execute("SELECT URL FROM ARTICLES WHERE Domain = ? ORDER BY rowid DESC LIMIT 1", (domain,))
+        row = cursor.fetchone()
+        if not row:
+            print(f"No scraped article for '{domain}', cannot locate its site")
+            continue
+
+        feeds = find_feeds(site_root(row[0]))
+        for feed_url in feeds:
+            add_feed(conn, domain, feed_url)
+        print(f"{domain}: {len(feeds)} feed(s) found")
+
+
+# STREAMING FEED PARSING
+# ===============================================
+
+def iter_feed_entries(source):
+    """
+    Stream a sitemap, sitemap index, RSS or Atom document.
+
+    Yields:
+        tuple: (kind, url, guid, timestamp) where kind is 'item' or 'sitemap' (child of a sitemap index)
+    """
+    for _, elem in etree.iterparse(source, events=('end',), recover=True, resolve_entities=False):
+        name = local_name(elem.tag)
+        if name not in ('url', 'sitemap', 'item', 'entry'):
+            continue
+
+        fields = {}
+        for child in elem.iter():
+            child_name = local_name(child.tag)
+            if child_name == 'link' and child.get('href'):
+                # Atom: <link rel="alternate" href="..."/>
+                if child.get('rel', 'alternate') == 'alternate':
+                    fields.setdefault('link', child.get('href'))
+            elif child.text and child.text.strip():
+                fields.setdefault(child_name, child.text.strip())
+
+        if name in ('url', 'sitemap'):
+            url = fields.get('loc', '')
+            timestamp = fields.get('publication_date') or fields.get('lastmod')
+            kind = 'sitemap' if name == 'sitemap' else 'item'
+            guid = url
+        else:
+            url = fields.get('link', '')
+            timestamp = fields.get('pubDate') or fields.get('published') or fields.get('updated') or fields.get('date')
+            kind = 'item'
+            guid = fields.get('guid') or fields.get('id') or url
+
+        if url:
+            yield kind, url.strip(), guid.strip(), normalize_timestamp(timestamp)
+
+        # Free parsed entries as we go so large sitemaps stay in constant memory
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def fetch_feed(feed_url, etag=None, last_modified=None):
+    """Conditional streaming GET. Returns None when the feed is unchanged (HTTP 304)."""
+    headers = dict(HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response = requests.get(feed_url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        response.close()
+        return None
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+
+def poll_feed(conn, feed_url):
+    """
+    Poll one feed and return the URLs of items not seen before, updating its high-water marks.
+    Child sitemaps of a sitemap index are followed only when they changed since the last poll.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT HighWaterMark, SeenGUIDs, ETag, HTTPLastModified FROM FEEDS WHERE FeedURL = ?", (feed_url,))
+    row = cursor.fetchone()
+    high_water_mark = (row[0] or "") if row else ""
+    polled_at = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+    seen = load_seen(row[1] if row else None, high_water_mark, polled_at)
+
+    cutoff = lookback_cutoff(high_water_mark)
+    new_urls = []
+    newest = high_water_mark
+    pending = [(feed_url, row[2] if row else None, row[3] if row else None)]
+    child_count = 0
+    etag = last_modified = None
+
+    while pending:
+        url, url_etag, url_last_modified = pending.pop(0)
+        try:
+            response = fetch_feed(url, url_etag, url_last_modified)
+        except requests.RequestException as e:
+            print(f"Could not poll {url}: {e}")
+            continue
+        if response is None:
+            print(f"Unchanged: {url}")
+            continue
+        if url == feed_url:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        children = []
+        with response:
+            for kind, item_url, guid, timestamp in iter_feed_entries(response.raw):
+                if kind == 'sitemap':
+                    # A child sitemap not modified since the newest item seen holds nothing new
+                    if not (timestamp and high_water_mark and timestamp <= high_water_mark):
+                        children.append((timestamp, item_url))
+                    continue
+                # The GUID decides, the timestamp only skips items far older than the high-water mark
+                if timestamp and cutoff and timestamp < cutoff:
+                    continue
+                if guid in seen:
+                    if not timestamp:
+                        seen[guid] = polled_at  # undated items are kept while the feed lists them
+                    continue
+                seen[guid] = timestamp or polled_at
+                new_urls.append(item_url)
+                if timestamp > newest:
+                    newest = timestamp
+
+        # Many sitemap indexes list the oldest archives first, so children are read newest first
+        # (undated ones last)
+        children.sort(reverse=True)
+        for _, child_url in children[:MAX_CHILD_SITEMAPS - child_count]:
+            pending.append((child_url, None, None))
+            child_count += 1
+
+    cursor.execute('''
+        UPDATE FEEDS
+        SET HighWaterMark = ?, SeenGUIDs = ?, ETag = COALESCE(?, ETag),
+            HTTPLastModified = COALESCE(?, HTTPLastModified), LastPolled = CURRENT_TIMESTAMP
+        WHERE FeedURL = ?
+    ''', (newest, json.dumps(trim_seen(seen, newest)), etag, last_modified, feed_url))
+    conn.commit()
+    return new_urls
+
+
+def poll_feeds(db_path='articles.db', domains=None):
+    """
+    Poll every stored feed (optionally only for some domains).
+
+    Returns:
+        list: New article URLs, de-duplicated, in feed order
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT FeedURL, Domain FROM FEEDS")
+    feeds = [(url, domain) for url, domain in cursor.fetchall() if not domains or domain in domains]
+
+    new_urls = []
+    for feed_url, domain in feeds:
+        urls = poll_feed(conn, feed_url)
+        print(f"{domain}: {len(urls)} new item(s) from {feed_url}")
+        new_urls.extend(urls)
+
+    conn.close()
+    return list(dict.fromkeys(new_urls))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Discover and poll news sitemaps / RSS / Atom feeds for tracked domains',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python feed_discovery.py --discover
+  python feed_discovery.py --add indianexpress https://indianexpress.com/feed/
+  python feed_discovery.py --poll > new_urls.txt
+  python feed_discovery.py --watch 300
+        """
+    )
+
+    parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    parser.add_argument('--discover', action='store_true', help='Find feeds for TRACKING_DOMAINS without one')
+    parser.add_argument('--add', nargs=2, metavar=('DOMAIN', 'FEED_URL'), help='Register a feed manually')
+    parser.add_argument('--poll', action='store_true', help='Poll once and print new URLs to stdout')
+    parser.add_argument('--watch', type=int, metavar='SECONDS',
+                        help='Poll every SECONDS and scrape new URLs with batch_scraper.py')
+    parser.add_argument('--scraper', default='main_scraper.py', help='Path to main_scraper.py (for --watch)')
+
+    args = parser.parse_args()
+
+    if args.add:
+        conn = sqlite3.connect(args.db)
+        add_feed(conn, args.add[0], args.add[1])
+        conn.close()
+        print(f"Feed added for {args.add[0]}: {args.add[1]}", file=sys.stderr)
+
+    if args.discover:
+        conn = sqlite3.connect(args.db)
+        discover_feeds_for_tracked_domains(conn)
+        conn.close()
+
+    if args.poll:
+        # Progress goes to stderr so stdout can be piped straight into a URL file
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        urls = poll_feeds(args.db)
+        sys.stdout = stdout
+        for url in urls:
+            print(url)
+
+    if args.watch:
+        from batch_scraper import batch_scrape
+        while True:
+            urls = poll_feeds(args.db)
+            if urls:
+                batch_scrape(urls=urls, scraper_script=args.scraper, delay=0)
+            else:
+                print("No new articles")
+            time.sleep(args.watch)
@@ -0,0 +1,98 @@
+"""
+Validation engine for extracted article fields
+Every rule is defined once here and run over a batch of extracted records.
+Cheap length checks run first; the RAKE keyword overlap only runs when they pass.
+"""
+
+from keyword_matcher import compare_texts
+
+
+FIELDS = ['author', 'date', 'time', 'title', 'content']
+
+AUTHOR_MAX_LENGTH = 25
+TITLE_MIN_LENGTH = 10
+CONTENT_MIN_LENGTH = 100
+TITLE_CONTENT_THRESHOLD = 50
+
+# Per-field rules in the order they run: (check, feedback template)
+# The first failing rule short-circuits the remaining rules of that field
+FIELD_RULES = {
+    'author': [
+        (lambda v: v.strip() != "", "Empty Author field"),
+        (lambda v: len(v) <= AUTHOR_MAX_LENGTH, "Author length too big"),
+    ],
+    'date': [
+        (lambda v: v.strip() != "", "Empty date field"),
+    ],
+    'time': [
+        (lambda v: v.strip() != "", "Empty time field"),
+    ],
+    'title': [
+        (lambda v: v.strip() != "", "Empty title field"),
+        (lambda v: len(v.strip()) >= TITLE_MIN_LENGTH, "Title too short (only {length} chars)"),
+    ],
+    'content': [
+        (lambda v: v.strip() != "", "Empty content field"),
+        (lambda v: len(v.strip()) >= CONTENT_MIN_LENGTH, "Content too short (only {length} chars)"),
+    ],
+}
+
+TITLE_CONTENT_FEEDBACK = "Title and Content Do not match"
+
+
+def check_field(field, value):
+    """
+    Run the cheap rules for one field.
+
+    Returns:
+        str or None: Feedback for the first failing rule, None if the value is valid
+    """
+    value = value or ""
+    for check, feedback in FIELD_RULES[field]:
+        if not check(value):
+            return feedback.format(length=len(value))
+    return None
+
+
+def validate_records(records, fields=None, verbose=False):
+    """
+    Validate a batch of extracted records.
+
+    Args:
+        records (list): Dicts keyed by field name ('author', 'date', 'time', 'title', 'content')
+        fields (list): Fields to validate (default: all)
+        verbose (bool): Print keyword overlap details
+
+    Returns:
+        list: One dict per record mapping field -> feedback string, or None if the field passed
+    """
+    fields = fields or FIELDS
+    results = []
+    overlap_cache = {}
+
+    for record in records:
+        result = {field: check_field(field, record.get(field)) for field in fields}
+
+        # Expensive keyword overlap only when title and content passed their length checks
+        if 'title' in result and 'content' in result and result['title'] is None and result['content'] is None:
+            key = (record['title'], record['content'])
+            if key not in overlap_cache:
+                overlap_cache[key] = compare_texts(
+                    record['title'], record['content'], threshold=TITLE_CONTENT_THRESHOLD, verbose=verbose
+                )
+            if overlap_cache[key] == 0:
+                result['content'] = TITLE_CONTENT_FEEDBACK
+
+        results.append(result)
+
+    return results
+
+
+def failed_fields_and_feedback(result):
+    """Convert one validation result to the (failed_fields, feedback) pair used by the LLM retry prompts."""
+    feedback = {field: message for field, message in result.items() if message is not None}
+    return list(feedback), feedback
+
+
+def passed_fields(result):
+    return [field for field, message in result.items() if message is None]
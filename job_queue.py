@@ -0,0 +1,518 @@
+"""
+Lease-based job queue for running the scraper on several hosts
+
+URLs are enqueued once and claimed in batches by workers. Work is sharded by domain:
+a worker holds a lease on a domain and only claims that domain's URLs until it runs out,
+so each domain's learned XPaths and politeness delay stay on one node.
+Workers heartbeat their leases; leases that expire (crashed or hung worker) are reclaimed
+automatically and their URLs go back to pending.
+
+Backends:
+    SQLiteQueueBackend - JOBS / DOMAIN_LEASES tables in a SQLite file (default: queue.db)
+    RedisQueueBackend  - any client exposing the redis-py command API (Redis or a compatible stand-in)
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from itertools import islice
+
+from batch_scraper import iter_urls, scrape_url, MAX_DEFERRALS, DEFER_WAIT_SECONDS, KILL_SECONDS
+from domain_scheduler import url_domain
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    class WatchError(Exception):
+        """Stand-in so this module imports without the redis package (only a Redis client raises it)."""
+
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_BATCH_SIZE = 20
+MAX_ATTEMPTS = 3          # a URL whose lease expired this many times is marked failed
+ENQUEUE_BATCH = 10000     # URLs read from the input and enqueued per transaction
+
+
+class QueueBackend:
+    """Interface every queue backend implements."""
+
+    def enqueue(self, urls):
+        """Add URLs (duplicates are ignored). Returns the number of new jobs."""
+        raise NotImplementedError
+
+    def claim(self, worker_id, batch_size, lease_seconds):
+        """Lease up to batch_size pending URLs of one domain. Returns a list of (job_id, url)."""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, lease_seconds):
+        """Extend every job and domain lease held by the worker."""
+        raise NotImplementedError
+
+    def complete(self, job_id, worker_id, success, error=None):
+        """
+        Record the result of a job leased by worker_id. Returns False (and changes nothing) when the
+        worker no longer holds the lease, e.g. it expired and the job was reclaimed by another worker.
+        """
+        raise NotImplementedError
+
+    def reclaim_expired(self):
+        """Return expired leased jobs to pending. Returns the number reclaimed."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Job counts per status."""
+        raise NotImplementedError
+
+
+class SQLiteQueueBackend(QueueBackend):
+
+    def __init__(self, db_path='queue.db'):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS JOBS (
+                Id INTEGER PRIMARY KEY,
+                URL TEXT UNIQUE,
+                Domain TEXT,
+                Status TEXT DEFAULT 'pending',
+                Attempts INTEGER DEFAULT 0,
+                WorkerID TEXT,
+                LeaseExpires REAL,
+                Error TEXT,
+                EnqueuedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FinishedAt TIMESTAMP
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_domain ON JOBS (Status, Domain, Id)")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS DOMAIN_LEASES (
+                Domain TEXT PRIMARY KEY,
+                WorkerID TEXT,
+                LeaseExpires REAL
+            )
+        ''')
+
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two hosts never lease the same rows
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def enqueue(self, urls):
+        with self.lock:
+            before = self.conn.total_changes
+            self.transaction()
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO JOBS (URL, Domain) VALUES (?, ?)",
+                ((url, url_domain(url)) for url in urls)
+            )
+            self.conn.execute("COMMIT")
+            return self.conn.total_changes - before
+
+    def _reclaim(self, now):
+        self.conn.execute('''
+            UPDATE JOBS
+            SET Status = CASE WHEN Attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                Attempts = Attempts + 1, WorkerID = NULL, LeaseExpires = NULL,
+                Error = 'Lease expired'
+            WHERE Status = 'leased' AND LeaseExpires < ?
+        ''', (MAX_ATTEMPTS, now))
+        reclaimed = self.conn.execute("SELECT changes()").fetchone()[0]
+        self.conn.execute("DELETE FROM DOMAIN_LEASES WHERE LeaseExpires < ?", (now,))
+        return reclaimed
+
+    def reclaim_expired(self):
+        with self.lock:
+            self.transaction()
+            reclaimed = self._reclaim(time.time())
+            self.conn.execute("COMMIT")
+            return reclaimed
+
+    def claim(self, worker_id, batch_size, lease_seconds):
+        with self.lock:
+            now = time.time()
+            expires = now + lease_seconds
+            self.transaction()
+            try:
+                self._reclaim(now)
+
+                # Stay on a domain this worker already holds while it has pending work
+                row = self.conn.execute('''
+                    SELECT l.Domain FROM DOMAIN_LEASES l
+                    WHERE l.WorkerID = ?
+                      AND EXISTS (SELECT 1 FROM JOBS j WHERE j.Domain = l.Domain AND j.Status = 'pending')
+                    LIMIT 1
+                ''', (worker_id,)).fetchone()
+
+                if row is None:
+                    # Release exhausted domains, then take the oldest unleased domain
+                    self.conn.execute("DELETE FROM DOMAIN_LEASES WHERE WorkerID = ?", (worker_id,))
+                    row = self.conn.execute('''
+                        SELECT Domain FROM JOBS
+                        WHERE Status = 'pending' AND Domain NOT IN (SELECT Domain FROM DOMAIN_LEASES)
+                        ORDER BY Id LIMIT 1
+                    ''').fetchone()
+                    if row is None:
+                        self.conn.execute("COMMIT")
+                        return []
+                    self.conn.execute(
+                        "INSERT INTO DOMAIN_LEASES (Domain, WorkerID, LeaseExpires) VALUES (?, ?, ?)",
+                        (row[0], worker_id, expires)
+                    )
+
+                domain = row[0]
+                jobs = self.conn.execute('''
+                    SELECT Id, URL FROM JOBS WHERE Domain = ? AND Status = 'pending' ORDER BY Id LIMIT ?
+                ''', (domain, batch_size)).fetchall()
+                self.conn.executemany(
+                    "UPDATE JOBS SET Status = 'leased', WorkerID = ?, LeaseExpires = ? WHERE Id = ?",
+                    ((worker_id, expires, job_id) for job_id, _ in jobs)
+                )
+                self.conn.execute(
+                    "UPDATE DOMAIN_LEASES SET LeaseExpires = ? WHERE Domain = ?", (expires, domain)
+                )
+                self.conn.execute("COMMIT")
+                return jobs
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, worker_id, lease_seconds):
+        with self.lock:
+            expires = time.time() + lease_seconds
+            self.transaction()
+            self.conn.execute(
+                "UPDATE JOBS SET LeaseExpires = ? WHERE WorkerID = ? AND Status = 'leased'", (expires, worker_id)
+            )
+            self.conn.execute("UPDATE DOMAIN_LEASES SET LeaseExpires = ? WHERE WorkerID = ?", (expires, worker_id))
+            self.conn.execute("COMMIT")
+
+    def complete(self, job_id, worker_id, success, error=None):
+        with self.lock:
+            cursor = self.conn.execute('''
+                UPDATE JOBS
+                SET Status = ?, Error = ?, WorkerID = NULL, LeaseExpires = NULL, FinishedAt = CURRENT_TIMESTAMP
+                WHERE Id = ? AND WorkerID = ? AND Status = 'leased'
+            ''', ('done' if success else 'failed', error, job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT Status, COUNT(*) FROM JOBS GROUP BY Status").fetchall())
+
+
+class RedisQueueBackend(QueueBackend):
+    """
+    Same semantics on top of Redis data structures:
+        <prefix>:domains            set of domains with pending jobs
+        <prefix>:pending:<domain>   list of pending job ids
+        <prefix>:jobs               hash job id -> JSON {url, domain, attempts}
+        <prefix>:urls               hash url -> job id (de-duplication)
+        <prefix>:leases             sorted set job id -> lease expiry
+        <prefix>:holder:<job id>    worker holding the job
+        <prefix>:domain:<domain>    domain lease (worker id with expiry)
+        <prefix>:held:<worker>      domains the worker leases
+        <prefix>:status             hash job id -> done / failed
+    Claims and completions are optimistic transactions (WATCH/MULTI), retried on WatchError.
+    """
+
+    def __init__(self, client, prefix='scraper'):
+        self.r = client
+        self.prefix = prefix
+
+    def key(self, *parts):
+        return ':'.join((self.prefix,) + parts)
+
+    @staticmethod
+    def text(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    def enqueue(self, urls):
+        added = 0
+        for url in urls:
+            job_id = str(self.r.incr(self.key('next_id')))
+            if not self.r.hsetnx(self.key('urls'), url, job_id):
+                continue
+            domain = url_domain(url)
+            self.r.hset(self.key('jobs'), job_id, json.dumps({'url': url, 'domain': domain, 'attempts': 0}))
+            self.push_pending(domain, job_id)
+            added += 1
+        return added
+
+    def push_pending(self, domain, job_id):
+        # One MULTI block, so a claim never sees the job in the list without the domain in the set
+        pipe = self.r.pipeline()
+        pipe.rpush(self.key('pending', domain), job_id)
+        pipe.sadd(self.key('domains'), domain)
+        pipe.execute()
+
+    def job(self, job_id):
+        raw = self.r.hget(self.key('jobs'), job_id)
+        return json.loads(raw) if raw else None
+
+    def reclaim_expired(self):
+        reclaimed = 0
+        for job_id in self.r.zrangebyscore(self.key('leases'), '-inf', time.time()):
+            job_id = self.text(job_id)
+            if not self.r.zrem(self.key('leases'), job_id):
+                continue  # another worker reclaimed it first
+            job = self.job(job_id)
+            if job is None:
+                continue
+            job['attempts'] += 1
+            self.r.hset(self.key('jobs'), job_id, json.dumps(job))
+            holder = self.text(self.r.get(self.key('holder', job_id)))
+            self.r.delete(self.key('holder', job_id))
+            # The old holder lost the domain too unless it still leases it
+            if holder and self.text(self.r.get(self.key('domain', job['domain']))) != holder:
+                self.r.srem(self.key('held', holder), job['domain'])
+            if job['attempts'] >= MAX_ATTEMPTS:
+                self.r.hset(self.key('status'), job_id, 'failed')
+            else:
+                self.push_pending(job['domain'], job_id)
+            reclaimed += 1
+        return reclaimed
+
+    def claim(self, worker_id, batch_size, lease_seconds):
+        self.reclaim_expired()
+        expires = time.time() + lease_seconds
+
+        held = [self.text(d) for d in self.r.smembers(self.key('held', worker_id))]
+        domains = [self.text(d) for d in self.r.smembers(self.key('domains'))]
+
+        # Domains this worker already holds first, then any domain it can lease
+        for domain in held + [d for d in sorted(domains) if d not in held]:
+            jobs = self.claim_domain(worker_id, domain, batch_size, lease_seconds, expires)
+            if jobs:
+                return jobs
+        return []
+
+    def claim_domain(self, worker_id, domain, batch_size, lease_seconds, expires):
+        """
+        Lease a domain and up to batch_size of its pending jobs in one transaction. An enqueue,
+        reclaim or other claim touching the domain meanwhile aborts it, and it is retried.
+        """
+        domains_key, pending_key = self.key('domains'), self.key('pending', domain)
+        lease_key, held_key = self.key('domain', domain), self.key('held', worker_id)
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(domains_key, pending_key, lease_key, held_key)
+                    holder = self.text(pipe.get(lease_key))
+                    if holder not in (None, worker_id):
+                        # Leased by another worker (this worker's own lease on it may have lapsed)
+                        pipe.unwatch()
+                        self.r.srem(held_key, domain)
+                        return []
+                    job_ids = [self.text(j) for j in pipe.lrange(pending_key, 0, batch_size - 1)]
+                    jobs = [(job_id, self.job(job_id)['url']) for job_id in job_ids]
+
+                    pipe.multi()
+                    if jobs:
+                        pipe.set(lease_key, worker_id, ex=lease_seconds)
+                        pipe.sadd(held_key, domain)
+                        pipe.ltrim(pending_key, len(jobs), -1)
+                        pipe.zadd(self.key('leases'), {job_id: expires for job_id in job_ids})
+                        for job_id in job_ids:
+                            pipe.set(self.key('holder', job_id), worker_id)
+                    else:
+                        # Exhausted: the domain is released in the transaction that saw its list empty
+                        pipe.srem(domains_key, domain)
+                        pipe.srem(held_key, domain)
+                        if holder == worker_id:
+                            pipe.delete(lease_key)
+                    pipe.execute()
+                    return jobs
+                except WatchError:
+                    continue
+
+    def heartbeat(self, worker_id, lease_seconds):
+        expires = time.time() + lease_seconds
+        for job_id in self.r.zrange(self.key('leases'), 0, -1):
+            job_id = self.text(job_id)
+            if self.text(self.r.get(self.key('holder', job_id))) == worker_id:
+                self.r.zadd(self.key('leases'), {job_id: expires})
+
+        held_key = self.key('held', worker_id)
+        for domain in self.r.smembers(held_key):
+            domain = self.text(domain)
+            lease_key = self.key('domain', domain)
+            with self.r.pipeline() as pipe:
+                while True:
+                    try:
+                        # Only extend a domain lease this worker still holds, forget the others
+                        pipe.watch(lease_key)
+                        if self.text(pipe.get(lease_key)) != worker_id:
+                            pipe.unwatch()
+                            self.r.srem(held_key, domain)
+                            break
+                        pipe.multi()
+                        pipe.expire(lease_key, lease_seconds)
+                        pipe.execute()
+                        break
+                    except WatchError:
+                        continue
+
+    def complete(self, job_id, worker_id, success, error=None):
+        holder_key, leases_key = self.key('holder', job_id), self.key('leases')
+        # Optimistic transaction: the lease check and the status write fail together if a
+        # reclaim or heartbeat touches the lease meanwhile, and are then retried
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(holder_key, leases_key)
+                    holder = self.text(pipe.get(holder_key))
+                    if holder != worker_id or pipe.zscore(leases_key, job_id) is None:
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.zrem(leases_key, job_id)
+                    pipe.delete(holder_key)
+                    pipe.hset(self.key('status'), job_id, 'done' if success else 'failed')
+                    if error:
+                        pipe.hset(self.key('errors'), job_id, error)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def stats(self):
+        counts = {'pending': 0, 'leased': self.r.zcard(self.key('leases')), 'done': 0, 'failed': 0}
+        for domain in self.r.smembers(self.key('domains')):
+            domain = self.text(domain)
+            counts['pending'] += self.r.llen(self.key('pending', domain))
+        for status in self.r.hvals(self.key('status')):
+            status = self.text(status)
+            counts[status] += 1
+        return counts
+
+
+def enqueue_stream(backend, urls, batch_size=ENQUEUE_BATCH):
+    """Enqueue a URL stream batch by batch, so any size of input runs in constant memory."""
+    urls = iter(urls)
+    added = read = 0
+    while True:
+        batch = list(islice(urls, batch_size))
+        if not batch:
+            return added
+        added += backend.enqueue(batch)
+        read += len(batch)
+        print(f"Enqueued {added} new of {read} URL(s) read...")
+
+
+def open_backend(args):
+    if args.backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            print("Error: the redis backend needs the redis package (pip install redis)")
+            sys.exit(1)
+        return RedisQueueBackend(redis.Redis.from_url(args.redis_url), prefix=args.prefix)
+    return SQLiteQueueBackend(args.queue)
+
+
+def run_worker(backend, worker_id, scraper_script='main_scraper.py', batch_size=DEFAULT_BATCH_SIZE,
+               lease_seconds=DEFAULT_LEASE_SECONDS, delay=0, idle_exit=False, poll_interval=10):
+    """
+    Claim batches and scrape them until the queue is empty (idle_exit) or forever.
+    A background thread heartbeats the leases while URLs are being scraped.
+    """
+    stop = threading.Event()
+
+    def heartbeat_loop():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                backend.heartbeat(worker_id, lease_seconds)
+            except Exception as e:
+                print(f"Heartbeat failed: {e}")
+
+    heartbeat_thread = threading.Thread(target=heartbeat_loop, daemon=True)
+    heartbeat_thread.start()
+
+    processed = 0
+    try:
+        while True:
+            jobs = backend.claim(worker_id, batch_size, lease_seconds)
+            if not jobs:
+                if idle_exit:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"\n[{worker_id}] Claimed {len(jobs)} URL(s) from {url_domain(jobs[0][1])}")
+            deferrals = {}
+            for job_id, url in jobs:
+                if deferrals.get(job_id):
+                    time.sleep(DEFER_WAIT_SECONDS)
+                # Same safety-net kill as batch_scraper.py, the stage timeouts normally end a slow URL first
+                success, error, run_result = scrape_url(url, scraper_script=scraper_script, timeout=KILL_SECONDS)
+                # The domain's template is being relearned by another run, retry at the end of the batch
+                if run_result.get('status') == 'deferred' and deferrals.get(job_id, 0) < MAX_DEFERRALS:
+                    deferrals[job_id] = deferrals.get(job_id, 0) + 1
+                    jobs.append((job_id, url))
+                    print(f"[{worker_id}] Deferred: {url}")
+                    continue
+                if not backend.complete(job_id, worker_id, success, error):
+                    print(f"[{worker_id}] Lease lost, result ignored: {url}")
+                    continue
+                processed += 1
+                print(f"[{worker_id}] {'Done' if success else 'Failed'}: {url}" + (f" ({error})" if error else ""))
+                if delay:
+                    time.sleep(delay)
+    finally:
+        stop.set()
+
+    print(f"\n[{worker_id}] Queue empty, {processed} URL(s) processed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Shared lease-based job queue for scraping on several hosts',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python job_queue.py enqueue urls.txt
+  python job_queue.py worker                    (run on every host)
+  python job_queue.py worker --idle-exit --batch-size 50
+  python job_queue.py status
+  python job_queue.py worker --backend redis --redis-url redis://queue-host:6379/0
+        """
+    )
+
+    parser.add_argument('command', choices=['enqueue', 'worker', 'status', 'reclaim'])
+    parser.add_argument('input_file', nargs='?', help="URL file for enqueue (.gz files and '-' for stdin work too)")
+    parser.add_argument('--backend', choices=['sqlite', 'redis'], default='sqlite', help='Queue backend (default: sqlite)')
+    parser.add_argument('--queue', default='queue.db', help='SQLite queue file (default: queue.db)')
+    parser.add_argument('--redis-url', default='redis://localhost:6379/0', help='Redis URL for the redis backend')
+    parser.add_argument('--prefix', default='scraper', help='Key prefix for the redis backend')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}", help='Worker name')
+    parser.add_argument('--scraper', default='main_scraper.py', help='Path to main_scraper.py')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='URLs claimed per batch')
+    parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='Lease length in seconds')
+    parser.add_argument('--delay', type=int, default=0, help='Delay in seconds between URLs of a domain')
+    parser.add_argument('--idle-exit', action='store_true', help='Exit when the queue is empty')
+
+    args = parser.parse_args()
+    backend = open_backend(args)
+
+    if args.command == 'enqueue':
+        if not args.input_file:
+            parser.error('enqueue needs an input file')
+        if args.input_file != '-' and not os.path.exists(args.input_file):
+            print(f"Error: File '{args.input_file}' not found!")
+            sys.exit(1)
+        added = enqueue_stream(backend, iter_urls(args.input_file))
+        print(f"Enqueued {added} new URL(s)")
+    elif args.command == 'worker':
+        run_worker(backend, args.worker_id, scraper_script=args.scraper, batch_size=args.batch_size,
+                   lease_seconds=args.lease, delay=args.delay, idle_exit=args.idle_exit)
+    elif args.command == 'reclaim':
+        print(f"Reclaimed {backend.reclaim_expired()} expired lease(s)")
+    else:
+        for status, count in sorted(backend.stats().items()):
+            print(f"{status}: {count}")
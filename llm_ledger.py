@@ -0,0 +1,118 @@
+"""
+LLM usage ledger
+One append-only LLM_USAGE row per LLM call (domain, call type, tokens, latency, success),
+replacing the TOTAL_LLM_CALLS counter that used to be rewritten in .env by every run.
+
+Calls are buffered in memory and written in one transaction when the run ends, so a run
+costs a single short write lock however many calls it made, and concurrent runs never lose rows.
+
+Aggregates:
+    python llm_ledger.py                  (per-domain usage, most expensive first)
+    python llm_ledger.py --by type        (initial / retry / direct)
+    python llm_ledger.py --by day --since 2026-01-01
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime
+
+
+MODEL = "gpt-4o-mini"
+# USD per 1M tokens (input, output), used for the cost estimate in the aggregates
+PRICE_PER_MILLION = {"gpt-4o-mini": (0.15, 0.60)}
+
+GROUPINGS = {
+    'domain': "Domain",
+    'type': "CallType",
+    'day': "date(CalledAt)",
+}
+
+
+class LLMLedger:
+    def __init__(self, db_path='articles.db'):
+        self.db_path = db_path
+        self.pending = []
+
+    def record(self, domain, url, call_type, prompt_tokens, completion_tokens, latency_seconds, success,
+               model=MODEL):
+        self.pending.append((
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"), domain, url, call_type, model,
+            prompt_tokens, completion_tokens, int(latency_seconds * 1000), int(bool(success))
+        ))
+
+    def flush(self):
+        """Append the buffered calls in one transaction (safe to call again, it is a no-op when empty)."""
+        if not self.pending:
+            return
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO LLM_USAGE (CalledAt, Domain, URL, CallType, Model,
+                                           PromptTokens, CompletionTokens, LatencyMs, Success)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', self.pending)
+            self.pending = []
+        except sqlite3.Error as e:
+            print(f"Could not write LLM usage ledger: {e}")
+        finally:
+            conn.close()
+
+
+def total_calls(conn):
+    return conn.execute("SELECT COUNT(*) FROM LLM_USAGE").fetchone()[0]
+
+
+def usage_summary(conn, by='domain', since=None, limit=None):
+    """
+    Aggregate LLM_USAGE by domain, call type or day.
+
+    Returns:
+        list: dicts with key, calls, failures, prompt_tokens, completion_tokens,
+              avg_latency_ms and cost_usd, most expensive first
+    """
+    key = GROUPINGS[by]
+    query = f'''
+        SELECT {key}, Model, COUNT(*), SUM(1 - Success), SUM(PromptTokens), SUM(CompletionTokens), AVG(LatencyMs)
+        FROM LLM_USAGE
+        {"WHERE CalledAt >= ?" if since else ""}
+        GROUP BY {key}, Model
+    '''
+    summary = {}
+    for group, model, calls, failures, prompt, completion, latency in conn.execute(query, (since,) if since else ()):
+        input_price, output_price = PRICE_PER_MILLION.get(model, (0, 0))
+        row = summary.setdefault(group, {
+            'key': group, 'calls': 0, 'failures': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+            'latency_total': 0.0, 'cost_usd': 0.0
+        })
+        row['calls'] += calls
+        row['failures'] += failures or 0
+        row['prompt_tokens'] += prompt or 0
+        row['completion_tokens'] += completion or 0
+        row['latency_total'] += (latency or 0) * calls
+        row['cost_usd'] += ((prompt or 0) * input_price + (completion or 0) * output_price) / 1_000_000
+
+    rows = sorted(summary.values(), key=lambda r: (r['cost_usd'], r['calls']), reverse=True)
+    for row in rows:
+        row['avg_latency_ms'] = round(row.pop('latency_total') / row['calls'])
+        row['cost_usd'] = round(row['cost_usd'], 6)
+    return rows[:limit] if limit else rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Aggregate the LLM_USAGE ledger')
+    parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    parser.add_argument('--by', choices=list(GROUPINGS), default='domain', help='Group by (default: domain)')
+    parser.add_argument('--since', help='Only calls on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--limit', type=int, help='Show only the top N rows')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    rows = usage_summary(conn, by=args.by, since=args.since, limit=args.limit)
+    conn.close()
+
+    print(f"{args.by:<25} {'calls':>7} {'failed':>7} {'prompt tok':>11} {'compl tok':>10} {'avg ms':>8} {'cost $':>9}")
+    for row in rows:
+        print(f"{str(row['key']):<25} {row['calls']:>7} {row['failures']:>7} {row['prompt_tokens']:>11} "
+              f"{row['completion_tokens']:>10} {row['avg_latency_ms']:>8} {row['cost_usd']:>9.4f}")
+    print(f"\nTotal: {sum(r['calls'] for r in rows)} calls, ${sum(r['cost_usd'] for r in rows):.4f}")
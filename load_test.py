@@ -0,0 +1,181 @@
+"""
+End-to-end load test against synthetic sites (synthetic_sites.py), no real sites or LLM
+
+For every scale N x M (domains x articles per domain) a fresh articles.db is created in its own
+work directory, the synthetic sites and stub LLM are started, and batch_scraper.py runs over all
+N*M URLs unchanged, with the scraper processes pointed at the local server through HTTP_PROXY
+and OPENAI_BASE_URL. Reported per scale:
+    throughput        - URLs per second over the whole batch
+    LLM calls/article - from the LLM_USAGE ledger (and the stub's own count per call kind)
+    DB growth         - articles.db size (with WAL) and bytes per stored article
+    accuracy          - stored author/title/date matching the generated ground truth
+
+    python load_test.py --scales 5x20 20x20 50x40 --json load_test.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from synthetic_sites import start_server, article_fields, page_behaviour, HOST_PATTERN, ARTICLE_PATH
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_SCRIPTS = ['Create_Articles_Database.py', 'Create_Tracking_Domains_Database.py', 'Create_Feeds_Database.py',
+                  'Create_Repair_Queue_Database.py', 'Create_LLM_Usage_Database.py']
+
+
+def parse_scale(value):
+    try:
+        domains, articles = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"scale must look like 20x50 (domains x articles), got '{value}'")
+    return domains, articles
+
+
+def create_database(workdir):
+    for script in SCHEMA_SCRIPTS:
+        subprocess.run([sys.executable, os.path.join(PACKAGE_DIR, script)], cwd=workdir,
+                       stdout=subprocess.DEVNULL, check=True)
+
+
+def scraper_env(port):
+    """Environment that sends page fetches to the synthetic sites and LLM calls to the stub."""
+    env = dict(os.environ)
+    proxy = f"http://127.0.0.1:{port}"
+    env.update({
+        'HTTP_PROXY': proxy, 'http_proxy': proxy,
+        'NO_PROXY': '127.0.0.1,localhost', 'no_proxy': '127.0.0.1,localhost',
+        'OPENAI_BASE_URL': f"{proxy}/v1",
+        'OPENAI_API_KEY': 'synthetic',
+    })
+    return env
+
+
+def database_stats(db_path, seed):
+    """Row counts, LLM ledger totals and ground-truth accuracy of a finished run."""
+    conn = sqlite3.connect(db_path)
+    try:
+        llm_calls = dict(conn.execute("SELECT CallType, COUNT(*) FROM LLM_USAGE GROUP BY CallType").fetchall())
+        domains = conn.execute("SELECT COUNT(*) FROM TRACKING_DOMAINS").fetchone()[0]
+        stored = correct = 0
+        for url, author, date, title in conn.execute("SELECT URL, Author, Date, Title FROM ARTICLES"):
+            parts = urlsplit(url)
+            host_match, path_match = HOST_PATTERN.match(parts.hostname or ''), ARTICLE_PATH.match(parts.path)
+            if not host_match or not path_match:
+                continue
+            stored += 1
+            truth = article_fields(seed, int(host_match.group(1)), int(path_match.group(1)))
+            if (author, title, date) == (truth['author'], truth['title'], truth['published'].strftime("%B %d, %Y")):
+                correct += 1
+    finally:
+        conn.close()
+    db_bytes = sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix))
+    return {'stored': stored, 'correct': correct, 'llm_calls': llm_calls, 'tracked_domains': domains,
+            'db_bytes': db_bytes}
+
+
+def run_scale(domains, articles, seed=1, llm_latency=0.0, workdir=None, keep_output=False):
+    """Run batch_scraper.py over one synthetic N x M corpus and return its measurements."""
+    workdir = workdir or tempfile.mkdtemp(prefix=f'load_test_{domains}x{articles}_')
+    os.makedirs(workdir, exist_ok=True)
+    create_database(workdir)
+
+    server = start_server(domains, articles, seed=seed, llm_latency=llm_latency)
+    try:
+        urls_file = os.path.join(workdir, 'urls.txt')
+        with open(urls_file, 'w', encoding='utf-8') as f:
+            for url in server.urls():
+                f.write(url + "\n")
+
+        print(f"\n{domains} domains x {articles} articles ({domains * articles} URLs) in {workdir}")
+        started = time.monotonic()
+        with open(os.path.join(workdir, 'batch_output.txt'), 'w', encoding='utf-8') as output:
+            subprocess.run(
+                [sys.executable, os.path.join(PACKAGE_DIR, 'batch_scraper.py'), urls_file, '--delay', '0',
+                 '--scraper', os.path.join(PACKAGE_DIR, 'main_scraper.py'),
+                 '--log', os.path.join(workdir, 'batch.log')],
+                cwd=workdir, env=scraper_env(server.server_port),
+                stdout=None if keep_output else output, stderr=subprocess.STDOUT
+            )
+        seconds = time.monotonic() - started
+        counters = dict(server.counters)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = database_stats(os.path.join(workdir, 'articles.db'), seed)
+    url_count = domains * articles
+    unreachable = sum(page_behaviour(seed, d, a) == 'fail' for d in range(domains) for a in range(articles))
+    total_llm = sum(stats['llm_calls'].values())
+    return {
+        'domains': domains,
+        'articles': articles,
+        'urls': url_count,
+        'seconds': round(seconds, 1),
+        'urls_per_second': round(url_count / seconds, 2) if seconds else 0,
+        'stored': stats['stored'],
+        'expected_failures': unreachable,
+        'accuracy': round(stats['correct'] / stats['stored'], 3) if stats['stored'] else 0,
+        'llm_calls': total_llm,
+        'llm_calls_per_article': round(total_llm / stats['stored'], 3) if stats['stored'] else 0,
+        'llm_calls_by_type': stats['llm_calls'],
+        'stub_counters': counters,
+        'tracked_domains': stats['tracked_domains'],
+        'db_mb': round(stats['db_bytes'] / (1024 * 1024), 2),
+        'db_bytes_per_article': stats['db_bytes'] // stats['stored'] if stats['stored'] else 0,
+        'workdir': workdir,
+    }
+
+
+def print_report(results):
+    print(f"\n{'='*96}")
+    print("LOAD TEST RESULTS")
+    print(f"{'='*96}")
+    print(f"{'scale':>10} {'URLs':>7} {'seconds':>9} {'URLs/s':>8} {'stored':>7} {'accuracy':>9} "
+          f"{'LLM/article':>12} {'domains':>8} {'DB MB':>8} {'B/article':>10}")
+    for r in results:
+        print(f"{r['domains']:>4}x{r['articles']:<5} {r['urls']:>7} {r['seconds']:>9} {r['urls_per_second']:>8} "
+              f"{r['stored']:>7} {r['accuracy']:>9.1%} {r['llm_calls_per_article']:>12} {r['tracked_domains']:>8} "
+              f"{r['db_mb']:>8} {r['db_bytes_per_article']:>10}")
+    for r in results:
+        print(f"\n{r['domains']}x{r['articles']}: LLM calls by type {r['llm_calls_by_type']}, "
+              f"stub {r['stub_counters']}, expected failures {r['expected_failures']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Run batch_scraper.py end to end against synthetic sites and a stub LLM',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python load_test.py --scales 5x20
+  python load_test.py --scales 5x20 20x20 50x40 --json load_test.json
+  python load_test.py --scales 10x10 --llm-latency 1.5 --keep-output
+        """
+    )
+    parser.add_argument('--scales', type=parse_scale, nargs='+', default=[(5, 20)],
+                        help='Corpus sizes as DOMAINSxARTICLES (default: 5x20)')
+    parser.add_argument('--seed', type=int, default=1, help='Content seed (default: 1)')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds the stub LLM waits per call')
+    parser.add_argument('--workdir', help='Base directory for the per-scale work directories (default: temp)')
+    parser.add_argument('--keep-output', action='store_true', help='Show batch_scraper.py output')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    for domains, articles in args.scales:
+        workdir = os.path.join(args.workdir, f"{domains}x{articles}") if args.workdir else None
+        results.append(run_scale(domains, articles, args.seed, args.llm_latency, workdir, args.keep_output))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
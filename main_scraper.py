@@ -1,16 +1,29 @@
-import requests
-import tldextract
 import sqlite3
-from lxml import html
-from dateutil import parser
-import re
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import sys
+import time
+from openai import OpenAI, APIError, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 import json
 from dotenv import load_dotenv
 import os
-from keyword_matcher import compare_texts
-from LLM_XPATH_GENERATION import generate_initial_xpaths, retry_failed_xpaths
+import atexit
+import requests
+from field_validator import validate_records, check_field, failed_fields_and_feedback, passed_fields, FIELDS
+from LLM_XPATH_GENERATION import generate_initial_xpaths, retry_failed_xpaths, last_usage
+from llm_ledger import LLMLedger, total_calls
+from structured_metadata import extract_structured_metadata
+from embedded_state import classify_page, extract_embedded_article
+from template_fingerprint import (template_fingerprint, fingerprint_similarity, load_fingerprint, claim_relearn,
+                                  release_relearn, save_fingerprint, SHIFT_SIMILARITY)
+from xpath_evaluator import evaluate_candidates, extract_content_with_xpaths, split_xpaths
+from xpath_inducer import induce_xpaths, known_authors
+from domain_resolver import resolve_domain
+from recrawl_scheduler import content_hash, load_state, next_state, record_unchanged
+from published_at import published_timestamp
+from page_loader import load_page, clean_html, peak_rss_mb, PageTooLarge, StageTimeout, FetchPolicy
+from profiler import profiler_from_env
+
+# SAMPLING PROFILER, ONLY RUNS UNDER batch_scraper.py --profile
+profiler = profiler_from_env()
 
 
 #SET TO FALSE IF LLM USAGE TOO HIGH, ENSURES ALL FIELDS ARE FETCHED IN CASE NO XPATH WORKS
@@ -21,132 +34,188 @@ retry_count = 0
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
+#PER-WORKER MEMORY BUDGET IN MB (0 = UNLIMITED), ANY BUDGET SWITCHES ON LOW-MEMORY PAGE PROCESSING
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", 0))
+LOW_MEMORY_MODE = MEMORY_BUDGET_MB > 0
+
+#PER-URL LATENCY AND COST BUDGET (0 = NO LIMIT), CHECKED BETWEEN STAGES
+#WHEN CLOSE TO EXHAUSTED, XPATH RETRIES ARE SKIPPED FOR THE CHEAPEST REMAINING OPTION,
+#OR PARTIAL RESULTS ARE STORED AND THE URL IS QUEUED IN REPAIR_QUEUE
+URL_DEADLINE_SECONDS = float(os.getenv("URL_DEADLINE_SECONDS", 0))
+MAX_LLM_CALLS_PER_URL = int(os.getenv("MAX_LLM_CALLS_PER_URL", 0))
+DEFAULT_LLM_CALL_SECONDS = 15  # expected LLM latency until a call has been timed
+url_started = time.monotonic()
+llm_seconds = []
+budget_exhausted = False
+
+#STAGE TIMEOUTS IN SECONDS (0 = NO LIMIT) AND FETCH RETRIES, A STAGE THAT RUNS OVER IS REPORTED BY NAME
+#TRANSIENT FETCH ERRORS (CONNECTION ERRORS, TIMEOUTS, 429/5XX) ARE RETRIED WITH EXPONENTIAL BACKOFF
+FETCH_POLICY = FetchPolicy(
+    connect_timeout=float(os.getenv("FETCH_CONNECT_TIMEOUT", 10)),
+    read_timeout=float(os.getenv("FETCH_READ_TIMEOUT", 20)),
+    total_timeout=float(os.getenv("FETCH_TOTAL_TIMEOUT", 45)),
+    retries=int(os.getenv("FETCH_RETRIES", 2)),
+    backoff=float(os.getenv("FETCH_BACKOFF", 1.0))
+)
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", 20))
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 60))
+timed_out_stage = None
+
+#LLM RATE LIMITS, CONNECTION ERRORS AND 5XX ARE RETRIED (WITHIN THE URL DEADLINE) WITH EXPONENTIAL BACKOFF,
+#AN LLM ERROR THAT PERSISTS ENDS LLM USE FOR THE URL LIKE A TIMEOUT
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", 2))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", 1.0))
+llm_error = None
+
+#FIELD SUBSET (COMMA-SEPARATED, EMPTY = ALL FIELDS), E.G. title,date,time FOR HEADLINE MONITORING
+#ONLY THESE FIELDS ARE EXTRACTED, VALIDATED, LEARNED AND ASKED FROM THE LLM, THE OTHERS STAY AS STORED
+requested_fields = {field.strip().lower() for field in os.getenv("SCRAPE_FIELDS", "").split(",") if field.strip()}
+if requested_fields - set(FIELDS):
+    print(f"Unknown SCRAPE_FIELDS: {sorted(requested_fields - set(FIELDS))} (choose from {FIELDS})")
+    sys.exit(2)
+SCRAPE_FIELDS = [field for field in FIELDS if field in requested_fields] or FIELDS
+SUBSET_MODE = SCRAPE_FIELDS != FIELDS
+# Without content the article body is never read: no shell classification, no paragraphs in the LLM HTML
+CONTENT_REQUESTED = 'content' in SCRAPE_FIELDS
+# A content XPath is only learned after the title/content overlap check, which needs the title
+LEARN_CONTENT_XPATH = 'title' in SCRAPE_FIELDS
+ARTICLE_COLUMNS = {'author': 'Author', 'time': 'Time', 'date': 'Date', 'title': 'Title', 'content': 'Content'}
+
 #LLM INITIALISATION
 # =============================================== 
-client = OpenAI(api_key=api_key)
-
-# Load persistent LLM call counter from environment
-llm_call_count = int(os.getenv("TOTAL_LLM_CALLS", 0))
-starting_count = llm_call_count
-print(f"Starting LLM call count: {llm_call_count}")
+# No SDK retries: a slow LLM call ends at LLM_CALL_TIMEOUT and the URL keeps its partial data,
+# transient errors are retried by timed_llm_call() within the URL deadline
+client = OpenAI(api_key=api_key, timeout=LLM_CALL_TIMEOUT or None, max_retries=0)
+
+# Every LLM call is appended to the LLM_USAGE ledger, written once when the run exits
+llm_call_count = 0
+ledger = LLMLedger('articles.db')
+atexit.register(ledger.flush)
+
+def apply_structured_metadata(metadata, author_text, date_cleaned, time_cleaned, title_text, content_text):
+    """
+    Overwrite XPath results with the fields already filled from structured metadata.
+    JSON-LD articleBody is only a fallback, the page content XPath is preferred when it works.
+    """
+    if check_field('content', content_text) is not None:
+        content_text = metadata.get('content', content_text)
+    return (
+        metadata.get('author', author_text),
+        metadata.get('date', date_cleaned),
+        metadata.get('time', time_cleaned),
+        metadata.get('title', title_text),
+        content_text
+    )
 
-def extract_datetime_from_elements(elements, field_name="datetime"):
-    """Extract date/time from elements, checking datetime attribute first."""
-    if not elements:
-        return "", ""
-    
-    # Strategy 1: Check datetime/content attribute (most reliable)
-    for elem in elements:
-        if hasattr(elem, 'get'):
-            # Check both 'datetime' (for <time> tags) and 'content' (for <meta> tags)
-            datetime_str = elem.get('datetime') or elem.get('content')
-            if datetime_str:
-                try:
-                    dt = parser.parse(datetime_str)
-                    return dt.strftime("%B %d, %Y"), dt.strftime("%I:%M %p IST")
-                except:
-                    pass
-    
-    # Strategy 2: Parse text content
-    text_content = ' '.join([elem.text_content().strip() for elem in elements if hasattr(elem, 'text_content')])
-    if not text_content.strip():
-        return "", ""
-    
-    # Clean text (keywords_to_remove is built-in here)
-    keywords_to_remove = ["updated", "published", "posted", "last updated", "modified"]
-    cleaned_text = text_content
-    for keyword in keywords_to_remove:
-        cleaned_text = re.sub(rf'\b{keyword}\b', "", cleaned_text, flags=re.IGNORECASE)
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-    
+def mark_stage(name):
+    """Tell the profiler (if running) which pipeline stage starts now, returns the previous stage."""
+    return profiler.set_stage(name) if profiler else None
+
+def get_cleaned_html():
+    """Clean the HTML on first LLM use only, then release the raw page text."""
+    global cleaned_html, page_text
+    if cleaned_html is None:
+        previous_stage = mark_stage('clean_html')
+        print("\nCleaning up HTML...")
+        cleaned_html = clean_html(tree, page_text, keep_body=CONTENT_REQUESTED)
+        page_text = None
+        print("HTML cleaned")
+        mark_stage(previous_stage)
+    return cleaned_html
+
+def induce_locally(fields):
+    """Try local XPath induction (no network) for `fields`, returns field -> XPath for those it solved."""
+    induced = induce_xpaths(tree, fields, authors=known_authors(conn, domain), resolved=resolved_nodes)
+    if induced:
+        print(f"XPaths induced locally (no LLM) for: {sorted(induced)}")
+    return induced
+
+def requested_only(values):
+    """Keep the requested fields of a field -> value dict (all of them outside field-subset mode)."""
+    return {field: value for field, value in values.items() if field in SCRAPE_FIELDS}
+
+def retry_fits_deadline(delay):
+    """True if waiting `delay` seconds and repeating an LLM call still fits the URL deadline."""
+    if not URL_DEADLINE_SECONDS:
+        return True
+    expected = sum(llm_seconds) / len(llm_seconds) if llm_seconds else DEFAULT_LLM_CALL_SECONDS
+    return URL_DEADLINE_SECONDS - (time.monotonic() - url_started) >= delay + expected
+
+def timed_llm_call(call_type, llm_function, **kwargs):
+    """
+    Run one LLM helper, timing it for the budget estimate and recording it in the ledger.
+    Rate limits, connection errors and 5xx answers are retried up to LLM_RETRIES times.
+    A call that hits LLM_CALL_TIMEOUT or keeps failing returns {} and ends LLM use for this URL.
+    """
+    global llm_call_count, timed_out_stage, llm_error, budget_exhausted
+    llm_call_count += 1
+    previous_stage = mark_stage('llm')
+    last_usage.update(prompt_tokens=0, completion_tokens=0)
+    started = time.monotonic()
+    response = None
     try:
-        dt = parser.parse(cleaned_text, fuzzy=True)
-        return dt.strftime("%B %d, %Y"), dt.strftime("%I:%M %p IST")
-    except:
-        return text_content, ""
-
-def extract_content_with_xpaths(tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath):
-    # Extract author
-    author = tree.xpath(author_xpath)
-    author_text = ' '.join([
-        a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-        for a in author
-    ]) if author else ""
-    
-    # Extract date and time
-    date_elements = tree.xpath(date_xpath)
-    time_elements = tree.xpath(time_xpath)
-    
-    # Check if date and time XPaths are the same
-    if date_xpath == time_xpath:
-        date_cleaned, time_cleaned = extract_datetime_from_elements(date_elements, "datetime")
-    else:
-        date_result = extract_datetime_from_elements(date_elements, "date")
-        time_result = extract_datetime_from_elements(time_elements, "time")
-        date_cleaned = date_result[0] if date_result[0] else ""
-        time_cleaned = time_result[1] if time_result[1] else time_result[0]
-    
-    # Extract title - handle both elements and attribute values
-    titles = tree.xpath(title_xpath)
-    title_text = ' '.join([
-        a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-        for a in titles
-    ]) if titles else ""
-    
-    # Extract content
-    content = tree.xpath(content_xpath)
-    content_text = ' '.join([
-        a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-        for a in content
-    ]) if content else ""
-    
-    return author_text, date_cleaned, time_cleaned, title_text, content_text
+        for attempt in range(LLM_RETRIES + 1):
+            try:
+                response = llm_function(**kwargs)
+                return response
+            except APITimeoutError:
+                timed_out_stage = f"llm_{call_type}"
+                budget_exhausted = True
+                print(f"\nStage '{timed_out_stage}' timed out after {LLM_CALL_TIMEOUT}s, no further LLM calls for this URL")
+                return {}
+            except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                delay = LLM_BACKOFF * (2 ** attempt)
+                if attempt < LLM_RETRIES and retry_fits_deadline(delay):
+                    print(f"\nLLM error ({e.__class__.__name__}), retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                failure = e
+            except APIError as e:
+                failure = e  # not transient (bad request, authentication ...), not retried
+            llm_error = f"llm_{call_type}: {failure.__class__.__name__}"
+            budget_exhausted = True
+            print(f"\nLLM call failed ({llm_error}), no further LLM calls for this URL")
+            return {}
+    finally:
+        elapsed = time.monotonic() - started
+        llm_seconds.append(elapsed)
+        ledger.record(domain, url, call_type, last_usage['prompt_tokens'], last_usage['completion_tokens'],
+                      elapsed, success=bool(response) and any(response.values()))
+        mark_stage(previous_stage)
+
+def llm_budget_allows(calls=1):
+    """True if `calls` more LLM calls fit in this URL's call budget and deadline (never on client-rendered shells)."""
+    if client_rendered or timed_out_stage or llm_error:
+        return False
+    if MAX_LLM_CALLS_PER_URL and llm_call_count + calls > MAX_LLM_CALLS_PER_URL:
+        return False
+    if URL_DEADLINE_SECONDS:
+        expected = sum(llm_seconds) / len(llm_seconds) if llm_seconds else DEFAULT_LLM_CALL_SECONDS
+        remaining = URL_DEADLINE_SECONDS - (time.monotonic() - url_started)
+        if remaining < expected * calls:
+            return False
+    return True
+
+def llm_skip_reason():
+    if client_rendered:
+        return "client-rendered page, no article text in the HTML"
+    if timed_out_stage:
+        return f"LLM timed out ({timed_out_stage})"
+    if llm_error:
+        return f"LLM call failed ({llm_error})"
+    return "URL budget exhausted"
+
+def write_run_result(status, **details):
+    """Report this run as JSON to the file batch_scraper.py passes in SCRAPER_RESULT_FILE."""
+    result_file = os.getenv("SCRAPER_RESULT_FILE")
+    if not result_file:
+        return
+    if profiler:
+        profiler.stop()
+        details['profile'] = profiler.report()
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'status': status, 'peak_rss_mb': round(peak_rss_mb(), 1), **details}, f)
 
-def validate_extracted_fields(author_text, date_cleaned, time_cleaned, title_text, content_text):
-    failed_fields = []
-    feedback = {}
-    
-    # Check author
-    if not author_text or author_text.strip() == "":
-        failed_fields.append('author')
-        feedback['author'] = "Empty Author field"
-    elif len(author_text) > 25:
-        failed_fields.append('author')
-        feedback['author'] = 'Author length too big'
-    
-    # Check date
-    if not date_cleaned or date_cleaned.strip() == "":
-        failed_fields.append('date')
-        feedback['date'] = "Empty date field"
-    
-    # Check time
-    if not time_cleaned or time_cleaned.strip() == "":
-        failed_fields.append('time')
-        feedback['time'] = "Empty time field"
-    
-    # Check title
-    if not title_text or title_text.strip() == "":
-        failed_fields.append('title')
-        feedback['title'] = "Empty title field"
-    elif len(title_text.strip()) < 10:
-        failed_fields.append('title')
-        feedback['title'] = f"Title too short (only {len(title_text)} chars)"
-    
-    # Check content
-    if not content_text or content_text.strip() == "":
-        failed_fields.append('content')
-        feedback['content'] = "Empty content field"
-    elif len(content_text.strip()) < 100:
-        failed_fields.append('content')
-        feedback['content'] = f"Content too short (only {len(content_text)} chars)"
-    
-    # Check title-content match
-    match_result = compare_texts(title_text, content_text, threshold=50, verbose=True)
-    if match_result == 0:
-        failed_fields.append('Content')
-        feedback['Title Content'] = "Title and Content Do not match"
-    
-    return failed_fields, feedback
 
 
 
@@ -155,174 +224,178 @@ def validate_extracted_fields(author_text, date_cleaned, time_cleaned, title_tex
 # ======================================
 url = input("Enter a URL: ").strip()
 
-extracted = tldextract.extract(url)
-domain = extracted.domain
+# Resolved offline from the bundled suffix snapshot (DOMAIN_KEY picks the key, see domain_resolver.py)
+domain = resolve_domain(url)
 print("\nExtracted Domain- " + domain)
-response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+if SUBSET_MODE:
+    print(f"Field subset: {SCRAPE_FIELDS}, other stored fields are left untouched")
 
 conn = sqlite3.connect('articles.db')
 cursor = conn.cursor()
 
-# Clean HTML for potential LLM usage
+# FETCH AND PARSE PAGE
 # ===================================
-print("\nCleaning up HTML...")
-soup = BeautifulSoup(response.text, 'html.parser')
-
-# Remove unnecessary tags to save tokens
-for script in soup.find_all('script'):
-    script.decompose()
-for style in soup.find_all('style'):
-    style.decompose()
-for iframe in soup.find_all('iframe'):
-    iframe.decompose()
-for tag in soup.find_all(['nav', 'header', 'footer', 'aside']):
-    tag.decompose()
-
-cleaned_html = str(soup)
-print("HTML cleaned")
-
-tree = html.fromstring(response.content)
+mark_stage('fetch')
+# Encoding resolved on earlier pages of the domain, used when a page declares no charset
+known_encoding_row = cursor.execute("SELECT Encoding FROM TRACKING_DOMAINS WHERE Domain = ?", (domain,)).fetchone()
+known_encoding = known_encoding_row[0] if known_encoding_row else None
+try:
+    # Pages may expand ~8x once parsed, so the raw body gets an eighth of the budget
+    tree, page_text, page_encoding, streamed_script_bytes = load_page(
+        url,
+        low_memory=LOW_MEMORY_MODE,
+        max_bytes=MEMORY_BUDGET_MB * 1024 * 1024 // 8 if LOW_MEMORY_MODE else None,
+        policy=FETCH_POLICY,
+        parse_timeout=PARSE_TIMEOUT,
+        known_encoding=known_encoding
+    )
+except PageTooLarge as e:
+    print(f"\nSkipping page: {e}")
+    write_run_result('too_large')
+    sys.exit(3)
+except StageTimeout as e:
+    print(f"\n{e}")
+    write_run_result('timeout', timed_out_stage=e.stage)
+    sys.exit(5)
+except requests.exceptions.RequestException as e:
+    print(f"\nFetch failed after {FETCH_POLICY.retries} retries: {e}")
+    write_run_result('fetch_failed', error=str(e))
+    sys.exit(1)
 print("HTML tree created for XPath testing")
 
+if LOW_MEMORY_MODE and peak_rss_mb() > MEMORY_BUDGET_MB:
+    print(f"\nMemory budget exceeded ({peak_rss_mb():.0f} MB > {MEMORY_BUDGET_MB} MB), skipping page")
+    write_run_result('memory_budget_exceeded')
+    sys.exit(3)
+
+# Clean HTML for potential LLM usage, built lazily by get_cleaned_html()
+cleaned_html = None
+
+# STRUCTURED METADATA (JSON-LD / OpenGraph / meta tags) - NO LLM NEEDED
+# =====================================================================
+mark_stage('metadata')
+metadata = extract_structured_metadata(tree)
+print(f"Fields filled from structured metadata: {sorted(metadata)}")
+
+# CLIENT-RENDERED SHELLS - READ THE EMBEDDED STATE JSON, NEVER CALL THE LLM
+# =========================================================================
+# Classification walks all body text and scripts, a field subset without content skips it
+page_kind = classify_page(tree, streamed_script_bytes) if CONTENT_REQUESTED else None
+client_rendered = bool(page_kind and page_kind['shell'])
+if client_rendered:
+    print(f"\nClient-rendered page detected ({page_kind['text_chars']} text chars, "
+          f"{page_kind['paragraphs']} paragraphs, {page_kind['script_bytes'] // 1024} KB scripts, "
+          f"{page_kind['state_blobs']} state blob(s))")
+    embedded = extract_embedded_article(tree)
+    for field, value in embedded.items():
+        metadata.setdefault(field, value)
+    print(f"Fields filled from embedded state JSON: {sorted(embedded)}")
+
+# RECRAWL - AN ARTICLE WHOSE TEXT HAS NOT CHANGED SINCE ITS LAST SCRAPE IS NOT PROCESSED AGAIN
+# ============================================================================================
+page_hash = content_hash(tree, metadata)
+recrawl_state = load_state(conn, domain, url)
+in_repair_queue = cursor.execute("SELECT 1 FROM REPAIR_QUEUE WHERE URL = ?", (url,)).fetchone() is not None
+if recrawl_state and recrawl_state['ContentHash'] == page_hash and not in_repair_queue:
+    recrawl_values = record_unchanged(conn, domain, url, recrawl_state, page_hash)
+    next_hours = (recrawl_values['NextCheck'] - recrawl_values['LastChecked']) / 3600
+    print(f"\nArticle unchanged since the last scrape, nothing to update (next check in {next_hours:.1f}h)")
+    write_run_result('unchanged', domain=domain)
+    conn.close()
+    sys.exit(0)
+
 #CHECKING IF DOMAIN ALREADY EXISTS IN DATABASE
 # ===============================================
 
+mark_stage('xpath')
 cursor.execute("SELECT * FROM TRACKING_DOMAINS WHERE Domain = ?", (domain,))
 column_names = [description[0] for description in cursor.description]
 print("\nColumn names:", column_names)
 result = cursor.fetchone()
 
+# XPath -> matched nodes for this page, so no expression is evaluated twice
+resolved_nodes = {}
+
+# Structural fingerprint of this page, compared with the domain's stored template
+page_fingerprint = template_fingerprint(tree)
+stored_fingerprint = []
+relearning = False
+
 if result:
     print(f"Domain '{domain}' already exists in database!")
     
     # Fetch pipe-separated XPaths from TRACKING_DOMAINS
     # Structure: Domain, TotalFailures, AuthorXPath, TitleXPath, DateXPath, TimeXPath, ContentXPath
-    author_xpaths_str = result[2] if result[2] else ""
-    title_xpaths_str = result[3] if result[3] else ""
-    date_xpaths_str = result[4] if result[4] else ""
-    time_xpaths_str = result[5] if result[5] else ""
-    content_xpaths_str = result[6] if result[6] else ""
+    candidates = {
+        'author': split_xpaths(result[2]),
+        'title': split_xpaths(result[3]),
+        'date': split_xpaths(result[4]),
+        'time': split_xpaths(result[5]),
+        'content': split_xpaths(result[6])
+    }
     
     print("\nTrying existing XPaths from database...")
     
-    # Initialize variables for working XPaths
-    author_xpath = None
-    title_xpath = None
-    date_xpath = None
-    time_xpath = None
-    content_xpath = None
-    
-    # Try each Author XPath until one works
-    if author_xpaths_str:
-        author_xpaths_list = [x.strip() for x in author_xpaths_str.split("|")]
-        for xpath in author_xpaths_list:
-            try:
-                author_result = tree.xpath(xpath)
-                author_text_test = ' '.join([
-                    a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-                    for a in author_result
-                ]) if author_result else ""
-                
-                # Quick validation
-                if author_text_test and author_text_test.strip() != "" and len(author_text_test) <= 25:
-                    author_xpath = xpath
-                    # print(f"Found working Author XPath: {xpath}")
-                    break
-            except:
-                continue
-    
-    # Try each Title XPath until one works
-    if title_xpaths_str:
-        title_xpaths_list = [x.strip() for x in title_xpaths_str.split("|")]
-        for xpath in title_xpaths_list:
-            try:
-                title_result = tree.xpath(xpath)
-                title_text_test = ' '.join([
-                    a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-                    for a in title_result
-                ]) if title_result else ""
-                
-                # Quick validation
-                if title_text_test and title_text_test.strip() != "" and len(title_text_test.strip()) >= 10:
-                    title_xpath = xpath
-                    # print(f"Found working Title XPath: {xpath}")
-                    break
-            except:
-                continue
-    
-    # Try each Date XPath until one works
-    if date_xpaths_str:
-        date_xpaths_list = [x.strip() for x in date_xpaths_str.split("|")]
-        for xpath in date_xpaths_list:
-            try:
-                date_result = tree.xpath(xpath)
-                date_text_test, _ = extract_datetime_from_elements(date_result, "date")
-                
-                # Quick validation
-                if date_text_test and date_text_test.strip() != "":
-                    date_xpath = xpath
-                    # print(f"Found working Date XPath: {xpath}")
-                    break
-            except:
-                continue
-    
-    # Try each Time XPath until one works
-    if time_xpaths_str:
-        time_xpaths_list = [x.strip() for x in time_xpaths_str.split("|")]
-        for xpath in time_xpaths_list:
-            try:
-                time_result = tree.xpath(xpath)
-                _, time_text_test = extract_datetime_from_elements(time_result, "time")
-                
-                # Quick validation
-                if time_text_test and time_text_test.strip() != "":
-                    time_xpath = xpath
-                    # print(f"Found working Time XPath: {xpath}")
-                    break
-            except:
-                continue
-    
-    # Try each Content XPath until one works
-    if content_xpaths_str:
-        content_xpaths_list = [x.strip() for x in content_xpaths_str.split("|")]
-        for xpath in content_xpaths_list:
-            try:
-                content_result = tree.xpath(xpath)
-                content_text_test = ' '.join([
-                    a.text_content().strip() if hasattr(a, 'text_content') else str(a).strip() 
-                    for a in content_result
-                ]) if content_result else ""
-                
-                # Quick validation
-                if content_text_test and len(content_text_test.strip()) >= 100:
-                    content_xpath = xpath
-                    # print(f"Found working Content XPath: {xpath}")
-                    break
-            except:
-                continue
+    # Resolve every field's candidates in one evaluation, keeping the matched node sets
+    # JSON-LD articleBody is only a content fallback, so content candidates are always tried
+    working_xpaths = evaluate_candidates(
+        tree, requested_only(candidates), skip_fields=[f for f in metadata if f != 'content'], resolved=resolved_nodes
+    )
+    author_xpath = working_xpaths.get('author')
+    title_xpath = working_xpaths.get('title')
+    date_xpath = working_xpaths.get('date')
+    time_xpath = working_xpaths.get('time')
+    content_xpath = working_xpaths.get('content')
     
     # Check if any fields still don't have working XPaths
     fields_needing_llm = []
-    if not author_xpath:
+    if not author_xpath and 'author' not in metadata:
         fields_needing_llm.append('author')
         # print("No working Author XPath found")
-    if not title_xpath:
+    if not title_xpath and 'title' not in metadata:
         fields_needing_llm.append('title')
         # print("No working Title XPath found")
-    if not date_xpath:
+    if not date_xpath and 'date' not in metadata:
         fields_needing_llm.append('date')
         # print("No working Date XPath found")
-    if not time_xpath:
+    if not time_xpath and 'time' not in metadata:
         fields_needing_llm.append('time')
         # print("No working Time XPath found")
-    if not content_xpath:
+    if not content_xpath and 'content' not in metadata:
         fields_needing_llm.append('content')
         # print("No working Content XPath found")
+    fields_needing_llm = [field for field in fields_needing_llm if field in SCRAPE_FIELDS]
+    
+    # TEMPLATE-CHANGE DETECTION - ONE RUN RELEARNS A REDESIGNED DOMAIN, THE OTHERS WAIT
+    stored_fingerprint = load_fingerprint(dict(zip(column_names, result)).get('TemplateFingerprint'))
+    if stored_fingerprint and fields_needing_llm and not client_rendered:
+        similarity = fingerprint_similarity(stored_fingerprint, page_fingerprint)
+        if similarity < SHIFT_SIMILARITY:
+            print(f"\nTemplate shift detected for '{domain}' (similarity {similarity:.2f})")
+            if claim_relearn(conn, domain):
+                relearning = True
+                print("Relearning XPaths for the new template, stale candidates will be replaced")
+            else:
+                print("Another run is relearning this domain, deferring URL")
+                write_run_result('deferred', domain=domain)
+                sys.exit(4)
+    
+    # LOCAL XPATH INDUCTION - THE LLM ONLY GETS THE FIELDS INDUCTION CANNOT SOLVE
+    induced = induce_locally(fields_needing_llm) if fields_needing_llm and not client_rendered else {}
+    author_xpath = author_xpath or induced.get('author')
+    title_xpath = title_xpath or induced.get('title')
+    date_xpath = date_xpath or induced.get('date')
+    time_xpath = time_xpath or induced.get('time')
+    content_xpath = content_xpath or induced.get('content')
+    fields_for_llm = [field for field in fields_needing_llm if field not in induced]
+    
+    if fields_for_llm and not llm_budget_allows():
+        print(f"\n{llm_skip_reason()}, not asking the LLM for: {fields_for_llm}")
+        budget_exhausted = True
     
     # If any fields need XPaths, call LLM for ONLY those fields
-    if fields_needing_llm:
+    elif fields_for_llm:
         # print(f"\nCalling LLM for fields: {fields_needing_llm}")
-        llm_call_count += 1 
         
         # Build current_xpaths dict with what we have
         current_xpaths = {
@@ -334,14 +407,16 @@ if result:
         }
         
         # Create feedback for failed fields
-        feedback = {field: f"No working XPath found for {field}" for field in fields_needing_llm}
+        feedback = {field: f"No working XPath found for {field}" for field in fields_for_llm}
         
         # Call LLM for only the failed fields
-        new_xpaths = retry_failed_xpaths(
-            failed_fields=fields_needing_llm,
+        new_xpaths = timed_llm_call(
+            'relearn' if relearning else 'initial',
+            retry_failed_xpaths,
+            failed_fields=fields_for_llm,
             feedback=feedback,
-            current_xpaths=current_xpaths,
-            cleaned_html=cleaned_html,
+            current_xpaths=requested_only(current_xpaths),
+            cleaned_html=get_cleaned_html(),
             client=client
         )
         
@@ -363,11 +438,37 @@ if result:
             # print(f"LLM generated Content XPath: {content_xpath}")
 
 else:
-    print(f"\nDomain '{domain}' not found in database, Calling LLM to Generate new XPATH's and add into database")
-    
-    # Generate XPaths using LLM helper function
-    xpaths = generate_initial_xpaths(cleaned_html, client)
-    llm_call_count += 1 
+    print(f"\nDomain '{domain}' not found in database")
+
+    # Local induction first, the LLM only generates XPaths when a field is still missing
+    induced = {} if client_rendered else induce_locally([field for field in SCRAPE_FIELDS if field not in metadata])
+    fields_for_llm = [field for field in SCRAPE_FIELDS if field not in metadata and field not in induced]
+
+    if not fields_for_llm:
+        # Structured metadata and local induction cover every field, no LLM needed
+        print("All fields available from structured metadata or local induction, skipping LLM XPath generation")
+        xpaths = {}
+    elif not llm_budget_allows():
+        print(f"{llm_skip_reason()}, skipping LLM XPath generation")
+        budget_exhausted = True
+        xpaths = {}
+    elif SUBSET_MODE:
+        # A field subset only asks the LLM for the requested fields it still misses
+        print(f"Calling LLM to generate XPaths for: {fields_for_llm}")
+        xpaths = timed_llm_call(
+            'initial',
+            retry_failed_xpaths,
+            failed_fields=fields_for_llm,
+            feedback={field: f"No working XPath found for {field}" for field in fields_for_llm},
+            current_xpaths=requested_only({field: induced.get(field, "") for field in FIELDS}),
+            cleaned_html=get_cleaned_html(),
+            client=client
+        )
+    else:
+        print("Calling LLM to Generate new XPATH's and add into database")
+        # Generate XPaths using LLM helper function
+        xpaths = timed_llm_call('initial', generate_initial_xpaths, cleaned_html=get_cleaned_html(), client=client)
+    xpaths = {**xpaths, **induced}
 
     author_xpath = xpaths.get("author", "")
     time_xpath = xpaths.get("time", "")
@@ -376,24 +477,35 @@ else:
     content_xpath = xpaths.get("content", "")
 
     # INSERT into TRACKING_DOMAINS (not XPATHS)
-    cursor.execute('''
-        INSERT INTO TRACKING_DOMAINS (Domain, TotalFailures, AuthorXPath, TitleXPath, DateXPath, TimeXPath, ContentXPath)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (domain, 0, author_xpath, title_xpath, date_xpath, time_xpath, content_xpath))
-    
-    conn.commit()
-    print("New domain added to TRACKING_DOMAINS")
+    # A client-rendered shell teaches nothing about the domain's HTML template, so it is not tracked yet
+    if client_rendered:
+        print("Client-rendered page, domain not added to TRACKING_DOMAINS")
+    else:
+        cursor.execute('''
+            INSERT INTO TRACKING_DOMAINS (Domain, TotalFailures, AuthorXPath, TitleXPath, DateXPath, TimeXPath, ContentXPath)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (domain, 0, author_xpath, title_xpath, date_xpath, time_xpath,
+              content_xpath if LEARN_CONTENT_XPATH else None))
+        
+        conn.commit()
+        print("New domain added to TRACKING_DOMAINS")
 
 
+mark_stage('extract')
 author_text, date_cleaned, time_cleaned, title_text, content_text = extract_content_with_xpaths(
-    tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath
+    tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath, resolved=resolved_nodes
+)
+author_text, date_cleaned, time_cleaned, title_text, content_text = apply_structured_metadata(
+    metadata, author_text, date_cleaned, time_cleaned, title_text, content_text
 )
 
 # Validate whether the Fields are correct or not
+mark_stage('validate')
 print("\nChecking whether fields are correct or not-\n")
-failed_fields, feedback = validate_extracted_fields(
-    author_text, date_cleaned, time_cleaned, title_text, content_text
-)
+validation = validate_records([{
+    'author': author_text, 'date': date_cleaned, 'time': time_cleaned, 'title': title_text, 'content': content_text
+}], fields=SCRAPE_FIELDS, verbose=True)[0]
+failed_fields, feedback = failed_fields_and_feedback(validation)
 
 print(failed_fields, feedback)
 
@@ -404,10 +516,20 @@ direct_extraction_used = False  # Track if fallback was needed
 
 while failed_fields and retry_count < MAX_RETRIES:
 
+    # Keep room for the direct extraction when another XPath retry no longer fits the budget
+    if not llm_budget_allows(2 if ENABLE_DIRECT_LLM_FALLBACK else 1):
+        print(f"\n{llm_skip_reason()}, skipping further XPath retries")
+        budget_exhausted = True
+        break
+
+    mark_stage('retry')
     print("RETRYING TO GENERATE XPATHS-")
     print("Retry Attempt- ", retry_count)
     retry_count +=1
-    llm_call_count += 1 
+
+    # Metadata values that failed validation (e.g. articleBody not matching title) go to the XPath path
+    for field in failed_fields:
+        metadata.pop(field, None)
 
 
     # Store current XPaths
@@ -420,11 +542,13 @@ while failed_fields and retry_count < MAX_RETRIES:
     }
 
     # Get corrected XPaths from LLM
-    corrected_xpaths = retry_failed_xpaths(
+    corrected_xpaths = timed_llm_call(
+        'retry',
+        retry_failed_xpaths,
         failed_fields=failed_fields,
         feedback=feedback,
-        current_xpaths=current_xpaths,
-        cleaned_html=cleaned_html,
+        current_xpaths=requested_only(current_xpaths),
+        cleaned_html=get_cleaned_html(),
         client=client
     )
 
@@ -447,14 +571,18 @@ while failed_fields and retry_count < MAX_RETRIES:
 
         # print(f"\nRe-extracting content (attempt {retry_count})...")
     author_text, date_cleaned, time_cleaned, title_text, content_text = extract_content_with_xpaths(
-        tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath
+        tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath, resolved=resolved_nodes
+    )
+    author_text, date_cleaned, time_cleaned, title_text, content_text = apply_structured_metadata(
+        metadata, author_text, date_cleaned, time_cleaned, title_text, content_text
     )
 
     # Re-validate
     print(f"\nRe-validating (attempt {retry_count})...")
-    failed_fields, feedback = validate_extracted_fields(
-        author_text, date_cleaned, time_cleaned, title_text, content_text
-    )
+    validation = validate_records([{
+        'author': author_text, 'date': date_cleaned, 'time': time_cleaned, 'title': title_text, 'content': content_text
+    }], fields=SCRAPE_FIELDS, verbose=True)[0]
+    failed_fields, feedback = failed_fields_and_feedback(validation)
 
     if not failed_fields:
         print(f"\nAll fields validated successfully after {retry_count} attempt(s)!")
@@ -475,19 +603,23 @@ else:
     print(f"Feedback: {feedback}")
     
     # FALLBACK: Direct LLM extraction if enabled
-    if ENABLE_DIRECT_LLM_FALLBACK:
+    if ENABLE_DIRECT_LLM_FALLBACK and not llm_budget_allows():
+        print(f"\n{llm_skip_reason()}, storing partial data.")
+        budget_exhausted = True
+    elif ENABLE_DIRECT_LLM_FALLBACK:
         print("\nAttempting direct LLM extraction as fallback...")
         direct_extraction_used = True  # Set flag
-        llm_call_count += 1 
 
         
         from LLM_XPATH_GENERATION import direct_llm_extraction
         
         # Call LLM to directly extract the content
-        extracted_data = direct_llm_extraction(
+        extracted_data = timed_llm_call(
+            'direct',
+            direct_llm_extraction,
             failed_fields=failed_fields,
             feedback=feedback,
-            cleaned_html=cleaned_html,
+            cleaned_html=get_cleaned_html(),
             client=client
         )
         
@@ -508,7 +640,7 @@ else:
             title_text = extracted_data['title']
             # print(f"Direct extraction - Title: {title_text}")
         
-        if 'content' in extracted_data and ('content' in failed_fields or 'Content' in failed_fields):
+        if 'content' in extracted_data and 'content' in failed_fields:
             content_text = extracted_data['content']
             # print(f"Direct extraction - Content: {content_text[:50]}...")
         
@@ -520,35 +652,25 @@ else:
 # Track retry statistics and successful XPaths (ONLY for validated fields)
 # =========================================================================
 
-# Validate each field to determine which XPaths are "correct"
+mark_stage('database')
+
+# Reuse the last XPath validation result, no field is checked a second time.
+# Fields filled from structured metadata or by direct LLM extraction did not come from an XPath.
+xpath_values = {
+    'author': (author_xpath, author_text),
+    'date': (date_xpath, date_cleaned),
+    'time': (time_xpath, time_cleaned),
+    'title': (title_xpath, title_text),
+    'content': (content_xpath, content_text)
+}
 validated_xpaths = {}
-
-# Check author validation
-if author_text and author_text.strip() != "" and len(author_text) <= 25:
-    validated_xpaths['author'] = author_xpath
-    # print(f"Author XPath validated: {author_xpath}")
-
-# Check date validation
-if date_cleaned and date_cleaned.strip() != "":
-    validated_xpaths['date'] = date_xpath
-    # print(f"Date XPath validated: {date_xpath}")
-
-# Check time validation
-if time_cleaned and time_cleaned.strip() != "":
-    validated_xpaths['time'] = time_xpath
-    # print(f"Time XPath validated: {time_xpath}")
-
-# Check title validation
-if title_text and title_text.strip() != "" and len(title_text.strip()) >= 10:
-    validated_xpaths['title'] = title_xpath
-    # print(f"Title XPath validated: {title_xpath}")
-
-# Check content validation (length >= 100 AND matches with title)
-if content_text and content_text.strip() != "" and len(content_text.strip()) >= 100:
-    match_result = compare_texts(title_text, content_text, threshold=50, verbose=False)
-    if match_result != 0:  # Title and content match
-        validated_xpaths['content'] = content_xpath
-        # print(f"Content XPath validated: {content_xpath}")
+for field in passed_fields(validation):
+    xpath, value = xpath_values[field]
+    if xpath and metadata.get(field) != value:
+        validated_xpaths[field] = xpath
+if 'content' in validated_xpaths and not LEARN_CONTENT_XPATH:
+    print("Content XPath not learned: without the title it skipped the title/content overlap check")
+    del validated_xpaths['content']
 
 # Only proceed if we have at least one validated XPath
 if validated_xpaths:
@@ -565,6 +687,16 @@ if validated_xpaths:
         existing_time = tracking_result[5] if tracking_result[5] else ""
         existing_content = tracking_result[6] if tracking_result[6] else ""
         
+        # After a template shift, candidates that all failed on the new template are stale
+        if relearning:
+            stale = [field for field in fields_needing_llm if field in validated_xpaths]
+            print(f"Replacing stale XPath candidates for: {stale}")
+            existing_author = "" if 'author' in stale else existing_author
+            existing_title = "" if 'title' in stale else existing_title
+            existing_date = "" if 'date' in stale else existing_date
+            existing_time = "" if 'time' in stale else existing_time
+            existing_content = "" if 'content' in stale else existing_content
+        
         # Helper function to append with cap
         def append_xpath_with_cap(existing_str, new_xpath, cap=5):
             """Append new XPath if not already present, keep only last 'cap' XPaths"""
@@ -637,14 +769,60 @@ if validated_xpaths:
 else:
     print(f"No validated XPaths to track for domain '{domain}'")
 
+# Record the template once per domain and after every successful relearn,
+# a relearn that validated nothing only gives up its lease so the next page tries again
+# (as does a field-subset relearn: the other fields' stale candidates must still be seen as shifted)
+if relearning and (not validated_xpaths or SUBSET_MODE):
+    release_relearn(conn, domain)
+elif (relearning or not stored_fingerprint) and not client_rendered:
+    save_fingerprint(conn, domain, page_fingerprint)
+
+# Remember the page encoding for the domain's pages that declare none
+if page_encoding and page_encoding != known_encoding:
+    cursor.execute("UPDATE TRACKING_DOMAINS SET Encoding = ? WHERE Domain = ?", (page_encoding, domain))
+    conn.commit()
+
 
-cursor.execute('''
-    INSERT OR REPLACE INTO ARTICLES (Domain, URL, Author, Time, Date, Title, Content)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-''', (domain, url, author_text, time_cleaned, date_cleaned, title_text, content_text))
+# The row is replaced (new rowid, so exports pick the update up) and keeps its recrawl history.
+# PublishedAt is the Date/Time text as sortable UTC epoch seconds (NULL when the date did not parse).
+row = {'Domain': domain, 'URL': url}
+row.update({ARTICLE_COLUMNS[field]: value for field, value in requested_only({
+    'author': author_text, 'time': time_cleaned, 'date': date_cleaned, 'title': title_text, 'content': content_text
+}).items()})
+if SUBSET_MODE:
+    # The other columns and the recrawl history are carried over as stored. The content hash is
+    # not updated, so a later full scrape of a changed page is not skipped as unchanged.
+    cursor.execute("SELECT * FROM ARTICLES WHERE Domain = ? AND URL = ?", (domain, url))
+    stored_row = cursor.fetchone()
+    if stored_row:
+        row = {**dict(zip([description[0] for description in cursor.description], stored_row)), **row}
+    row['PublishedAt'] = published_timestamp(row.get('Date'), row.get('Time'))
+else:
+    row['PublishedAt'] = published_timestamp(date_cleaned, time_cleaned)
+    row.update(next_state(recrawl_state, page_hash, row['PublishedAt']))
+cursor.execute(
+    f"INSERT OR REPLACE INTO ARTICLES ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+    tuple(row.values())
+)
 
 conn.commit()
 
+# Partial results cut short by the URL budget are repaired later (batch_scraper.py --repair)
+# (client-rendered shells are not queued, a repair run would not find more text in the HTML)
+# (a direct extraction that timed out or failed stored nothing, so those URLs are queued as well)
+queued_for_repair = bool(budget_exhausted and failed_fields and not client_rendered
+                         and (not direct_extraction_used or timed_out_stage or llm_error))
+if queued_for_repair:
+    cursor.execute('''
+        INSERT OR REPLACE INTO REPAIR_QUEUE (URL, Domain, FailedFields, QueuedAt)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (url, domain, ",".join(failed_fields)))
+    print(f"Queued for repair, missing fields: {failed_fields}")
+elif not SUBSET_MODE:
+    # A field-subset run does not clear a queued repair of the fields it did not scrape
+    cursor.execute("DELETE FROM REPAIR_QUEUE WHERE URL = ?", (url,))
+conn.commit()
+
 
 print("Saved to database succesfully!")
 
@@ -657,11 +835,15 @@ content_words = content_text.split()[:50]
 content_preview = ' '.join(content_words) + ("..." if len(content_text.split()) > 50 else "")
 print(f"Content: {content_preview}")
 print(f"\nDirect LLM Extraction Used: {direct_extraction_used}")
-print(f"Total LLM API Calls (This Run): {llm_call_count - starting_count}")
-print(f"Total LLM API Calls (All Time): {llm_call_count}")
-
-# Update .env file with new count
-from dotenv import set_key
-set_key('.env', 'TOTAL_LLM_CALLS', str(llm_call_count))
+ledger.flush()
+print(f"Total LLM API Calls (This Run): {llm_call_count}")
+print(f"Total LLM API Calls (All Time): {total_calls(conn)}")
+print(f"Peak memory (RSS): {peak_rss_mb():.1f} MB")
+
+# The stored article goes back to batch_scraper.py as well, for its --stream output
+article = {column: row.get(column) for column in ['Domain', 'URL', *ARTICLE_COLUMNS.values(), 'PublishedAt']}
+write_run_result('success', domain=domain, fields=SCRAPE_FIELDS, direct_llm_used=direct_extraction_used,
+                 queued_for_repair=queued_for_repair, client_rendered=client_rendered,
+                 timed_out_stage=timed_out_stage, llm_error=llm_error, article=article)
 
 conn.close()
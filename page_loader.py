@@ -0,0 +1,388 @@
+"""
+Page loading module - fetch, parse and clean article pages
+In memory-aware mode the body is streamed straight into the lxml parser, heavy subtrees
+are emptied as soon as the parser closes them, and the cleaned HTML for the LLM is only built on demand.
+Every stage has its own time limit (FetchPolicy, parse_timeout) and raises StageTimeout
+naming the stage, so a slow URL fails fast instead of waiting for the batch process kill.
+The body is decoded once (resolve_encoding) and the same text feeds lxml and BeautifulSoup.
+"""
+
+import codecs
+import copy
+import re
+import resource
+import socket
+import sys
+import time
+import requests
+from bs4 import BeautifulSoup
+from lxml import etree, html
+from urllib3.exceptions import ReadTimeoutError
+from embedded_state import is_state_script
+
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+CHUNK_SIZE = 64 * 1024
+PARSE_CHUNK_CHARS = 64 * 1024   # decoded text fed to the parser per call, the parse budget is checked in between
+
+# Subtrees that never hold article fields but can be most of a page's size
+HEAVY_TAGS = ['style', 'svg', 'iframe', 'noscript', 'template', 'canvas', 'video', 'audio']
+# Script types still needed after parsing (structured metadata), framework state scripts are kept too
+KEPT_SCRIPT_TYPES = {'application/ld+json'}
+# Removed before sending the page to the LLM to save tokens
+LLM_STRIP_TAGS = ['script', 'style', 'iframe', 'nav', 'header', 'footer', 'aside']
+# Plain paragraphs this long are article text, left out of the LLM HTML when content is not asked for
+BODY_PARAGRAPH_CHARS = 200
+
+
+# Transient HTTP statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Encoding resolution: only the start of the body is searched for a <meta> charset
+SNIFF_BYTES = 4096
+BOMS = [(codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')]
+CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+# Labels browsers treat as windows-1252, which is a superset of them
+WINDOWS_1252_LABELS = {'latin-1', 'iso8859-1', 'ascii'}
+
+
+class PageTooLarge(Exception):
+    pass
+
+
+class StageTimeout(Exception):
+    """A pipeline stage ran past its time limit."""
+
+    def __init__(self, stage, seconds):
+        super().__init__(f"Stage '{stage}' timed out after {seconds}s")
+        self.stage = stage
+        self.seconds = seconds
+
+
+class BodyStalled(StageTimeout):
+    """The body stopped arriving for read_timeout seconds mid-download (retried, unlike the total deadline)."""
+
+    def __init__(self, seconds):
+        super().__init__('fetch_read', seconds)
+
+
+class FetchPolicy:
+    """Timeouts (seconds) and retry policy for fetching a page."""
+
+    def __init__(self, connect_timeout=10, read_timeout=20, total_timeout=45, retries=2, backoff=1.0):
+        self.connect_timeout = connect_timeout  # establishing the connection
+        self.read_timeout = read_timeout        # silence between two reads
+        self.total_timeout = total_timeout      # whole body download
+        self.retries = retries                  # extra attempts on transient errors
+        self.backoff = backoff                  # first retry delay, doubled every attempt
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def is_heavy(elem):
+    """True for a heavy subtree (a HEAVY_TAGS element or a script other than JSON-LD and state blobs)."""
+    if elem.tag != 'script':
+        return True
+    return (elem.get('type') or '').strip().lower() not in KEPT_SCRIPT_TYPES and not is_state_script(elem)
+
+
+def strip_heavy_subtrees(tree):
+    """Drop scripts (except JSON-LD and state blobs), styles, SVGs, iframes and other heavy subtrees in place."""
+    removed = 0
+    for elem in list(tree.iter(*HEAVY_TAGS, 'script')):
+        if is_heavy(elem):
+            removed += 1
+            elem.drop_tree()
+    return removed
+
+
+def release_heavy_subtrees(parser):
+    """
+    Empty the heavy elements a streaming_parser() has closed so far, their tails are kept.
+    Returns (released, script_bytes): script_bytes is the text of every closed script, counted
+    before it is emptied, so classify_page() sees the same total as for a fully parsed page.
+    """
+    released = script_bytes = 0
+    for _, elem in parser.read_events():
+        if elem.tag == 'script':
+            script_bytes += len(elem.text or "")
+        if is_heavy(elem):
+            elem.clear(keep_tail=True)
+            released += 1
+    return released, script_bytes
+
+
+# ENCODING RESOLUTION
+# ===============================================
+
+def normalize_encoding(label):
+    """Python codec name for a charset label, None if it is unknown."""
+    try:
+        name = codecs.lookup(label.strip().strip('"\'')).name
+    except (LookupError, AttributeError):
+        return None
+    return 'cp1252' if name in WINDOWS_1252_LABELS else name
+
+
+def resolve_encoding(content_type, head, known_encoding=None):
+    """
+    (encoding, source) of a body from, in order: a byte order mark, the Content-Type charset,
+    a <meta> charset in the first SNIFF_BYTES, the encoding last seen for the domain.
+    (None, None) when nothing declares it; no statistical detection is ever run.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, 'bom'
+
+    match = CHARSET_PARAM.search(content_type or '')
+    encoding = normalize_encoding(match.group(1)) if match else None
+    if encoding:
+        return encoding, 'header'
+
+    match = META_CHARSET.search(head[:SNIFF_BYTES])
+    encoding = normalize_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+    if encoding:
+        # An HTML document read as bytes cannot really be UTF-16 when its meta says so
+        return ('utf-8' if encoding.startswith('utf-16') else encoding), 'meta'
+
+    if known_encoding:
+        return known_encoding, 'domain'
+    return None, None
+
+
+def decode_body(content, content_type, known_encoding=None):
+    """
+    Decode the body exactly once.
+
+    Returns:
+        tuple: (text, encoding) - encoding is what the domain can be remembered with,
+               None when the text was decoded with the windows-1252 fallback guess
+    """
+    encoding, source = resolve_encoding(content_type, content[:SNIFF_BYTES], known_encoding)
+    if encoding:
+        return content.decode(encoding, errors='replace'), encoding
+    try:
+        return content.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return content.decode('cp1252', errors='replace'), None
+
+
+def streamed_encoding(content_type, first_chunk, known_encoding=None):
+    """Encoding for a streamed body, undeclared bodies are UTF-8 when their first chunk is valid UTF-8."""
+    encoding, _ = resolve_encoding(content_type, first_chunk, known_encoding)
+    if encoding:
+        return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(first_chunk)  # a character cut at the end is fine
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return None
+
+
+def streaming_parser(encoding):
+    """
+    lxml HTML pull parser decoding with `encoding` (libxml2 handles BOMs itself, and guesses when None).
+    It reports the end of every script and HEAVY_TAGS element, see release_heavy_subtrees().
+    """
+    options = dict(events=('end',), tag=HEAVY_TAGS + ['script'], remove_comments=True)
+    try:
+        parser = etree.HTMLPullParser(encoding='utf-8' if encoding == 'utf-8-sig' else encoding, **options)
+    except LookupError:
+        parser = etree.HTMLPullParser(**options)
+    # Same element classes as lxml.html (text_content(), drop_tree() ...)
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    return parser
+
+
+def fetch_with_retries(url, policy, consume):
+    """
+    GET url and pass the streamed response to consume(response, started), retrying transient
+    errors (connection failures, timeouts, 429/5xx) with exponential backoff.
+    Raises StageTimeout('fetch_connect' / 'fetch_read') once the retries are used up
+    (requests.HTTPError when a 429/5xx answer persists).
+    A body that stalls or is cut off mid-download is retried as well.
+    """
+    for attempt in range(policy.retries + 1):
+        delay = policy.backoff * (2 ** attempt)
+        try:
+            started = time.monotonic()
+            with requests.get(url, headers=HEADERS, stream=True,
+                              timeout=(policy.connect_timeout, policy.read_timeout)) as response:
+                if response.status_code in RETRY_STATUSES:
+                    if attempt == policy.retries:
+                        response.raise_for_status()  # still failing: an error page is not an article
+                    retry_after = response.headers.get('Retry-After', '')
+                    delay = max(delay, float(retry_after)) if retry_after.isdigit() else delay
+                    print(f"HTTP {response.status_code}, retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                return consume(response, started)
+        except requests.exceptions.ConnectTimeout:
+            if attempt == policy.retries:
+                raise StageTimeout('fetch_connect', policy.connect_timeout)
+            print(f"Connect timeout, retrying in {delay:.0f}s")
+        except requests.exceptions.ReadTimeout:
+            if attempt == policy.retries:
+                raise StageTimeout('fetch_read', policy.read_timeout)
+            print(f"Read timeout, retrying in {delay:.0f}s")
+        except BodyStalled:
+            if attempt == policy.retries:
+                raise
+            print(f"Read timeout in the body, retrying in {delay:.0f}s")
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == policy.retries:
+                raise
+            print(f"Connection error ({e.__class__.__name__}), retrying in {delay:.0f}s")
+        time.sleep(delay)
+
+
+def wraps_read_timeout(error):
+    """True when a requests error raised while streaming a body was caused by a read timeout."""
+    seen = set()
+    while isinstance(error, BaseException) and id(error) not in seen:
+        if isinstance(error, (ReadTimeoutError, socket.timeout)):
+            return True
+        seen.add(id(error))
+        # requests keeps the urllib3 error as its first argument, urllib3 chains the socket error
+        error = error.args[0] if error.args and isinstance(error.args[0], BaseException) else error.__context__
+    return False
+
+
+def iter_body(response, started, policy, max_bytes=None):
+    """
+    Body chunks, enforcing the total download deadline and the size limit.
+    A read timeout mid-body raises BodyStalled: requests reports it as a ConnectionError
+    (or ChunkedEncodingError) wrapping urllib3's ReadTimeoutError, not as ReadTimeout.
+    """
+    received = 0
+    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            if wraps_read_timeout(e):
+                raise BodyStalled(policy.read_timeout) from e
+            raise
+        received += len(chunk)
+        if max_bytes and received > max_bytes:
+            raise PageTooLarge(f"Page exceeds {max_bytes // (1024 * 1024)} MB limit")
+        if policy.total_timeout and time.monotonic() - started > policy.total_timeout:
+            raise StageTimeout('fetch_read', policy.total_timeout)
+        yield chunk
+
+
+def parse_text(page_text, parse_timeout=0):
+    """
+    Build the lxml tree from decoded text, fed to the parser in chunks.
+    One lxml call cannot be interrupted, so parse_timeout is checked between chunks.
+    """
+    # lxml rejects str input that still carries an XML encoding declaration
+    text = XML_DECLARATION.sub('', page_text, count=1)
+    parser = html.HTMLParser()
+    started = time.monotonic()
+    for start in range(0, len(text), PARSE_CHUNK_CHARS):
+        parser.feed(text[start:start + PARSE_CHUNK_CHARS])
+        if parse_timeout and time.monotonic() - started > parse_timeout:
+            raise StageTimeout('parse', parse_timeout)
+    return parser.close()
+
+
+def load_page(url, low_memory=False, max_bytes=None, policy=None, parse_timeout=0, known_encoding=None):
+    """
+    Fetch a page and build the lxml tree used for all XPath work.
+
+    Args:
+        url (str): Article URL
+        low_memory (bool): Stream the body into the parser and strip heavy subtrees
+        max_bytes (int): Abort pages larger than this (low-memory mode only)
+        policy (FetchPolicy): Fetch timeouts and retries (default: FetchPolicy())
+        parse_timeout (float): Time limit for parsing in seconds (0 = none)
+        known_encoding (str): Encoding last resolved for the domain, used when the page declares none
+
+    Returns:
+        tuple: (tree, page_text, encoding, script_bytes) - page_text is the decoded body kept for
+               BeautifulSoup cleaning (None in low-memory mode where cleaning works from the tree),
+               encoding is the resolved encoding to remember for the domain (None when it was only
+               guessed), script_bytes the script text counted while streaming (None when the tree
+               still holds every script)
+    """
+    policy = policy or FetchPolicy()
+
+    if not low_memory:
+        def read_body(response, started):
+            content = b"".join(iter_body(response, started, policy))
+            return decode_body(content, response.headers.get('Content-Type'), known_encoding)
+
+        page_text, encoding = fetch_with_retries(url, policy, read_body)
+        return parse_text(page_text, parse_timeout), page_text, encoding, None
+
+    # Feed the body to the parser chunk by chunk, the full bytes are never held at once.
+    # The encoding is resolved from the first chunk and libxml2 decodes while it parses.
+    # Heavy subtrees are emptied as soon as they are closed, so they never pile up in the tree.
+    # Download time is limited by iter_body(), only the time spent in feed() counts against parse_timeout.
+    def parse_streamed(response, started):
+        parser = None
+        encoding = None
+        received = released = script_bytes = 0
+        parse_seconds = 0.0
+        for chunk in iter_body(response, started, policy, max_bytes):
+            if parser is None:
+                encoding = streamed_encoding(response.headers.get('Content-Type'), chunk, known_encoding)
+                parser = streaming_parser(encoding)
+            received += len(chunk)
+            parse_started = time.monotonic()
+            parser.feed(chunk)
+            chunk_released, chunk_script_bytes = release_heavy_subtrees(parser)
+            released += chunk_released
+            script_bytes += chunk_script_bytes
+            parse_seconds += time.monotonic() - parse_started
+            if parse_timeout and parse_seconds > parse_timeout:
+                raise StageTimeout('parse', parse_timeout)
+        if parser is None:
+            parser = streaming_parser(None)  # empty body, close() reports it
+        tree = parser.close()
+        chunk_released, chunk_script_bytes = release_heavy_subtrees(parser)
+        return tree, received, released + chunk_released, encoding, script_bytes + chunk_script_bytes
+
+    tree, received, released, encoding, script_bytes = fetch_with_retries(url, policy, parse_streamed)
+
+    # The emptied elements themselves go as well
+    strip_heavy_subtrees(tree)
+    print(f"Low-memory mode: {received // 1024} KB parsed, {released} heavy subtrees released while parsing")
+    return tree, None, encoding, script_bytes
+
+
+def clean_html(tree, page_text=None, keep_body=True):
+    """
+    Build the token-saving HTML sent to the LLM.
+    Uses BeautifulSoup on the page text when it was kept, otherwise a copy of the lxml tree.
+    With keep_body=False plain article paragraphs (BODY_PARAGRAPH_CHARS or longer, no child
+    elements) are dropped too, short ones such as bylines and datelines stay.
+    """
+    if page_text is not None:
+        soup = BeautifulSoup(page_text, 'html.parser')
+        for tag in soup.find_all(LLM_STRIP_TAGS):
+            tag.decompose()
+        if not keep_body:
+            for tag in soup.find_all('p'):
+                if tag.find(True) is None and len(tag.get_text().strip()) >= BODY_PARAGRAPH_CHARS:
+                    tag.decompose()
+        return str(soup)
+
+    tree_copy = copy.deepcopy(tree)
+    for elem in list(tree_copy.iter(*LLM_STRIP_TAGS)):
+        elem.drop_tree()
+    if not keep_body:
+        for elem in list(tree_copy.iter('p')):
+            if len(elem) == 0 and len((elem.text or '').strip()) >= BODY_PARAGRAPH_CHARS:
+                elem.drop_tree()
+    return html.tostring(tree_copy, encoding='unicode')
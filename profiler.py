@@ -0,0 +1,168 @@
+"""
+Low-overhead sampling profiler for main_scraper.py runs (batch_scraper.py --profile)
+
+A background thread samples the main thread's Python stack every few milliseconds.
+Samples are kept as collapsed stacks ("frame;frame;frame" -> count) rooted at the pipeline
+stage that was running, e.g. "[fetch];main_scraper.py:<module>;page_loader.py:load_page;...".
+Stage wall times are recorded separately, so per-URL breakdowns do not depend on sampling.
+
+batch_scraper.py merges the per-URL profiles (ProfileAggregator) into:
+    stacks.folded     - collapsed stacks, input for flamegraph.pl / speedscope
+    functions.txt     - per-function self and total samples
+    stages.txt        - per-stage wall time over the whole batch
+    slowest_urls.txt  - the N slowest URLs with their stage breakdown
+"""
+
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+DEFAULT_INTERVAL = 0.005  # seconds between samples
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stage_seconds = Counter()
+        self.stage = 'startup'
+        self.stage_started = time.monotonic()
+        self.started = self.stage_started
+        self.target_id = threading.get_ident()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.set_stage(None)
+
+    def set_stage(self, name):
+        """Switch the current pipeline stage, returns the previous one (for nested stages like LLM calls)."""
+        now = time.monotonic()
+        previous = self.stage
+        if previous is not None:
+            self.stage_seconds[previous] += now - self.stage_started
+        self.stage = name
+        self.stage_started = now
+        return previous
+
+    def _sample_loop(self):
+        while self.running:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.target_id)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                labels.append(f"[{self.stage}]")
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def report(self):
+        """JSON-serialisable profile of this run."""
+        return {
+            'interval': self.interval,
+            'wall_seconds': round(time.monotonic() - self.started, 3),
+            'stages': {name: round(seconds, 3) for name, seconds in self.stage_seconds.items()},
+            'stacks': dict(self.stacks)
+        }
+
+
+def profiler_from_env():
+    """Started profiler if SCRAPER_PROFILE is set (batch_scraper.py --profile), else None."""
+    if not os.getenv("SCRAPER_PROFILE"):
+        return None
+    profiler = SamplingProfiler(float(os.getenv("SCRAPER_PROFILE_INTERVAL", DEFAULT_INTERVAL)))
+    profiler.start()
+    return profiler
+
+
+# BATCH AGGREGATION
+# ===============================================
+
+def function_samples(stacks):
+    """Per-function (self, total) sample counts, total counted once per stack even for recursion."""
+    self_samples = Counter()
+    total_samples = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # drop the [stage] root
+        if not frames:
+            continue
+        self_samples[frames[-1]] += count
+        for label in set(frames):
+            total_samples[label] += count
+    return self_samples, total_samples
+
+
+class ProfileAggregator:
+    """
+    Merges per-URL profiles as they arrive, keeping only the merged stacks, stage totals and
+    the top_n slowest URLs, so profiling a long batch stays in constant memory.
+    """
+
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+        self.stacks = Counter()
+        self.stage_seconds = Counter()
+        self.slowest = []  # min-heap of (wall_seconds, sequence, url, stages)
+        self.url_count = 0
+
+    def add(self, url, profile):
+        """Merge one profile as returned by SamplingProfiler.report()."""
+        self.stacks.update(profile.get('stacks', {}))
+        self.stage_seconds.update(profile.get('stages', {}))
+        self.url_count += 1
+        entry = (profile.get('wall_seconds', 0), self.url_count, url, profile.get('stages', {}))
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, entry)
+        elif self.top_n:
+            heapq.heappushpop(self.slowest, entry)
+
+    def write(self, output_dir):
+        """Write stacks.folded, functions.txt, stages.txt and slowest_urls.txt to output_dir."""
+        os.makedirs(output_dir, exist_ok=True)
+        stacks = self.stacks
+        stage_seconds = self.stage_seconds
+
+        with open(os.path.join(output_dir, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_samples, total_samples = function_samples(stacks)
+        sample_count = sum(stacks.values()) or 1
+        with open(os.path.join(output_dir, 'functions.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"{'self %':>8} {'total %':>8} {'self':>8} {'total':>8}  function\n")
+            for label, total in total_samples.most_common():
+                own = self_samples[label]
+                f.write(f"{own / sample_count * 100:7.1f}% {total / sample_count * 100:7.1f}% "
+                        f"{own:>8} {total:>8}  {label}\n")
+
+        batch_seconds = sum(stage_seconds.values()) or 1
+        with open(os.path.join(output_dir, 'stages.txt'), 'w', encoding='utf-8') as f:
+            for stage, seconds in stage_seconds.most_common():
+                f.write(f"{stage:<12} {seconds:10.2f}s {seconds / batch_seconds * 100:6.1f}%\n")
+
+        with open(os.path.join(output_dir, 'slowest_urls.txt'), 'w', encoding='utf-8') as f:
+            for wall_seconds, _, url, stages in sorted(self.slowest, reverse=True):
+                f.write(f"{wall_seconds:8.2f}s  {url}\n")
+                for stage, seconds in Counter(stages).most_common():
+                    f.write(f"{'':12}{stage:<12} {seconds:8.2f}s\n")
+                f.write("\n")
+
+        print(f"Profile written to {output_dir} ({sum(stacks.values())} samples, {self.url_count} URLs)")
@@ -0,0 +1,91 @@
+"""
+Sortable publication timestamps for ARTICLES
+Date and Time are stored as display text ("November 06, 2025", "02:30 PM IST"). PublishedAt holds
+the same moment as UTC epoch seconds, so articles can be sorted and range-queried through an index.
+The pipeline fills it on every write. backfill() parses existing rows in rowid chunks, one short
+transaction per chunk, so it can run next to the scraper and simply be restarted if interrupted.
+
+    python published_at.py --backfill [--chunk 5000]
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+
+
+IST = timezone(timedelta(hours=5, minutes=30))  # the pipeline formats times as IST
+BACKFILL_CHUNK = 5000
+MIN_YEAR = 1990
+
+
+def published_timestamp(date_text, time_text=""):
+    """
+    UTC epoch seconds for a stored Date/Time text pair.
+    A missing or unparseable time of day counts as midnight IST; returns None when the date
+    itself cannot be parsed (e.g. raw text kept by a failed extraction) or has no plausible year.
+    """
+    if not date_text or not date_text.strip():
+        return None
+    try:
+        # Year 1 as the default: a date without a year is rejected below instead of taking this year
+        date = parser.parse(date_text, default=datetime(1, 1, 1)).date()
+    except (ValueError, OverflowError):
+        return None
+    if not MIN_YEAR <= date.year <= datetime.now().year + 1:
+        return None
+
+    published = datetime(date.year, date.month, date.day, tzinfo=IST)
+    if time_text and time_text.strip():
+        try:
+            parsed = parser.parse(time_text, tzinfos={'IST': IST}, default=published.replace(tzinfo=None))
+            published = parsed if parsed.tzinfo else parsed.replace(tzinfo=IST)
+        except (ValueError, OverflowError):
+            pass
+    return int(published.timestamp())
+
+
+def backfill(db_path='articles.db', chunk=BACKFILL_CHUNK):
+    """Fill PublishedAt for rows stored without it, returns (rows scanned, rows filled)."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    scanned = filled = 0
+    last_rowid = 0
+    try:
+        while True:
+            rows = conn.execute(
+                "SELECT rowid, Date, Time FROM ARTICLES WHERE rowid > ? AND PublishedAt IS NULL ORDER BY rowid LIMIT ?",
+                (last_rowid, chunk)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for rowid, date_text, time_text in rows:
+                timestamp = published_timestamp(date_text, time_text)
+                if timestamp is not None:
+                    updates.append((timestamp, rowid))
+            conn.executemany("UPDATE ARTICLES SET PublishedAt = ? WHERE rowid = ?", updates)
+            conn.commit()
+
+            scanned += len(rows)
+            filled += len(updates)
+            last_rowid = rows[-1][0]
+            print(f"PublishedAt backfill: {scanned} rows scanned, {filled} filled")
+    finally:
+        conn.close()
+    return scanned, filled
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Normalized publication timestamps for ARTICLES')
+    arg_parser.add_argument('--backfill', action='store_true', help='Fill PublishedAt for existing rows')
+    arg_parser.add_argument('--chunk', type=int, default=BACKFILL_CHUNK,
+                            help=f'Rows per backfill transaction (default: {BACKFILL_CHUNK})')
+    arg_parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    args = arg_parser.parse_args()
+
+    if args.backfill:
+        scanned, filled = backfill(args.db, args.chunk)
+        print(f"Backfill complete: {filled} of {scanned} rows have a publication timestamp")
+    else:
+        arg_parser.print_help()
@@ -0,0 +1,317 @@
+"""
+Read-only HTTP/JSON API over articles.db
+
+Downstream consumers read through this service instead of opening articles.db themselves.
+It only uses read-only connections from its own pool (WAL mode lets them run alongside the
+scraper's writes without blocking it) and keeps hot responses in a small in-memory LRU.
+
+Endpoints:
+    GET /articles?domain=<d>&date=<Date text>&limit=20&after=<cursor>&content=1
+                 &order=scraped|published&since=<time>&until=<time>
+        Newest scraped first (order=published: newest published first), keyset-paginated:
+        pass the returned "next" cursor as "after". since/until select a publication time window
+        (epoch seconds or ISO 8601, UTC unless an offset is given). Content is only included with content=1.
+    GET /article?url=<article url>
+    GET /domains
+    GET /health
+"""
+
+import argparse
+import base64
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from domain_scheduler import url_domain
+from export_articles import connect_read_only
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SUMMARY_COLUMNS = ['Domain', 'URL', 'Author', 'Date', 'Time', 'Title', 'PublishedAt']
+ORDERS = ('scraped', 'published')
+ALL_COLUMNS = SUMMARY_COLUMNS + ['Content']
+
+
+class ConnectionPool:
+    """Fixed set of read-only SQLite connections shared by the request threads."""
+
+    def __init__(self, db_path, size=4):
+        self.connections = queue.Queue()
+        for _ in range(size):
+            self.connections.put(connect_read_only(db_path, check_same_thread=False))
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+
+class ResponseCache:
+    """LRU of encoded responses; entries expire after ttl seconds so new articles show up."""
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, body = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if not self.maxsize:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class BadRequest(Exception):
+    pass
+
+
+# QUERIES
+# ===============================================
+
+def list_articles(conn, domain=None, date=None, after=None, limit=DEFAULT_LIMIT, content=False,
+                  order='scraped', since=None, until=None):
+    """
+    One page of articles, newest scraped (or, with order='published', newest published) first.
+    Keyset pagination: the cursor is the last rowid returned (for order='published' the last
+    (PublishedAt, Domain, URL), the order of the covering PublishedAt indexes), so every page is an
+    index range scan however deep the client pages (no OFFSET and no sort step).
+    """
+    columns = ALL_COLUMNS if content else SUMMARY_COLUMNS
+    conditions, params = [], []
+    if domain:
+        conditions.append("Domain = ?")
+        params.append(domain)
+    if date:
+        conditions.append("Date = ?")
+        params.append(date)
+    if since is not None:
+        conditions.append("PublishedAt >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("PublishedAt < ?")
+        params.append(until)
+
+    if order == 'published':
+        conditions.append("PublishedAt IS NOT NULL")
+        if after is not None:
+            conditions.append("(PublishedAt, Domain, URL) < (?, ?, ?)")
+            params.extend(after)
+        order_by = "PublishedAt DESC, Domain DESC, URL DESC"
+    else:
+        if after is not None:
+            conditions.append("rowid < ?")
+            params.append(after)
+        order_by = "rowid DESC"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    rows = conn.execute(
+        f"SELECT rowid, {', '.join(columns)} FROM ARTICLES {where} ORDER BY {order_by} LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = dict(zip(columns, rows[-1][1:]))
+        next_cursor = encode_cursor([last['PublishedAt'], last['Domain'], last['URL']]) if order == 'published' \
+            else str(rows[-1][0])
+    return {
+        'articles': [dict(zip(columns, row[1:])) for row in rows],
+        'next': next_cursor
+    }
+
+
+def get_article(conn, url):
+    """Lookup by URL through the (Domain, URL) primary key."""
+    row = conn.execute(
+        f"SELECT {', '.join(ALL_COLUMNS)} FROM ARTICLES WHERE Domain = ? AND URL = ?",
+        (url_domain(url), url)
+    ).fetchone()
+    return dict(zip(ALL_COLUMNS, row)) if row else None
+
+
+def list_domains(conn):
+    return [
+        {'domain': domain, 'articles': count}
+        for domain, count in conn.execute("SELECT Domain, COUNT(*) FROM ARTICLES GROUP BY Domain ORDER BY Domain")
+    ]
+
+
+def time_param(params, name):
+    """Epoch seconds from an epoch or ISO 8601 parameter (naive times are UTC)."""
+    value = params.get(name, [None])[0]
+    if value in (None, ''):
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise BadRequest(f"'{name}' must be epoch seconds or an ISO 8601 date/time")
+    return int((parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp())
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def cursor_param(params, order):
+    """The "after" cursor: a rowid, or an opaque (PublishedAt, Domain, URL) key for order=published."""
+    value = params.get('after', [None])[0]
+    if value in (None, ''):
+        return None
+    try:
+        if order == 'published':
+            published_at, domain, url = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+            return int(published_at), str(domain), str(url)
+        return int(value)
+    except (ValueError, TypeError):
+        raise BadRequest("'after' must be a cursor returned as 'next'")
+
+
+def int_param(params, name, default=None):
+    value = params.get(name, [None])[0]
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+
+
+# HTTP SERVER
+# ===============================================
+
+def make_handler(pool, cache):
+
+    class ReadAPIHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+
+            if parsed.path == '/health':
+                return self.send_json(200, b'{"status": "ok"}')
+
+            # Identical requests share one cache entry whatever the parameter order
+            cache_key = (parsed.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+            body = cache.get(cache_key)
+            if body is not None:
+                return self.send_json(200, body, cached=True)
+
+            try:
+                with pool.connection() as conn:
+                    status, payload = self.route(conn, parsed.path, params)
+            except BadRequest as e:
+                status, payload = 400, {'error': str(e)}
+
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            if status == 200:
+                cache.put(cache_key, body)
+            self.send_json(status, body)
+
+        def route(self, conn, path, params):
+            if path == '/articles':
+                limit = min(max(int_param(params, 'limit', DEFAULT_LIMIT), 1), MAX_LIMIT)
+                order = params.get('order', ['scraped'])[0]
+                if order not in ORDERS:
+                    raise BadRequest(f"'order' must be one of {', '.join(ORDERS)}")
+                return 200, list_articles(
+                    conn,
+                    domain=params.get('domain', [None])[0],
+                    date=params.get('date', [None])[0],
+                    after=cursor_param(params, order),
+                    limit=limit,
+                    content=params.get('content', ['0'])[0] == '1',
+                    order=order,
+                    since=time_param(params, 'since'),
+                    until=time_param(params, 'until')
+                )
+            if path == '/article':
+                url = params.get('url', [None])[0]
+                if not url:
+                    raise BadRequest("'url' is required")
+                article = get_article(conn, url)
+                return (200, article) if article else (404, {'error': 'article not found'})
+            if path == '/domains':
+                return 200, {'domains': list_domains(conn)}
+            return 404, {'error': f"unknown endpoint {path}"}
+
+        def send_json(self, status, body, cached=False):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-Cache', 'HIT' if cached else 'MISS')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per request would swamp the console under load
+
+    return ReadAPIHandler
+
+
+def serve(db_path='articles.db', host='127.0.0.1', port=8080, pool_size=4, cache_size=1024, cache_ttl=30):
+    pool = ConnectionPool(db_path, size=pool_size)
+    cache = ResponseCache(maxsize=cache_size, ttl=cache_ttl)
+    server = ThreadingHTTPServer((host, port), make_handler(pool, cache))
+    print(f"Read API on http://{host}:{port} ({pool_size} read-only connections, "
+          f"cache {cache_size} entries / {cache_ttl}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Read-only HTTP/JSON API over articles.db',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python read_api.py --port 8080
+  curl 'http://127.0.0.1:8080/articles?domain=indianexpress&limit=50'
+  curl 'http://127.0.0.1:8080/articles?domain=indianexpress&after=<next cursor>'
+  curl 'http://127.0.0.1:8080/articles?domain=indianexpress&order=published&limit=10'
+  curl 'http://127.0.0.1:8080/articles?since=2025-11-01&until=2025-11-08&order=published'
+  curl 'http://127.0.0.1:8080/article?url=https://indianexpress.com/article/...'
+        """
+    )
+    parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port (default: 8080)')
+    parser.add_argument('--pool-size', type=int, default=4, help='Read-only connections (default: 4)')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Cached responses, 0 disables (default: 1024)')
+    parser.add_argument('--cache-ttl', type=int, default=30, help='Seconds a cached response stays valid (default: 30)')
+    args = parser.parse_args()
+
+    serve(args.db, args.host, args.port, args.pool_size, args.cache_size, args.cache_ttl)
@@ -0,0 +1,117 @@
+"""
+Adaptive recrawl scheduling for stored articles
+Every scrape stores a hash of the page's article text in ARTICLES (ContentHash) with check/change
+counters. A re-scrape whose hash is unchanged only updates the counters: no XPath, LLM, validation
+or article write. The next visit (NextCheck) is picked from the article's age and how often it has
+changed so far, so recrawl capacity goes to the few articles that keep being updated:
+
+    interval = clamp(AGE_FRACTION * age / (2 * change_rate), MIN_INTERVAL, MAX_INTERVAL)
+    change_rate = (changes + 1) / (checks + 2)     (0.5 with no history)
+    age         = time since publication (PublishedAt), or since the first scrape
+
+    python recrawl_scheduler.py --limit 100 > due.txt      (URLs due now, most overdue first)
+    python batch_scraper.py --recrawl 100
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import time
+
+
+MIN_INTERVAL = 3600            # never revisit sooner than an hour
+MAX_INTERVAL = 30 * 86400      # nor later than a month
+AGE_FRACTION = 0.25            # a 4-day-old article with an average change rate is revisited daily
+RECRAWL_COLUMNS = ['ContentHash', 'FirstSeen', 'LastChecked', 'LastChanged', 'CheckCount', 'ChangeCount', 'NextCheck']
+
+
+def content_hash(tree, metadata):
+    """
+    Hash of the article text of a page: headline and paragraph text plus structured metadata.
+    Scripts, ads and navigation markup are ignored, so only edits to the article change it.
+    """
+    digest = hashlib.sha1()
+    for text in tree.xpath("//body//h1//text() | //body//p//text()"):
+        digest.update(" ".join(text.split()).encode('utf-8'))
+        digest.update(b"\n")
+    for field in sorted(metadata):
+        digest.update(f"{field}={metadata[field]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def revisit_interval(age_seconds, checks, changes):
+    """Seconds until the next visit of an article `age_seconds` old that changed `changes` times in `checks`."""
+    change_rate = (changes + 1) / (checks + 2)
+    interval = AGE_FRACTION * age_seconds / (2 * change_rate)
+    return min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+
+
+def load_state(conn, domain, url):
+    """Stored recrawl columns (and PublishedAt) of an article as a dict, None if it was never stored."""
+    columns = RECRAWL_COLUMNS + ['PublishedAt']
+    row = conn.execute(
+        f"SELECT {', '.join(columns)} FROM ARTICLES WHERE Domain = ? AND URL = ?", (domain, url)
+    ).fetchone()
+    return dict(zip(columns, row)) if row else None
+
+
+def next_state(state, page_hash, published_at=None, now=None):
+    """
+    Recrawl column values after checking the article now (state None for a new article).
+    The article's age counts from its publication time when known, else from its first scrape.
+    """
+    now = time.time() if now is None else now
+    if state is None:
+        age = now - published_at if published_at and published_at <= now else 0
+        return {'ContentHash': page_hash, 'FirstSeen': now, 'LastChecked': now, 'LastChanged': now,
+                'CheckCount': 1, 'ChangeCount': 0, 'NextCheck': now + revisit_interval(age, 0, 0)}
+
+    first_seen = state['FirstSeen'] or now
+    published_at = published_at or state.get('PublishedAt')
+    born = published_at if published_at and published_at <= now else first_seen
+    changed = state['ContentHash'] is not None and state['ContentHash'] != page_hash
+    checks = (state['CheckCount'] or 0) + 1
+    changes = (state['ChangeCount'] or 0) + changed
+    return {
+        'ContentHash': page_hash,
+        'FirstSeen': first_seen,
+        'LastChecked': now,
+        'LastChanged': now if changed else (state['LastChanged'] or first_seen),
+        'CheckCount': checks,
+        'ChangeCount': changes,
+        'NextCheck': now + revisit_interval(now - born, checks, changes)
+    }
+
+
+def record_unchanged(conn, domain, url, state, page_hash):
+    """Count a check that found the article unchanged, only the recrawl columns are written."""
+    values = next_state(state, page_hash)
+    conn.execute(
+        "UPDATE ARTICLES SET LastChecked = ?, CheckCount = ?, NextCheck = ? WHERE Domain = ? AND URL = ?",
+        (values['LastChecked'], values['CheckCount'], values['NextCheck'], domain, url)
+    )
+    conn.commit()
+    return values
+
+
+def due_urls(db_path='articles.db', limit=100, now=None):
+    """URLs whose NextCheck has passed, most overdue first (articles stored before recrawl tracking come first)."""
+    now = time.time() if now is None else now
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT URL FROM ARTICLES WHERE NextCheck IS NULL OR NextCheck <= ? ORDER BY NextCheck LIMIT ?",
+            (now, limit)
+        )]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='List stored articles due for a recrawl')
+    parser.add_argument('--db', default='articles.db', help='Path to articles database (default: articles.db)')
+    parser.add_argument('--limit', type=int, default=100, help='Max URLs listed (default: 100)')
+    args = parser.parse_args()
+
+    for url in due_urls(args.db, args.limit):
+        print(url)
@@ -0,0 +1,142 @@
+"""
+Streaming output of scraped articles as newline-delimited JSON
+batch_scraper.py --stream publishes every stored article the moment its URL finishes, so
+indexing and alerting services can react without polling articles.db. Targets:
+    -                stdout (progress output moves to stderr)
+    unix:/path.sock  a local Unix socket the consumer listens on
+    anything else    a file, appended to (e.g. for tail -f)
+Each line is one article with the ARTICLES column names. Lines are bounded (MAX_LINE_BYTES):
+an oversized article has its Content cut and "Truncated": true. Lines pass through a bounded
+queue to a writer thread; when the consumer falls behind and the queue is full, publishing
+blocks, which pauses the batch instead of growing memory.
+
+    python batch_scraper.py urls.txt --stream - | indexer
+    python batch_scraper.py urls.txt --stream unix:/run/alerts.sock --stream-buffer 100
+"""
+
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+
+STREAM_BUFFER = 1000                 # lines queued for a slow consumer before the batch waits
+MAX_LINE_BYTES = 1024 * 1024         # longest line sent, Content is cut to fit
+
+
+def encode_line(record, max_bytes=MAX_LINE_BYTES):
+    """
+    One NDJSON line (bytes, newline included) of at most max_bytes, cutting Content if needed.
+    Returns (line, truncated), line is None when not even the Domain and URL fit.
+    """
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+    if len(line) <= max_bytes:
+        return line, False
+
+    content = (record.get('Content') or "").encode('utf-8')
+    # JSON escaping makes content longer than its raw bytes, so start from the line's ratio and cut until it fits
+    keep = len(content) * max_bytes // len(line)
+    while True:
+        record = {**record, 'Content': content[:keep].decode('utf-8', errors='ignore'), 'Truncated': True}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        if len(line) <= max_bytes:
+            return line, True
+        if keep == 0:
+            # Even without content the record is too long, send only what identifies it
+            record = {'Domain': record.get('Domain'), 'URL': record.get('URL'), 'Truncated': True}
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+            return (line if len(line) <= max_bytes else None), True
+        keep = keep * 9 // 10
+
+
+class ResultStream:
+    """Bounded, backpressured NDJSON publisher for one target, written by a background thread."""
+
+    def __init__(self, target, buffer=STREAM_BUFFER, max_line_bytes=MAX_LINE_BYTES):
+        self.target = target
+        self.max_line_bytes = max_line_bytes
+        self.queue = queue.Queue(maxsize=buffer)
+        self.published = 0
+        self.dropped = 0
+        self.truncated = 0
+        self.blocked_seconds = 0.0
+        self.error = None
+        self.sock = None
+
+        if target == '-':
+            # Stream lines keep the real stdout, everything else printed (including the scraper
+            # processes' output) goes to stderr so it cannot interleave with the JSON
+            sys.stdout.flush()
+            self.file = os.fdopen(os.dup(1), 'wb')
+            os.dup2(2, 1)
+        elif target.startswith('unix:'):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(target[len('unix:'):])
+            self.file = None
+        else:
+            self.file = open(target, 'ab')
+
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def publish(self, record):
+        """Queue one article, blocking while the queue is full. Returns False once the consumer is gone."""
+        if self.error:
+            self.dropped += 1
+            return False
+        line, truncated = encode_line(record, self.max_line_bytes)
+        if line is None:
+            self.dropped += 1
+            return True
+        self.truncated += truncated
+        started = time.monotonic()
+        self.queue.put(line)
+        self.blocked_seconds += time.monotonic() - started
+        return True
+
+    def _write_loop(self):
+        while True:
+            line = self.queue.get()
+            if line is None:
+                return
+            if self.error:
+                self.dropped += 1
+                continue
+            try:
+                if self.sock:
+                    self.sock.sendall(line)
+                else:
+                    self.file.write(line)
+                    self.file.flush()
+                self.published += 1
+            except OSError as e:
+                # Keep draining so a blocked publish() returns, the batch itself carries on
+                self.error = e
+                self.dropped += 1
+                print(f"Result stream to {self.target} closed ({e}), no further articles are streamed",
+                      file=sys.stderr)
+
+    def close(self):
+        """Flush every queued line to the consumer and close the target."""
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            if self.sock:
+                self.sock.close()
+            else:
+                self.file.close()
+        except OSError:
+            pass  # the consumer already went away, reported by the writer thread
+
+    def summary(self):
+        text = f"{self.published} article(s) streamed to {self.target}"
+        if self.truncated:
+            text += f", {self.truncated} truncated"
+        if self.dropped:
+            text += f", {self.dropped} dropped (consumer gone or record too long)"
+        if self.blocked_seconds >= 1:
+            text += f", batch waited {self.blocked_seconds:.1f}s on the consumer"
+        return text
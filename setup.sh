@@ -4,4 +4,7 @@ pip3 install requirements.txt
 echo "Initialising Database"
 
 python3 Create_Articles_Database.py
-python3 Create_Tracking_Domains_Database.py
\ No newline at end of file
+python3 Create_Tracking_Domains_Database.py
+python3 Create_Feeds_Database.py
+python3 Create_Repair_Queue_Database.py
+python3 Create_LLM_Usage_Database.py
\ No newline at end of file
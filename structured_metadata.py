@@ -0,0 +1,164 @@
+"""
+Structured metadata extraction module (JSON-LD / OpenGraph / meta tags)
+Fills article fields deterministically from the parsed lxml tree, without any LLM call
+"""
+
+import json
+import re
+from datetime import timedelta, timezone
+from dateutil import parser
+from field_validator import check_field
+
+
+IST = timezone(timedelta(hours=5, minutes=30))
+# A time of day ("14:30", "2:30 PM", ISO "2025-11-03T14:30"), weekday names like "Tue" do not count
+TIME_OF_DAY = re.compile(r'\d:\d{2}|\dT\d{2}')
+
+# schema.org types that describe an article page
+ARTICLE_TYPES = {
+    "Article", "NewsArticle", "ReportageNewsArticle", "AnalysisNewsArticle",
+    "OpinionNewsArticle", "BackgroundNewsArticle", "ReviewNewsArticle",
+    "LiveBlogPosting", "BlogPosting", "Report", "WebPage"
+}
+
+# Meta tags checked in order, first usable value wins
+TITLE_META = [
+    "//meta[@property='og:title']/@content",
+    "//meta[@name='twitter:title']/@content",
+    "//meta[@itemprop='headline']/@content",
+]
+AUTHOR_META = [
+    "//meta[@name='author']/@content",
+    "//meta[@property='article:author']/@content",
+    "//meta[@name='parsely-author']/@content",
+    "//meta[@name='byl']/@content",
+    "//meta[@itemprop='author']/@content",
+]
+PUBLISHED_META = [
+    "//meta[@property='article:published_time']/@content",
+    "//meta[@itemprop='datePublished']/@content",
+    "//meta[@name='parsely-pub-date']/@content",
+    "//meta[@name='publish-date']/@content",
+    "//meta[@name='pubdate']/@content",
+    "//meta[@name='date']/@content",
+]
+
+
+def iter_jsonld_objects(tree):
+    """Yield every JSON object embedded in ld+json scripts (including @graph members)."""
+    for script in tree.xpath("//script[@type='application/ld+json']"):
+        raw = (script.text or "").strip()
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw, strict=False)
+        except ValueError:
+            continue
+
+        stack = [data]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, list):
+                stack.extend(obj)
+            elif isinstance(obj, dict):
+                yield obj
+                for key in ("@graph", "mainEntity", "mainEntityOfPage"):
+                    if isinstance(obj.get(key), (list, dict)):
+                        stack.append(obj[key])
+
+
+def is_article_object(obj):
+    types = obj.get("@type", [])
+    if isinstance(types, str):
+        types = [types]
+    return any(t in ARTICLE_TYPES for t in types) and ("headline" in obj or "datePublished" in obj)
+
+
+def author_names(value):
+    """Flatten a schema.org author value (str, Person dict or list of either) to a name string."""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        name = value.get("name", "")
+        return name.strip() if isinstance(name, str) else ""
+    if isinstance(value, list):
+        names = [author_names(v) for v in value]
+        return ", ".join(n for n in names if n)
+    return ""
+
+
+def clean_author(value):
+    """Drop profile URLs and 'By' prefixes that some publishers put in author meta tags."""
+    value = (value or "").strip()
+    if value.lower().startswith(("http://", "https://")):
+        return ""
+    if value.lower().startswith("by "):
+        value = value[3:].strip()
+    return value
+
+
+def split_published(value):
+    """Return (date, time) in the same format as extract_datetime_from_elements()."""
+    if not value or not isinstance(value, str):
+        return "", ""
+    try:
+        dt = parser.parse(value)
+    except (ValueError, OverflowError):
+        return "", ""
+
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST)
+
+    date_text = dt.strftime("%B %d, %Y")
+    # Date-only values (e.g. "2025-11-03", "Tue, 04 Nov 2025") carry no time of day
+    time_text = dt.strftime("%I:%M %p IST") if TIME_OF_DAY.search(value) else ""
+    return date_text, time_text
+
+
+def first_meta(tree, xpaths):
+    for xpath in xpaths:
+        for value in tree.xpath(xpath):
+            value = str(value).strip()
+            if value:
+                return value
+    return ""
+
+
+def extract_structured_metadata(tree):
+    """
+    Extract author, date, time, title (and content when articleBody is present)
+    from JSON-LD and meta tags.
+
+    Returns:
+        dict: Only the fields that could be filled, e.g. {'title': ..., 'date': ...}
+    """
+    found = {}
+
+    # JSON-LD first (most complete and structured)
+    for obj in iter_jsonld_objects(tree):
+        if not is_article_object(obj):
+            continue
+        found.setdefault("title", obj.get("headline") if isinstance(obj.get("headline"), str) else "")
+        found.setdefault("author", author_names(obj.get("author")))
+        date_text, time_text = split_published(obj.get("datePublished"))
+        found.setdefault("date", date_text)
+        found.setdefault("time", time_text)
+        body = obj.get("articleBody")
+        found.setdefault("content", " ".join(body.split()) if isinstance(body, str) else "")
+        break
+
+    # OpenGraph / meta tags for anything JSON-LD did not provide
+    if not found.get("title"):
+        found["title"] = first_meta(tree, TITLE_META)
+    if not found.get("author"):
+        found["author"] = clean_author(first_meta(tree, AUTHOR_META))
+    if not found.get("date") or not found.get("time"):
+        date_text, time_text = split_published(first_meta(tree, PUBLISHED_META))
+        found["date"] = found.get("date") or date_text
+        found["time"] = found.get("time") or time_text
+
+    return {
+        field: value.strip()
+        for field, value in found.items()
+        if check_field(field, value) is None
+    }
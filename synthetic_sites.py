@@ -0,0 +1,370 @@
+"""
+Synthetic multi-publisher news sites and a stub LLM for load tests (see load_test.py)
+
+One local HTTP server plays every site. Scraper processes reach it as their HTTP proxy, so
+article URLs keep distinct public-looking hosts (http://synthetic-news-17.com/article/42) and
+therefore distinct domain keys, without any DNS or real traffic. The same server answers the
+OpenAI chat completions API (OPENAI_BASE_URL) with the correct XPaths, or field values for
+direct extraction, of the page's template, so no real LLM is called.
+
+Every page is a deterministic function of (seed, domain index, article index):
+    templates  - 'classic' (JSON-LD), 'magazine' (OpenGraph title only), 'bare' (no metadata)
+                 and 'redesign', each with its own markup and date format
+    redesigns  - every REDESIGN_EVERY-th domain switches to 'redesign' halfway through its articles
+    slow pages - SLOW_FRACTION of the articles answer after SLOW_SECONDS
+    failures   - FLAKY_FRACTION answer 503 to their first request (the fetch retry recovers them),
+                 FAIL_FRACTION always answer 500
+
+    python synthetic_sites.py --domains 20 --articles 50 --port 8900
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from lxml import html
+
+from xpath_evaluator import evaluate_xpath, extract_datetime_from_elements, joined_text
+
+
+HOST_PATTERN = re.compile(r'^synthetic-news-(\d+)\.com$')
+ARTICLE_PATH = re.compile(r'^/article/(\d+)$')
+BASE_TEMPLATES = ['classic', 'magazine', 'bare']
+REDESIGN_EVERY = 5
+SLOW_FRACTION = 0.02
+SLOW_SECONDS = 3
+FLAKY_FRACTION = 0.02
+FAIL_FRACTION = 0.01
+PUBLISHED_START = datetime(2025, 1, 1, 6, 0)
+
+WORDS = ("market budget council river election harbour festival railway monsoon vaccine startup "
+         "tariff airport cricket senate drought museum reform satellite coastline factory pension "
+         "highway summit research orchestra wildfire refinery transit parliament hospital harvest "
+         "currency stadium courtroom vineyard glacier shipyard telescope bakery").split()
+FIRST_NAMES = "Asha Ravi Meera Tom Lina Omar Priya Jonas Sara Dev Nora Ken".split()
+LAST_NAMES = "Rao Iyer Okafor Brandt Silva Mehta Novak Haddad Lund Kim".split()
+
+# Markup, ground-truth XPaths and date format of every template.
+# The layout-* class survives clean_html, the stub LLM uses it to recognise the template.
+TEMPLATES = {
+    'classic': {
+        'jsonld': True,
+        'date_format': '%B %d, %Y %I:%M %p',
+        'body': '''<div class="layout-classic"><nav><a href="/">Home</a></nav>
+<h1 class="headline">{title}</h1>
+<div class="byline"><a class="author-link" href="/authors/{author_slug}">{author}</a></div>
+<time class="published" datetime="{iso}">{date_text}</time>
+<div class="article-body">{paragraphs}</div>
+<aside class="related"><a href="/article/{related}">Related story</a></aside></div>''',
+        'xpaths': {
+            'author': "//div[contains(@class, 'byline')]/a",
+            'date': "//time[@datetime]",
+            'time': "//time[@datetime]",
+            'title': "//h1[contains(@class, 'headline')]",
+            'content': "//div[contains(@class, 'article-body')]//p",
+        },
+    },
+    'magazine': {
+        'og': True,
+        'date_format': '%d %b %Y, %H:%M',
+        'body': '''<div class="layout-magazine"><header class="masthead"><h2 class="section">World</h2></header>
+<h1 class="story-title">{title}</h1>
+<div class="meta"><span class="author-name">{author}</span> <span class="pub-date">{date_text}</span></div>
+<div class="story-content">{paragraphs}</div>
+<footer><p>Copyright synthetic news</p></footer></div>''',
+        'xpaths': {
+            'author': "//span[contains(@class, 'author-name')]",
+            'date': "//span[contains(@class, 'pub-date')]",
+            'time': "//span[contains(@class, 'pub-date')]",
+            'title': "//h1[contains(@class, 'story-title')]",
+            'content': "//div[contains(@class, 'story-content')]//p",
+        },
+    },
+    'bare': {
+        'date_format': '%A, %d %B %Y %I:%M %p',
+        'body': '''<div class="layout-bare"><div class="top"><h2 class="story-headline">{title}</h2></div>
+<p class="writer"><span>{author}</span></p>
+<div class="dateline">Updated: {date_text}</div>
+<section class="story-text">{paragraphs}</section></div>''',
+        'xpaths': {
+            'author': "//p[contains(@class, 'writer')]/span",
+            'date': "//div[contains(@class, 'dateline')]",
+            'time': "//div[contains(@class, 'dateline')]",
+            'title': "//h2[contains(@class, 'story-headline')]",
+            'content': "//section[contains(@class, 'story-text')]//p",
+        },
+    },
+    'redesign': {
+        'date_format': '%Y-%m-%d %H:%M',
+        'body': '''<main class="layout-redesign"><article class="post">
+<header class="post-header"><h1 itemprop="headline">{title}</h1>
+<a rel="author" class="post-author">{author}</a> <span class="post-ts">{date_text}</span></header>
+<div class="rich-text">{paragraphs}</div></article></main>''',
+        'xpaths': {
+            'author': "//a[@rel='author']",
+            'date': "//span[contains(@class, 'post-ts')]",
+            'time': "//span[contains(@class, 'post-ts')]",
+            'title': "//h1[@itemprop='headline']",
+            'content': "//div[contains(@class, 'rich-text')]//p",
+        },
+    },
+}
+
+
+def article_url(domain_index, article_index):
+    return f"http://synthetic-news-{domain_index}.com/article/{article_index}"
+
+
+def site_template(domain_index, article_index, articles_per_domain):
+    """Template of an article, redesigned domains switch halfway through their articles."""
+    redesigned = domain_index % REDESIGN_EVERY == REDESIGN_EVERY - 1
+    if redesigned and article_index >= articles_per_domain // 2:
+        return 'redesign'
+    return BASE_TEMPLATES[domain_index % len(BASE_TEMPLATES)]
+
+
+def page_behaviour(seed, domain_index, article_index):
+    """'slow', 'flaky', 'fail' or 'normal' for an article."""
+    roll = random.Random(f"{seed}-behaviour-{domain_index}-{article_index}").random()
+    if roll < FAIL_FRACTION:
+        return 'fail'
+    if roll < FAIL_FRACTION + FLAKY_FRACTION:
+        return 'flaky'
+    if roll < FAIL_FRACTION + FLAKY_FRACTION + SLOW_FRACTION:
+        return 'slow'
+    return 'normal'
+
+
+def article_fields(seed, domain_index, article_index):
+    """Ground truth of an article: author, title, published datetime and paragraphs."""
+    rng = random.Random(f"{seed}-article-{domain_index}-{article_index}")
+    title_words = rng.sample(WORDS, 6)
+    title = " ".join(title_words).capitalize() + f" in district {article_index}"
+    paragraphs = []
+    for i in range(rng.randint(4, 7)):
+        sentences = []
+        for _ in range(rng.randint(3, 5)):
+            words = rng.sample(WORDS, rng.randint(6, 12))
+            sentences.append(" ".join(words).capitalize() + ".")
+        if i == 0:
+            # The lead repeats the headline, as news leads do (and the title/content check expects)
+            sentences.insert(0, f"{title} was reported on {' '.join(title_words[:3])}.")
+        paragraphs.append(" ".join(sentences))
+    return {
+        'author': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'title': title,
+        'published': PUBLISHED_START + timedelta(hours=domain_index * 7 + article_index * 5),
+        'paragraphs': paragraphs,
+    }
+
+
+def render_article(seed, domain_index, article_index, articles_per_domain):
+    template_name = site_template(domain_index, article_index, articles_per_domain)
+    template = TEMPLATES[template_name]
+    fields = article_fields(seed, domain_index, article_index)
+    published = fields['published']
+
+    head = [f"<title>{fields['title']} | Synthetic News {domain_index}</title>"]
+    if template.get('jsonld'):
+        head.append('<script type="application/ld+json">' + json.dumps({
+            '@context': 'https://schema.org', '@type': 'NewsArticle', 'headline': fields['title'],
+            'datePublished': published.isoformat() + '+05:30',
+            'author': {'@type': 'Person', 'name': fields['author']},
+        }) + '</script>')
+    if template.get('og'):
+        head.append(f'<meta property="og:title" content="{fields["title"]}">')
+    head.append("<script>window.analytics = {queue: []};</script><style>body {margin: 0}</style>")
+
+    body = template['body'].format(
+        title=fields['title'],
+        author=fields['author'],
+        author_slug=fields['author'].lower().replace(' ', '-'),
+        iso=published.isoformat() + '+05:30',
+        date_text=published.strftime(template['date_format']),
+        paragraphs="".join(f"<p>{p}</p>" for p in fields['paragraphs']),
+        related=(article_index + 1) % max(articles_per_domain, 1),
+    )
+    return f"<!DOCTYPE html><html><head>{''.join(head)}</head><body>{body}</body></html>"
+
+
+# STUB LLM
+# ===============================================
+
+def template_of_html(cleaned_html):
+    for name in TEMPLATES:
+        if f"layout-{name}" in cleaned_html:
+            return name
+    return None
+
+
+def stub_completion(messages):
+    """
+    (call_kind, reply text) for a chat completion request made by LLM_XPATH_GENERATION.py:
+    all XPaths for the initial prompt, the failed fields' XPaths for a correction prompt, and
+    the failed fields' values for a direct extraction prompt.
+    """
+    system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+    page = next((m['content'] for m in messages if m['role'] == 'user'), '')
+    template = TEMPLATES.get(template_of_html(page))
+    if template is None:
+        return 'unknown', '{}'
+    xpaths = template['xpaths']
+
+    if 'Extract the requested fields DIRECTLY' in system:
+        listed = system.split('FAILED FIELDS TO EXTRACT:', 1)[1].split('\n\n', 1)[0]
+        failed = [field.strip() for field in listed.split(',') if field.strip()]
+        tree = html.fromstring(page)
+        values = {}
+        for field in failed:
+            nodes = evaluate_xpath(tree, xpaths.get(field, ''))
+            if field in ('date', 'time'):
+                date_text, time_text = extract_datetime_from_elements(nodes, field)
+                values[field] = date_text if field == 'date' else time_text
+            else:
+                values[field] = joined_text(nodes)
+        return 'direct', json.dumps(values)
+
+    if 'CORRECTED XPath' in system:
+        feedback = system.split('FAILED FIELDS AND FEEDBACK:', 1)[1]
+        return 'retry', json.dumps({field: xpath for field, xpath in xpaths.items() if f'"{field}"' in feedback})
+
+    return 'initial', json.dumps(xpaths)
+
+
+# SERVER
+# ===============================================
+
+class SyntheticSites(ThreadingHTTPServer):
+    """Synthetic sites (as an HTTP proxy) and the stub LLM on one port, with request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, domains, articles, seed=1, llm_latency=0.0):
+        super().__init__(address, SyntheticHandler)
+        self.domains = domains
+        self.articles = articles
+        self.seed = seed
+        self.llm_latency = llm_latency
+        self.counters = Counter()
+        self.flaky_seen = set()
+        self.lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def first_request(self, key):
+        with self.lock:
+            if key in self.flaky_seen:
+                return False
+            self.flaky_seen.add(key)
+            return True
+
+    def handle_error(self, request, client_address):
+        # Scrapers closing connections early (timeouts, size limits) are not server errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def urls(self):
+        """Every article URL, domain after domain."""
+        for domain_index in range(self.domains):
+            for article_index in range(self.articles):
+                yield article_url(domain_index, article_index)
+
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        host = (parts.hostname or self.headers.get('Host', '')).split(':')[0]
+        host_match = HOST_PATTERN.match(host)
+        path_match = ARTICLE_PATH.match(parts.path)
+        server = self.server
+        if not host_match or not path_match:
+            return self.send_body(404, b'not found', 'text/plain')
+
+        domain_index, article_index = int(host_match.group(1)), int(path_match.group(1))
+        if domain_index >= server.domains or article_index >= server.articles:
+            return self.send_body(404, b'not found', 'text/plain')
+
+        behaviour = page_behaviour(server.seed, domain_index, article_index)
+        if behaviour == 'fail':
+            server.count('pages_failed')
+            return self.send_body(500, b'internal error', 'text/plain')
+        if behaviour == 'flaky' and server.first_request((domain_index, article_index)):
+            server.count('pages_flaky')
+            return self.send_body(503, b'try again', 'text/plain')
+        if behaviour == 'slow':
+            server.count('pages_slow')
+            time.sleep(SLOW_SECONDS)
+
+        server.count('pages_served')
+        page = render_article(server.seed, domain_index, article_index, server.articles)
+        self.send_body(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def do_POST(self):
+        if not urlsplit(self.path).path.endswith('/chat/completions'):
+            return self.send_body(404, b'{}', 'application/json')
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.server.llm_latency:
+            time.sleep(self.server.llm_latency)
+
+        kind, reply = stub_completion(request.get('messages', []))
+        self.server.count(f'llm_{kind}')
+        prompt_chars = sum(len(m.get('content', '')) for m in request.get('messages', []))
+        body = json.dumps({
+            'id': 'chatcmpl-synthetic', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': reply}}],
+            'usage': {'prompt_tokens': prompt_chars // 4, 'completion_tokens': len(reply) // 4,
+                      'total_tokens': (prompt_chars + len(reply)) // 4},
+        }).encode('utf-8')
+        self.send_body(200, body, 'application/json')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(domains, articles, seed=1, llm_latency=0.0, host='127.0.0.1', port=0):
+    """Start SyntheticSites in a background thread, returns the server (server.server_port for the port)."""
+    server = SyntheticSites((host, port), domains, articles, seed=seed, llm_latency=llm_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve synthetic news sites and a stub LLM')
+    parser.add_argument('--domains', type=int, default=20, help='Number of sites (default: 20)')
+    parser.add_argument('--articles', type=int, default=50, help='Articles per site (default: 50)')
+    parser.add_argument('--seed', type=int, default=1, help='Content seed (default: 1)')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds the stub LLM waits per call')
+    parser.add_argument('--port', type=int, default=8900, help='Port (default: 8900)')
+    args = parser.parse_args()
+
+    server = SyntheticSites(('127.0.0.1', args.port), args.domains, args.articles, args.seed, args.llm_latency)
+    print(f"Synthetic sites: {args.domains} domains x {args.articles} articles on 127.0.0.1:{args.port}")
+    print(f"  HTTP_PROXY=http://127.0.0.1:{args.port} OPENAI_BASE_URL=http://127.0.0.1:{args.port}/v1")
+    print(f"  e.g. {article_url(0, 0)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
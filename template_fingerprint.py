@@ -0,0 +1,80 @@
+"""
+Template-change detection for tracked domains
+Each domain keeps a structural fingerprint of its article template in TRACKING_DOMAINS.
+A page whose structure no longer matches it (and whose stored XPaths fail) signals a redesign:
+one run claims a short relearn lease and learns the new XPaths, the domain's other in-flight
+pages are deferred until it is done, so a redesign costs one LLM round instead of one per page.
+"""
+
+import json
+import re
+import time
+from collections import Counter
+
+
+FINGERPRINT_SIZE = 80         # most frequent parent>child element signatures kept per template
+SHIFT_SIMILARITY = 0.35       # Jaccard similarity below this means a different template
+RELEARN_LEASE_SECONDS = 300   # a crashed relearn run blocks the domain for at most this long
+DIGITS = re.compile(r'\d')
+
+
+def element_signature(elem):
+    """tag.class1.class2 - class tokens with digits (build hashes, ids) are ignored."""
+    classes = sorted(c for c in (elem.get('class') or '').split() if not DIGITS.search(c))
+    return ".".join([elem.tag] + classes)
+
+
+def template_fingerprint(tree):
+    """Sorted list of the most frequent parent>child signatures in the page body."""
+    body = tree.find('.//body')
+    root = body if body is not None else tree
+    pairs = Counter()
+    for elem in root.iter():
+        parent = elem.getparent()
+        if not isinstance(elem.tag, str) or parent is None:
+            continue
+        pairs[f"{element_signature(parent)}>{element_signature(elem)}"] += 1
+    return sorted(pair for pair, _ in pairs.most_common(FINGERPRINT_SIZE))
+
+
+def fingerprint_similarity(a, b):
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def load_fingerprint(value):
+    """Stored TemplateFingerprint column -> list ([] when not recorded yet)."""
+    try:
+        return json.loads(value) if value else []
+    except ValueError:
+        return []
+
+
+# RELEARN LEASE
+# ===============================================
+
+def claim_relearn(conn, domain):
+    """Take the domain's relearn lease. False if another run is relearning it right now."""
+    now = time.time()
+    cursor = conn.execute('''
+        UPDATE TRACKING_DOMAINS SET RelearningSince = ?
+        WHERE Domain = ? AND (RelearningSince IS NULL OR RelearningSince < ?)
+    ''', (now, domain, now - RELEARN_LEASE_SECONDS))
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def release_relearn(conn, domain):
+    conn.execute("UPDATE TRACKING_DOMAINS SET RelearningSince = NULL WHERE Domain = ?", (domain,))
+    conn.commit()
+
+
+def save_fingerprint(conn, domain, fingerprint):
+    """Store the domain's template fingerprint and release any relearn lease."""
+    conn.execute(
+        "UPDATE TRACKING_DOMAINS SET TemplateFingerprint = ?, RelearningSince = NULL WHERE Domain = ?",
+        (json.dumps(fingerprint), domain)
+    )
+    conn.commit()
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain_scheduler import describe_schedule, schedule_stream, schedule_urls, url_domain
+
+
+def sorted_by_domain(domains, per_domain):
+    return [f"https://www.{domain}.com/article/{i}" for domain in domains for i in range(per_domain)]
+
+
+class ScheduleUrlsTest(unittest.TestCase):
+
+    def test_learned_domains_first_smallest_backlog_first(self):
+        urls = (sorted_by_domain(['newsite'], 3) + sorted_by_domain(['bigpaper'], 3)
+                + sorted_by_domain(['smallpaper'], 1))
+        order = [url_domain(url) for url in schedule_urls(urls, {'bigpaper', 'smallpaper'})]
+        self.assertEqual(order, ['smallpaper', 'bigpaper', 'newsite', 'bigpaper', 'newsite', 'bigpaper', 'newsite'])
+
+    def test_new_domain_sends_one_pioneer_per_round(self):
+        urls = sorted_by_domain(['alpha'], 3) + sorted_by_domain(['beta'], 2)
+        scheduled = list(schedule_urls(urls, set()))
+        self.assertEqual(scheduled[:2], ['https://www.alpha.com/article/0', 'https://www.beta.com/article/0'])
+        self.assertEqual(sorted(scheduled), sorted(urls))
+
+    def test_describe_schedule(self):
+        urls = sorted_by_domain(['alpha', 'beta', 'gamma'], 2)
+        self.assertEqual(describe_schedule(urls, {'alpha'}),
+                         "3 domains (1 learned, 2 new, one pioneer URL each)")
+
+
+class ScheduleStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'articles.db')  # no TRACKING_DOMAINS: every domain is new
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_input_sorted_by_domain_comes_out_interleaved(self):
+        urls = sorted_by_domain(['alpha', 'beta', 'gamma'], 30)
+        scheduled = list(schedule_stream(urls, window=12, db_path=self.db_path))
+
+        self.assertEqual(sorted(scheduled), sorted(urls))
+        self.assertEqual([url_domain(url) for url in scheduled], ['alpha', 'beta', 'gamma'] * 30)
+        # Each domain keeps its own input order
+        self.assertEqual([url for url in scheduled if 'alpha' in url], urls[:30])
+
+    def test_large_first_domain_does_not_hold_back_the_rest(self):
+        urls = sorted_by_domain(['alpha'], 5000) + sorted_by_domain(['beta', 'gamma'], 10)
+        scheduled = schedule_stream(urls, window=100, db_path=self.db_path)
+        first = [url_domain(next(scheduled)) for _ in range(6)]
+        self.assertEqual(first, ['alpha', 'beta', 'gamma'] * 2)
+        self.assertEqual(len(list(scheduled)) + 6, len(urls))
+
+    def test_read_ahead_is_bounded(self):
+        consumed = []
+
+        def endless():
+            i = 0
+            while True:
+                consumed.append(i)
+                yield f"https://www.alpha.com/article/{i}"
+                i += 1
+
+        scheduled = schedule_stream(endless(), window=10, db_path=self.db_path, read_ahead=50)
+        next(scheduled)
+        self.assertLessEqual(len(consumed), 10 + 50)
+        scheduled.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
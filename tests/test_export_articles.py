@@ -0,0 +1,85 @@
+import gzip
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import export_articles
+from export_articles import export_articles as run_export
+
+
+class PartitionedExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'Create_Articles_Database.py')],
+                       cwd=self.tmp.name, check=True, capture_output=True)
+        self.db_path = os.path.join(self.tmp.name, 'articles.db')
+        self.out = os.path.join(self.tmp.name, 'exports')
+        self.state = os.path.join(self.tmp.name, 'export_state.json')
+        # Domains interleaved in rowid order, plus rows without a domain
+        self.insert([('beta', 'b1'), ('alpha', 'a1'), (None, 'n1'), ('beta', 'b2'), ('gamma', 'g1'), ('alpha', 'a2')])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def insert(self, rows):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("INSERT INTO ARTICLES (Domain, URL, Title) VALUES (?, ?, ?)",
+                         ((domain, url, url.upper()) for domain, url in rows))
+        conn.commit()
+        conn.close()
+
+    def read_partition(self, name, file_name):
+        with gzip.open(os.path.join(self.out, f"domain={name}", file_name + '.gz'), 'rt', encoding='utf-8') as f:
+            return [json.loads(line)['URL'] for line in f]
+
+    def test_one_writer_open_at_a_time(self):
+        open_writers = []
+        most_open = []
+        writer_class = export_articles.JsonlWriter
+
+        class TrackingWriter(writer_class):
+            def __init__(self, *args):
+                super().__init__(*args)
+                open_writers.append(self)
+                most_open.append(len(open_writers))
+
+            def close(self):
+                super().close()
+                open_writers.remove(self)
+
+        with mock.patch.object(export_articles, 'JsonlWriter', TrackingWriter):
+            exported = run_export(self.db_path, self.out, compression='gzip', chunk_size=1,
+                                  partition_by_domain=True, state_file=self.state)
+
+        self.assertEqual(exported, 6)
+        self.assertEqual(max(most_open), 1)
+        self.assertEqual(open_writers, [])
+        self.assertEqual(sorted(os.listdir(self.out)),
+                         ['domain=alpha', 'domain=beta', 'domain=gamma', 'domain=unknown'])
+        self.assertEqual(self.read_partition('alpha', 'articles-1-6.jsonl'), ['a1', 'a2'])
+        self.assertEqual(self.read_partition('beta', 'articles-1-6.jsonl'), ['b1', 'b2'])
+        self.assertEqual(self.read_partition('unknown', 'articles-1-6.jsonl'), ['n1'])
+
+    def test_incremental_partitioned_export_writes_only_domains_with_new_rows(self):
+        run_export(self.db_path, self.out, compression='gzip', partition_by_domain=True, state_file=self.state)
+        self.insert([('gamma', 'g2'), ('delta', 'd1')])
+
+        exported = run_export(self.db_path, self.out, compression='gzip', partition_by_domain=True,
+                              state_file=self.state, incremental=True)
+        self.assertEqual(exported, 2)
+        self.assertEqual(self.read_partition('gamma', 'articles-7-8.jsonl'), ['g2'])
+        self.assertEqual(self.read_partition('delta', 'articles-7-8.jsonl'), ['d1'])
+        self.assertEqual(os.listdir(os.path.join(self.out, 'domain=alpha')), ['articles-1-6.jsonl.gz'])
+
+
+if __name__ == '__main__':
+    unittest.main()
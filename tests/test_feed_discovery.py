@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import feed_discovery
+
+
+RSS = '''<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Fixture</title>
+{items}
+</channel></rss>'''
+RSS_ITEM = '<item><title>{guid}</title><link>{root}/{guid}</link><guid>{guid}</guid><pubDate>{date}</pubDate></item>'
+UNDATED_ITEM = '<item><title>{guid}</title><link>{root}/{guid}</link><guid>{guid}</guid></item>'
+
+ATOM = '''<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Fixture</title>
+<entry><id>atom-1</id><link rel="alternate" href="{root}/atom-1"/><updated>2025-11-06T08:00:00Z</updated></entry>
+<entry><id>atom-2</id><link rel="alternate" href="{root}/atom-2"/><updated>2025-11-06T09:00:00Z</updated></entry>
+</feed>'''
+
+SITEMAP_INDEX = '''<?xml version="1.0"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>{root}/sitemap-2019.xml</loc><lastmod>2019-01-01T00:00:00Z</lastmod></sitemap>
+<sitemap><loc>{root}/sitemap-2025-11.xml</loc><lastmod>2025-11-06T10:00:00Z</lastmod></sitemap>
+</sitemapindex>'''
+
+URLSET = '''<?xml version="1.0"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>{root}/{name}</loc><lastmod>{date}</lastmod></url>
+</urlset>'''
+
+HOME = '''<html><head>
+<link rel="alternate" type="application/rss+xml" href="/rss.xml">
+<link rel="alternate" type="application/atom+xml" href="/atom-feed.xml">
+</head><body>Fixture</body></html>'''
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves server.pages with an ETag per body and answers If-None-Match with 304."""
+
+    def do_GET(self):
+        # Logged before answering so the test sees the entry as soon as the client returns
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.server.log.append((self.path, 404))
+            self.send_error(404)
+            return
+        body = page.encode('utf-8')
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.server.log.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.server.log.append((self.path, 200))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html' if self.path == '/' else 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FeedDiscoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        self.server.log = []
+        self.server.pages = {}
+        self.root = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.set_rss([('rss-1', 'Thu, 06 Nov 2025 08:00:00 GMT'), ('rss-2', 'Thu, 06 Nov 2025 09:00:00 GMT')])
+        self.server.pages.update({
+            '/robots.txt': f"User-agent: *\nSitemap: {self.root}/news-sitemap-index.xml\n",
+            '/': HOME,
+            '/news-sitemap-index.xml': SITEMAP_INDEX.format(root=self.root),
+            '/sitemap-2019.xml': URLSET.format(root=self.root, name='old-2019', date='2019-01-01'),
+            '/sitemap-2025-11.xml': URLSET.format(root=self.root, name='new-2025', date='2025-11-06T10:00:00Z'),
+            '/atom-feed.xml': ATOM.format(root=self.root),
+        })
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.tmp = tempfile.TemporaryDirectory()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'Create_Feeds_Database.py')],
+                       cwd=self.tmp.name, check=True, capture_output=True)
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, 'articles.db'))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def set_rss(self, items):
+        self.server.pages['/rss.xml'] = RSS.format(items="\n".join(
+            (RSS_ITEM if date else UNDATED_ITEM).format(root=self.root, guid=guid, date=date) for guid, date in items))
+
+    def stored_guids(self, path):
+        raw = self.conn.execute("SELECT SeenGUIDs FROM FEEDS WHERE FeedURL = ?", (self.root + path,)).fetchone()[0]
+        return [guid for _, guid in json.loads(raw)]
+
+    def poll(self, path):
+        feed_discovery.add_feed(self.conn, 'fixture', self.root + path)
+        return feed_discovery.poll_feed(self.conn, self.root + path)
+
+    def test_discovers_sitemap_index_and_advertised_feeds(self):
+        self.assertEqual(feed_discovery.find_feeds(self.root), [
+            f"{self.root}/news-sitemap-index.xml",
+            f"{self.root}/rss.xml",
+            f"{self.root}/atom-feed.xml",
+        ])
+
+    def test_second_poll_yields_nothing_and_uses_304(self):
+        for path, first in (('/rss.xml', ['rss-1', 'rss-2']), ('/atom-feed.xml', ['atom-1', 'atom-2'])):
+            with self.subTest(feed=path):
+                self.assertEqual(self.poll(path), [f"{self.root}/{name}" for name in first])
+                self.assertEqual(self.poll(path), [])
+                self.assertEqual(self.server.log[-1], (path, 304))
+
+    def test_unseen_guids_at_or_below_high_water_mark_are_found(self):
+        self.poll('/rss.xml')
+        self.set_rss([
+            ('rss-1', 'Thu, 06 Nov 2025 08:00:00 GMT'),
+            ('rss-2', 'Thu, 06 Nov 2025 09:00:00 GMT'),
+            ('rss-same-time', 'Thu, 06 Nov 2025 09:00:00 GMT'),
+            ('rss-late', 'Wed, 05 Nov 2025 22:00:00 GMT'),
+            ('rss-archive', 'Mon, 01 Sep 2025 09:00:00 GMT'),
+        ])
+        self.assertEqual(self.poll('/rss.xml'), [f"{self.root}/rss-same-time", f"{self.root}/rss-late"])
+        self.assertEqual(self.poll('/rss.xml'), [])
+
+    def test_sitemap_index_follows_newest_children_first(self):
+        with mock.patch.object(feed_discovery, 'MAX_CHILD_SITEMAPS', 1):
+            self.assertEqual(self.poll('/news-sitemap-index.xml'), [f"{self.root}/new-2025"])
+        self.assertNotIn(('/sitemap-2019.xml', 200), self.server.log)
+
+        # Once the index changes, children not modified since the high-water mark are skipped
+        self.server.pages['/news-sitemap-index.xml'] += '\n'
+        self.assertEqual(self.poll('/news-sitemap-index.xml'), [])
+        self.assertEqual(self.server.log[-1], ('/news-sitemap-index.xml', 200))
+
+    def test_newest_guids_are_kept_when_trimming(self):
+        # Newest first, like most feeds; the two oldest fall outside the lookback window
+        newest_first = [
+            ('n1', 'Thu, 06 Nov 2025 09:00:00 GMT'),
+            ('n2', 'Thu, 06 Nov 2025 08:00:00 GMT'),
+            ('n3', 'Thu, 06 Nov 2025 07:00:00 GMT'),
+            ('n4', 'Sat, 01 Nov 2025 09:00:00 GMT'),
+            ('n5', 'Fri, 31 Oct 2025 09:00:00 GMT'),
+        ]
+        self.set_rss(newest_first)
+        with mock.patch.object(feed_discovery, 'MAX_SEEN_GUIDS', 3):
+            self.assertEqual(len(self.poll('/rss.xml')), 5)
+            self.assertEqual(self.stored_guids('/rss.xml'), ['n1', 'n2', 'n3'])
+
+            self.set_rss([('n0', 'Thu, 06 Nov 2025 10:00:00 GMT')] + newest_first)
+            self.assertEqual(self.poll('/rss.xml'), [f"{self.root}/n0"])
+
+    def test_undated_items_are_yielded_once_and_age_out(self):
+        self.set_rss([('u1', ''), ('u2', '')])
+        self.assertEqual(self.poll('/rss.xml'), [f"{self.root}/u1", f"{self.root}/u2"])
+        self.set_rss([('u1', ''), ('u2', ''), ('d1', 'Thu, 06 Nov 2025 09:00:00 GMT')])
+        self.assertEqual(self.poll('/rss.xml'), [f"{self.root}/d1"])
+        self.assertEqual(set(self.stored_guids('/rss.xml')), {'u1', 'u2', 'd1'})
+
+        # Once they leave the feed, their stamp falls behind the high-water mark like any other item
+        self.set_rss([('future', 'Thu, 01 Jan 2099 09:00:00 GMT')])
+        self.assertEqual(self.poll('/rss.xml'), [f"{self.root}/future"])
+        self.assertEqual(self.stored_guids('/rss.xml'), ['future'])
+
+    def test_plain_guid_lists_of_older_rows_are_read(self):
+        feed_discovery.add_feed(self.conn, 'fixture', self.root + '/rss.xml')
+        self.conn.execute("UPDATE FEEDS SET HighWaterMark = ?, SeenGUIDs = ? WHERE FeedURL = ?",
+                          ('2025-11-06T09:00:00Z', json.dumps(['rss-1', 'rss-2']), self.root + '/rss.xml'))
+        self.assertEqual(self.poll('/rss.xml'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import field_validator
+from field_validator import (
+    AUTHOR_MAX_LENGTH, CONTENT_MIN_LENGTH, TITLE_CONTENT_FEEDBACK,
+    check_field, failed_fields_and_feedback, passed_fields, validate_records,
+)
+
+
+TITLE = "Monsoon session of parliament begins"
+CONTENT = "The monsoon session of parliament began on Monday with a long agenda. " * 3
+
+
+class CheckFieldTest(unittest.TestCase):
+
+    def test_empty_and_missing_values_fail_the_first_rule(self):
+        self.assertEqual(check_field('author', None), "Empty Author field")
+        self.assertEqual(check_field('date', "   "), "Empty date field")
+        self.assertEqual(check_field('content', ""), "Empty content field")
+
+    def test_length_rules(self):
+        self.assertIsNone(check_field('author', "A" * AUTHOR_MAX_LENGTH))
+        self.assertEqual(check_field('author', "A" * (AUTHOR_MAX_LENGTH + 1)), "Author length too big")
+        self.assertEqual(check_field('title', "Short"), "Title too short (only 5 chars)")
+        self.assertEqual(check_field('content', "x" * (CONTENT_MIN_LENGTH - 1)),
+                         f"Content too short (only {CONTENT_MIN_LENGTH - 1} chars)")
+        self.assertIsNone(check_field('title', TITLE))
+        self.assertIsNone(check_field('time', "02:30 PM IST"))
+
+
+class ValidateRecordsTest(unittest.TestCase):
+
+    def test_overlap_runs_once_per_pair_and_only_after_length_checks(self):
+        records = [
+            {'title': TITLE, 'content': CONTENT},
+            {'title': TITLE, 'content': CONTENT},
+            {'title': "Short", 'content': CONTENT},
+        ]
+        with mock.patch.object(field_validator, 'compare_texts', return_value=1) as compare:
+            results = validate_records(records, fields=['title', 'content'])
+        compare.assert_called_once()
+        self.assertEqual(results[0], {'title': None, 'content': None})
+        self.assertEqual(results[2]['title'], "Title too short (only 5 chars)")
+        self.assertIsNone(results[2]['content'])
+
+    def test_no_overlap_fails_content(self):
+        with mock.patch.object(field_validator, 'compare_texts', return_value=0):
+            [result] = validate_records([{'title': TITLE, 'content': CONTENT}], fields=['title', 'content'])
+        self.assertEqual(result['content'], TITLE_CONTENT_FEEDBACK)
+        self.assertEqual(failed_fields_and_feedback(result), (['content'], {'content': TITLE_CONTENT_FEEDBACK}))
+        self.assertEqual(passed_fields(result), ['title'])
+
+    def test_field_subset_skips_the_overlap(self):
+        with mock.patch.object(field_validator, 'compare_texts') as compare:
+            [result] = validate_records([{'title': TITLE, 'date': ""}], fields=['title', 'date'])
+        compare.assert_not_called()
+        self.assertEqual(result, {'title': None, 'date': "Empty date field"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,328 @@
+import gzip
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scraper import iter_urls
+from job_queue import SQLiteQueueBackend, RedisQueueBackend, WatchError, enqueue_stream
+
+
+class StubRedis:
+    """
+    In-process stand-in for the redis-py commands RedisQueueBackend uses, including WATCH/MULTI.
+    before_execute (if set) runs once just before the next transaction commits, to simulate
+    another client writing in between.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.versions = {}
+        self.before_execute = None
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _get(self, key, default=None):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key)
+            self._touch(key)
+        return self.data.get(key, default)
+
+    def _put(self, key, value):
+        self._touch(key)
+        if value or value == 0:
+            self.data[key] = value
+        else:
+            self.data.pop(key, None)  # empty containers do not exist in Redis
+
+    def pipeline(self):
+        return StubPipeline(self)
+
+    # strings
+    def get(self, key):
+        return self._get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self._get(key) is not None:
+            return None
+        self._put(key, str(value))
+        self.expiry.pop(key, None)
+        if ex:
+            self.expiry[key] = time.time() + ex
+        return True
+
+    def incr(self, key):
+        value = int(self._get(key, 0)) + 1
+        self._put(key, str(value))
+        return value
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._get(key) is not None:
+                self._put(key, None)
+                self.expiry.pop(key, None)
+                removed += 1
+        return removed
+
+    def expire(self, key, seconds):
+        if self._get(key) is None:
+            return False
+        self.expiry[key] = time.time() + seconds
+        self._touch(key)
+        return True
+
+    # hashes
+    def hget(self, key, field):
+        return self._get(key, {}).get(field)
+
+    def hset(self, key, field, value):
+        fields = dict(self._get(key, {}))
+        fields[field] = str(value)
+        self._put(key, fields)
+
+    def hsetnx(self, key, field, value):
+        if field in self._get(key, {}):
+            return False
+        self.hset(key, field, value)
+        return True
+
+    def hvals(self, key):
+        return list(self._get(key, {}).values())
+
+    # lists
+    def rpush(self, key, *values):
+        self._put(key, self._get(key, []) + [str(v) for v in values])
+
+    def lpop(self, key):
+        items = self._get(key, [])
+        if not items:
+            return None
+        self._put(key, items[1:])
+        return items[0]
+
+    def lrange(self, key, start, end):
+        items = self._get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self._put(key, self.lrange(key, start, end))
+
+    def llen(self, key):
+        return len(self._get(key, []))
+
+    # sets
+    def sadd(self, key, *members):
+        current = self._get(key, set())
+        if not set(members) <= current:
+            self._put(key, current | set(members))
+
+    def srem(self, key, *members):
+        current = self._get(key, set())
+        if current & set(members):
+            self._put(key, current - set(members))
+
+    def smembers(self, key):
+        return set(self._get(key, set()))
+
+    # sorted sets
+    def zadd(self, key, mapping):
+        self._put(key, {**self._get(key, {}), **{str(m): float(s) for m, s in mapping.items()}})
+
+    def zrem(self, key, *members):
+        current = self._get(key, {})
+        if not any(m in current for m in members):
+            return 0
+        self._put(key, {m: s for m, s in current.items() if m not in members})
+        return 1
+
+    def zscore(self, key, member):
+        return self._get(key, {}).get(member)
+
+    def zcard(self, key):
+        return len(self._get(key, {}))
+
+    def zrange(self, key, start, end):
+        members = sorted(self._get(key, {}).items(), key=lambda item: item[1])
+        return [m for m, _ in (members[start:] if end == -1 else members[start:end + 1])]
+
+    def zrangebyscore(self, key, low, high):
+        low = float('-inf') if low == '-inf' else float(low)
+        return [m for m, score in sorted(self._get(key, {}).items(), key=lambda item: item[1]) if low <= score <= high]
+
+
+class StubPipeline:
+    """Immediate commands while watching, queued ones after multi() (or without watch), like redis-py."""
+
+    def __init__(self, r):
+        self.r = r
+        self.watched = None
+        self.queued = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.watched = self.queued = None
+
+    def watch(self, *keys):
+        for key in keys:
+            self.r._get(key)  # expire first, an expiry counts as a change
+        self.watched = {key: self.r.versions.get(key, 0) for key in keys}
+
+    def unwatch(self):
+        self.watched = None
+
+    def multi(self):
+        self.queued = []
+
+    def execute(self):
+        queued, watched = self.queued or [], self.watched
+        self.queued = self.watched = None
+        hook, self.r.before_execute = self.r.before_execute, None
+        if hook:
+            hook()
+        if watched and any(self.r.versions.get(key, 0) != version for key, version in watched.items()):
+            raise WatchError()
+        return [getattr(self.r, name)(*args, **kwargs) for name, args, kwargs in queued]
+
+    def __getattr__(self, name):
+        if self.watched is not None and self.queued is None:
+            return getattr(self.r, name)
+        if self.queued is None:
+            self.queued = []
+        return lambda *args, **kwargs: self.queued.append((name, args, kwargs))
+
+
+class StaleCompletionMixin:
+    """A worker whose lease expired and was reclaimed must not complete the job of the new holder."""
+
+    def test_stale_holder_cannot_complete(self):
+        self.backend.enqueue(['https://example.com/a'])
+        [(job_id, _)] = self.backend.claim('worker-a', batch_size=10, lease_seconds=1)
+        time.sleep(1.1)
+
+        # worker-a's lease expired, the claim reclaims the job for worker-b
+        [(reclaimed_id, _)] = self.backend.claim('worker-b', batch_size=10, lease_seconds=60)
+        self.assertEqual(str(reclaimed_id), str(job_id))
+
+        self.assertFalse(self.backend.complete(job_id, 'worker-a', True))
+        self.assertEqual(self.backend.stats().get('leased'), 1)
+
+        self.assertTrue(self.backend.complete(job_id, 'worker-b', False, 'boom'))
+        self.assertEqual(self.backend.stats().get('failed'), 1)
+        self.assertFalse(self.backend.stats().get('leased'))
+
+    def test_holder_completes_once(self):
+        self.backend.enqueue(['https://example.com/b'])
+        [(job_id, _)] = self.backend.claim('worker-a', batch_size=10, lease_seconds=60)
+        self.assertTrue(self.backend.complete(job_id, 'worker-a', True))
+        self.assertFalse(self.backend.complete(job_id, 'worker-a', True))
+        self.assertEqual(self.backend.stats().get('done'), 1)
+
+
+class SQLiteStaleCompletionTest(StaleCompletionMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteQueueBackend(os.path.join(self.tmp.name, 'queue.db'))
+
+    def tearDown(self):
+        self.backend.conn.close()
+        self.tmp.cleanup()
+
+
+class RedisStaleCompletionTest(StaleCompletionMixin, unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('fakeredis is not installed')
+        self.backend = RedisQueueBackend(fakeredis.FakeRedis(), prefix='test')
+
+
+class StubRedisStaleCompletionTest(StaleCompletionMixin, unittest.TestCase):
+    """Runs without any redis package installed."""
+
+    def setUp(self):
+        self.backend = RedisQueueBackend(StubRedis(), prefix='test')
+
+
+class StubRedisClaimTest(unittest.TestCase):
+
+    def setUp(self):
+        self.r = StubRedis()
+        self.backend = RedisQueueBackend(self.r, prefix='test')
+
+    def test_enqueue_during_release_of_exhausted_domain_is_not_lost(self):
+        self.backend.enqueue(['https://www.alpha.com/1'])
+        [(job_id, _)] = self.backend.claim('worker-a', batch_size=10, lease_seconds=60)
+        self.assertTrue(self.backend.complete(job_id, 'worker-a', True))
+
+        # The domain looks exhausted, then another host enqueues to it before the claim commits
+        self.r.before_execute = lambda: self.backend.enqueue(['https://www.alpha.com/2'])
+        jobs = self.backend.claim('worker-a', batch_size=10, lease_seconds=60)
+        self.assertEqual([url for _, url in jobs], ['https://www.alpha.com/2'])
+        self.assertIn('alpha', self.r.smembers('test:domains'))
+
+    def test_expired_domain_lease_is_dropped_from_the_old_holder(self):
+        self.backend.enqueue(['https://www.alpha.com/1', 'https://www.alpha.com/2'])
+        self.backend.claim('worker-a', batch_size=1, lease_seconds=1)
+        time.sleep(1.1)
+
+        # worker-a's job and domain leases expired, worker-b takes the domain over
+        jobs = self.backend.claim('worker-b', batch_size=10, lease_seconds=60)
+        self.assertEqual(len(jobs), 2)
+        self.assertNotIn('alpha', self.r.smembers('test:held:worker-a'))
+
+        # A late heartbeat from worker-a neither extends nor keeps worker-b's domain lease
+        self.backend.heartbeat('worker-a', lease_seconds=600)
+        self.assertEqual(self.r.get('test:domain:alpha'), 'worker-b')
+        self.assertLessEqual(self.r.expiry['test:domain:alpha'], time.time() + 60)
+        self.assertEqual(self.backend.claim('worker-a', batch_size=10, lease_seconds=60), [])
+        self.assertEqual(self.r.smembers('test:held:worker-b'), {'alpha'})
+
+    def test_domains_are_leased_to_one_worker_at_a_time(self):
+        self.backend.enqueue([f'https://www.alpha.com/{i}' for i in range(3)] + ['https://www.beta.com/1'])
+        first = self.backend.claim('worker-a', batch_size=2, lease_seconds=60)
+        second = self.backend.claim('worker-b', batch_size=10, lease_seconds=60)
+        self.assertEqual([url for _, url in first], ['https://www.alpha.com/0', 'https://www.alpha.com/1'])
+        self.assertEqual([url for _, url in second], ['https://www.beta.com/1'])
+        self.assertEqual([url for _, url in self.backend.claim('worker-a', 10, 60)], ['https://www.alpha.com/2'])
+        self.assertEqual(self.backend.stats()['pending'], 0)
+
+
+class EnqueueStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteQueueBackend(os.path.join(self.tmp.name, 'queue.db'))
+
+    def tearDown(self):
+        self.backend.conn.close()
+        self.tmp.cleanup()
+
+    def test_gzip_input_is_enqueued_in_batches(self):
+        path = os.path.join(self.tmp.name, 'urls.txt.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write("# comment\nhttps://www.alpha.com/1\n\nhttps://www.beta.com/1\nhttps://www.alpha.com/1\n"
+                    "https://www.alpha.com/2\nhttps://www.gamma.com/1\n")
+
+        batches = []
+        enqueue = self.backend.enqueue
+        self.backend.enqueue = lambda urls: batches.append(len(urls)) or enqueue(urls)
+
+        self.assertEqual(enqueue_stream(self.backend, iter_urls(path), batch_size=2), 4)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(self.backend.stats(), {'pending': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
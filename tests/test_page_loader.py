@@ -0,0 +1,190 @@
+import codecs
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import page_loader
+from embedded_state import classify_page
+from page_loader import (
+    FetchPolicy, StageTimeout, clean_html, decode_body, load_page, parse_text, resolve_encoding, streamed_encoding,
+)
+
+
+PAGE = b'<html><head><title>Fixture</title></head><body><h1>Headline</h1><p>Body text.</p></body></html>'
+# Client-rendered shell: a little text and inline bundles spread over several streamed chunks
+SHELL = (b'<html><head><title>Shell</title><script>' + b'var bundle = 1;' * 8000 + b'</script></head>'
+         b'<body><div id="root"><p>Loading...</p></div><script>' + b'render();' * 4000 + b'</script></body></html>')
+
+
+class BodyHandler(BaseHTTPRequestHandler):
+    """
+    /stall  sends the headers and the start of the body, then goes silent
+    /cut    closes the connection mid-body on the first request, answers in full afterwards
+    /shell  serves SHELL
+    """
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        first = self.server.requests.count(self.path) == 1
+        body = SHELL if self.path == '/shell' else PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.path == '/stall' or (self.path == '/cut' and first):
+            self.wfile.write(PAGE[:20])
+            self.wfile.flush()
+            if self.path == '/stall':
+                self.server.release.wait(5)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchStageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), BodyHandler)
+        self.server.requests = []
+        self.server.release = threading.Event()
+        self.root = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.policy = FetchPolicy(connect_timeout=2, read_timeout=0.2, total_timeout=10, retries=1, backoff=0.01)
+
+    def tearDown(self):
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_stalled_body_is_retried_then_reported_as_fetch_read(self):
+        for low_memory in (False, True):
+            with self.subTest(low_memory=low_memory):
+                self.server.requests.clear()
+                with self.assertRaises(StageTimeout) as raised:
+                    load_page(self.root + '/stall', low_memory=low_memory, policy=self.policy)
+                self.assertEqual(raised.exception.stage, 'fetch_read')
+                self.assertEqual(raised.exception.seconds, 0.2)
+                self.assertEqual(len(self.server.requests), 2)
+
+    def test_body_cut_off_mid_stream_is_retried(self):
+        for low_memory in (False, True):
+            with self.subTest(low_memory=low_memory):
+                self.server.requests.clear()
+                tree, _, _, _ = load_page(self.root + '/cut', low_memory=low_memory, policy=self.policy)
+                self.assertEqual(tree.findtext('.//h1'), 'Headline')
+                self.assertEqual(len(self.server.requests), 2)
+
+    def test_shell_is_classified_the_same_in_both_modes(self):
+        kinds = []
+        for low_memory in (False, True):
+            tree, _, _, script_bytes = load_page(self.root + '/shell', low_memory=low_memory, policy=self.policy)
+            kinds.append(classify_page(tree, script_bytes))
+        self.assertEqual(kinds[0], kinds[1])
+        self.assertTrue(kinds[1]['shell'])
+        self.assertEqual(kinds[1]['script_bytes'], len('var bundle = 1;') * 8000 + len('render();') * 4000)
+
+
+class ParseTextTest(unittest.TestCase):
+
+    def test_builds_the_tree_from_chunks(self):
+        text = '<?xml version="1.0" encoding="utf-8"?><html><body><h1>नमस्ते दुनिया</h1>' + 'x' * 200000 + '</body></html>'
+        tree = parse_text(text)
+        self.assertEqual(tree.tag, 'html')
+        self.assertEqual(tree.findtext('.//h1'), 'नमस्ते दुनिया')
+
+    def test_budget_is_checked_between_chunks(self):
+        text = '<html><body>' + '<p>paragraph</p>' * 20000 + '</body></html>'
+        feeds = []
+        parser_class = page_loader.html.HTMLParser
+
+        class CountingParser(parser_class):
+            def feed(self, data):
+                feeds.append(len(data))
+                return super().feed(data)
+
+        # Every chunk appears to take a second
+        clock = iter(range(1000))
+        with mock.patch.object(page_loader.html, 'HTMLParser', CountingParser), \
+                mock.patch.object(page_loader.time, 'monotonic', lambda: next(clock)):
+            with self.assertRaises(StageTimeout) as raised:
+                parse_text(text, parse_timeout=2.5)
+        self.assertEqual(raised.exception.stage, 'parse')
+        self.assertEqual(len(feeds), 3)
+        self.assertLess(len(feeds), len(text) // page_loader.PARSE_CHUNK_CHARS)
+
+
+class EncodingTest(unittest.TestCase):
+
+    META = b'<html><head><meta charset="iso-8859-2"></head><body>'
+
+    def test_bom_beats_header_and_meta(self):
+        head = codecs.BOM_UTF8 + self.META
+        self.assertEqual(resolve_encoding('text/html; charset=shift_jis', head, 'euc_jp'), ('utf-8-sig', 'bom'))
+        self.assertEqual(resolve_encoding('text/html', codecs.BOM_UTF16_LE + b'<', None), ('utf-16', 'bom'))
+
+    def test_header_beats_meta_and_meta_beats_domain(self):
+        self.assertEqual(resolve_encoding('text/html; charset="Shift_JIS"', self.META, 'euc_jp'),
+                         ('shift_jis', 'header'))
+        self.assertEqual(resolve_encoding('text/html', self.META, 'euc_jp'), ('iso8859-2', 'meta'))
+        self.assertEqual(resolve_encoding('text/html', b'<html>', 'euc_jp'), ('euc_jp', 'domain'))
+        self.assertEqual(resolve_encoding(None, b'<html>'), (None, None))
+
+    def test_unknown_header_label_falls_through_to_meta(self):
+        self.assertEqual(resolve_encoding('text/html; charset=x-bogus', self.META), ('iso8859-2', 'meta'))
+
+    def test_meta_only_counts_in_the_sniffed_prefix(self):
+        late = b'<html>' + b' ' * page_loader.SNIFF_BYTES + b'<meta charset="iso-8859-2">'
+        self.assertEqual(resolve_encoding('text/html', late), (None, None))
+
+    def test_label_mapping(self):
+        # A byte document cannot be UTF-16 when its own meta says so
+        self.assertEqual(resolve_encoding('', b'<meta http-equiv="Content-Type" content="text/html; charset=utf-16">'),
+                         ('utf-8', 'meta'))
+        for label in ('ISO-8859-1', 'latin1', 'US-ASCII'):
+            self.assertEqual(resolve_encoding(f'text/html; charset={label}', b''), ('cp1252', 'header'))
+
+    def test_decode_body_fallbacks(self):
+        text = 'Café – “quoted”'
+        self.assertEqual(decode_body(text.encode('utf-8'), 'text/html'), (text, 'utf-8'))
+        # Undeclared and not UTF-8: decoded as windows-1252, but not remembered for the domain
+        self.assertEqual(decode_body(text.encode('cp1252'), 'text/html'), (text, None))
+        self.assertEqual(decode_body(text.encode('cp1252'), 'text/html; charset=iso-8859-1'), (text, 'cp1252'))
+        self.assertEqual(decode_body(codecs.BOM_UTF8 + text.encode('utf-8'), ''), (text, 'utf-8-sig'))
+
+    def test_streamed_encoding_accepts_a_cut_character(self):
+        chunk = 'नमस्ते'.encode('utf-8')[:-1]
+        self.assertEqual(streamed_encoding('text/html', chunk), 'utf-8')
+        self.assertIsNone(streamed_encoding('text/html', 'Café au lait'.encode('cp1252')))
+
+
+class CleanHtmlTest(unittest.TestCase):
+
+    PAGE = ('<html><head><script>track()</script></head><body><nav>Menu</nav><h1>Headline</h1>'
+            '<p class="byline">By Staff</p><p>' + 'Article sentence. ' * 20 + '</p>'
+            '<p>Long paragraph with a <a href="/x">link</a> ' + 'inside. ' * 40 + '</p></body></html>')
+
+    def test_body_paragraphs_only_dropped_on_request(self):
+        for page_text in (self.PAGE, None):
+            tree = parse_text(self.PAGE)
+            full = clean_html(tree, page_text)
+            self.assertIn('Article sentence.', full)
+            self.assertNotIn('track()', full)
+            self.assertNotIn('Menu', full)
+
+            trimmed = clean_html(tree, page_text, keep_body=False)
+            self.assertNotIn('Article sentence.', trimmed)
+            self.assertIn('By Staff', trimmed)
+            self.assertIn('Headline', trimmed)
+            # Paragraphs holding markup are kept, their elements may be what an XPath needs
+            self.assertIn('href="/x"', trimmed)
+
+
+if __name__ == '__main__':
+    unittest.main()
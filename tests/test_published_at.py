@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import html
+
+from published_at import published_timestamp
+from xpath_evaluator import extract_datetime_from_elements
+
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+class DatetimeAttributeTest(unittest.TestCase):
+    """Date/Time extracted from datetime attributes are shown in IST and round-trip to PublishedAt."""
+
+    def extract(self, markup):
+        return extract_datetime_from_elements([html.fragment_fromstring(markup)])
+
+    def test_utc_values_are_converted_to_ist(self):
+        for value in ('2025-11-06T09:00:00Z', '2025-11-06T09:00:00+00:00'):
+            with self.subTest(value=value):
+                date_text, time_text = self.extract(f'<time datetime="{value}">6 Nov</time>')
+                self.assertEqual((date_text, time_text), ('November 06, 2025', '02:30 PM IST'))
+                self.assertEqual(published_timestamp(date_text, time_text), epoch(2025, 11, 6, 9, 0))
+
+    def test_conversion_can_move_the_date(self):
+        date_text, time_text = self.extract('<meta content="2025-11-06T20:00:00Z"/>')
+        self.assertEqual((date_text, time_text), ('November 07, 2025', '01:30 AM IST'))
+        self.assertEqual(published_timestamp(date_text, time_text), epoch(2025, 11, 6, 20, 0))
+
+    def test_ist_and_naive_values_are_kept(self):
+        self.assertEqual(self.extract('<time datetime="2025-11-06T14:30:00+05:30"></time>'),
+                         ('November 06, 2025', '02:30 PM IST'))
+        self.assertEqual(self.extract('<time datetime="2025-11-06T14:30:00"></time>'),
+                         ('November 06, 2025', '02:30 PM IST'))
+
+    def test_text_with_utc_offset_is_converted(self):
+        self.assertEqual(self.extract('<span>Updated: Nov 6, 2025 09:00 UTC</span>'),
+                         ('November 06, 2025', '02:30 PM IST'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import read_api
+from read_api import (
+    BadRequest, ConnectionPool, ResponseCache, cursor_param, encode_cursor, get_article,
+    list_articles, make_handler, time_param,
+)
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(maxsize=2, ttl=30)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        self.assertEqual(cache.get('a'), b'1')
+        cache.put('c', b'3')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (b'1', b'3'))
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(maxsize=2, ttl=30)
+        with mock.patch.object(read_api.time, 'monotonic', return_value=100.0):
+            cache.put('a', b'1')
+        with mock.patch.object(read_api.time, 'monotonic', return_value=131.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_size_zero_disables_the_cache(self):
+        cache = ResponseCache(maxsize=0)
+        cache.put('a', b'1')
+        self.assertIsNone(cache.get('a'))
+
+
+class ParamTest(unittest.TestCase):
+
+    def test_time_param_accepts_epoch_and_iso(self):
+        self.assertEqual(time_param({'since': ['1762387200']}, 'since'), 1762387200)
+        self.assertEqual(time_param({'since': ['2025-11-06']}, 'since'), 1762387200)
+        self.assertEqual(time_param({'since': ['2025-11-06T05:30:00+05:30']}, 'since'), 1762387200)
+        self.assertEqual(time_param({'since': ['2025-11-06T00:00:00Z']}, 'since'), 1762387200)
+        self.assertIsNone(time_param({}, 'since'))
+        with self.assertRaises(BadRequest):
+            time_param({'until': ['last week']}, 'until')
+
+    def test_cursor_round_trip(self):
+        key = [1762387200, 'alpha', 'https://www.alpha.com/a']
+        self.assertEqual(cursor_param({'after': [encode_cursor(key)]}, 'published'), tuple(key))
+        self.assertEqual(cursor_param({'after': ['42']}, 'scraped'), 42)
+        with self.assertRaises(BadRequest):
+            cursor_param({'after': ['42']}, 'published')
+        with self.assertRaises(BadRequest):
+            cursor_param({'after': ['abc']}, 'scraped')
+
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'Create_Articles_Database.py')],
+                       cwd=self.tmp.name, check=True, capture_output=True)
+        self.db_path = os.path.join(self.tmp.name, 'articles.db')
+        conn = sqlite3.connect(self.db_path)
+        # Scraped (rowid) order differs from publication order
+        conn.executemany(
+            "INSERT INTO ARTICLES (Domain, URL, Title, Content, PublishedAt) VALUES (?, ?, ?, ?, ?)",
+            [('alpha', f'https://www.alpha.com/{i}', f'Alpha {i}', 'body', published)
+             for i, published in enumerate([300, 100, 500, None, 200])]
+            + [('beta', 'https://www.beta.com/0', 'Beta 0', 'body', 400)])
+        conn.commit()
+        conn.close()
+        self.conn = read_api.connect_read_only(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def page_through(self, **kwargs):
+        urls, after = [], None
+        while True:
+            page = list_articles(self.conn, after=after, limit=2, **kwargs)
+            urls += [article['URL'] for article in page['articles']]
+            if page['next'] is None:
+                return urls
+            after = cursor_param({'after': [page['next']]}, kwargs.get('order', 'scraped'))
+
+    def test_scraped_order_pages_newest_first(self):
+        urls = self.page_through(domain='alpha')
+        self.assertEqual(urls, [f'https://www.alpha.com/{i}' for i in (4, 3, 2, 1, 0)])
+
+    def test_published_order_skips_undated_rows_and_honours_the_window(self):
+        urls = self.page_through(order='published')
+        self.assertEqual(urls, ['https://www.alpha.com/2', 'https://www.beta.com/0', 'https://www.alpha.com/0',
+                                'https://www.alpha.com/4', 'https://www.alpha.com/1'])
+        windowed = self.page_through(order='published', since=200, until=400)
+        self.assertEqual(windowed, ['https://www.alpha.com/0', 'https://www.alpha.com/4'])
+
+    def test_content_only_on_request(self):
+        page = list_articles(self.conn, limit=1)
+        self.assertNotIn('Content', page['articles'][0])
+        self.assertEqual(list_articles(self.conn, limit=1, content=True)['articles'][0]['Content'], 'body')
+        self.assertEqual(get_article(self.conn, 'https://www.beta.com/0')['Title'], 'Beta 0')
+        self.assertIsNone(get_article(self.conn, 'https://www.beta.com/missing'))
+
+    def test_http_responses_and_cache(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(ConnectionPool(self.db_path, size=1),
+                                                                     ResponseCache()))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(base + '/articles?limit=1&domain=beta') as response:
+                self.assertEqual(response.headers['X-Cache'], 'MISS')
+                self.assertEqual(json.loads(response.read())['articles'][0]['URL'], 'https://www.beta.com/0')
+            with urllib.request.urlopen(base + '/articles?domain=beta&limit=1') as response:
+                self.assertEqual(response.headers['X-Cache'], 'HIT')
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(base + '/articles?order=random')
+            self.assertEqual(error.exception.code, 400)
+            error.exception.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lxml import html
+
+from recrawl_scheduler import (
+    MAX_INTERVAL, MIN_INTERVAL, content_hash, due_urls, load_state, next_state, record_unchanged,
+    revisit_interval,
+)
+
+
+DAY = 86400
+T0 = 1762387200  # any realistic epoch: 0 would read as "unknown"
+
+
+def stored(page_hash='a', checks=1, changes=0, first_seen=T0, published_at=None):
+    return {'ContentHash': page_hash, 'FirstSeen': first_seen, 'LastChecked': first_seen,
+            'LastChanged': first_seen, 'CheckCount': checks, 'ChangeCount': changes,
+            'NextCheck': None, 'PublishedAt': published_at}
+
+
+class RevisitIntervalTest(unittest.TestCase):
+
+    def test_interval_is_clamped(self):
+        self.assertEqual(revisit_interval(0, 0, 0), MIN_INTERVAL)
+        self.assertEqual(revisit_interval(1000 * DAY, 0, 0), MAX_INTERVAL)
+
+    def test_frequent_changes_shorten_the_interval(self):
+        self.assertLess(revisit_interval(8 * DAY, 10, 10), revisit_interval(8 * DAY, 10, 0))
+
+
+class NextStateTest(unittest.TestCase):
+
+    def test_new_article_age_counts_from_publication(self):
+        values = next_state(None, 'a', published_at=T0, now=T0 + 4 * DAY)
+        self.assertEqual((values['CheckCount'], values['ChangeCount']), (1, 0))
+        self.assertEqual(values['NextCheck'], T0 + 5 * DAY)
+
+    def test_new_article_without_or_with_future_publication_is_revisited_soon(self):
+        self.assertEqual(next_state(None, 'a', now=T0)['NextCheck'], T0 + MIN_INTERVAL)
+        self.assertEqual(next_state(None, 'a', published_at=T0 + DAY, now=T0)['NextCheck'], T0 + MIN_INTERVAL)
+
+    def test_unchanged_check_keeps_last_changed(self):
+        values = next_state(stored(), 'a', now=T0 + 8 * DAY)
+        self.assertEqual((values['CheckCount'], values['ChangeCount'], values['LastChanged']), (2, 0, T0))
+        self.assertEqual(values['NextCheck'], T0 + 12 * DAY)
+
+    def test_changed_check_counts_a_change(self):
+        values = next_state(stored(), 'b', now=T0 + 8 * DAY)
+        self.assertEqual((values['CheckCount'], values['ChangeCount'], values['LastChanged']), (2, 1, T0 + 8 * DAY))
+        self.assertEqual(values['NextCheck'], T0 + 10 * DAY)
+
+    def test_stored_publication_time_sets_the_age(self):
+        values = next_state(stored(first_seen=T0 + 6 * DAY, published_at=T0), 'a', now=T0 + 8 * DAY)
+        self.assertEqual(values['NextCheck'], T0 + 12 * DAY)
+
+    def test_row_stored_before_tracking_is_not_counted_as_changed(self):
+        state = dict(stored(page_hash=None, checks=None, changes=None, first_seen=None), LastChanged=None)
+        values = next_state(state, 'a', now=T0)
+        self.assertEqual((values['FirstSeen'], values['LastChanged'], values['CheckCount'], values['ChangeCount']),
+                         (T0, T0, 1, 0))
+
+
+class ContentHashTest(unittest.TestCase):
+
+    def test_only_article_text_and_metadata_count(self):
+        page = '<html><body><h1>Title</h1><p>Body  text</p>{}</body></html>'
+        base = content_hash(html.fromstring(page.format('')), {'author': 'Staff'})
+        self.assertEqual(content_hash(html.fromstring(page.format('<script>ads()</script><nav>Menu</nav>')),
+                                      {'author': 'Staff'}), base)
+        self.assertNotEqual(content_hash(html.fromstring(page.format('<p>Update</p>')), {'author': 'Staff'}), base)
+        self.assertNotEqual(content_hash(html.fromstring(page.format('')), {'author': 'Desk'}), base)
+
+
+class StoredStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'Create_Articles_Database.py')],
+                       cwd=self.tmp.name, check=True, capture_output=True)
+        self.db_path = os.path.join(self.tmp.name, 'articles.db')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executemany(
+            "INSERT INTO ARTICLES (Domain, URL, ContentHash, FirstSeen, CheckCount, ChangeCount, NextCheck) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [('alpha', 'https://www.alpha.com/later', 'a', T0, 1, 0, T0 + 5 * DAY),
+             ('alpha', 'https://www.alpha.com/due', 'a', T0, 1, 0, T0 + DAY),
+             ('alpha', 'https://www.alpha.com/legacy', None, None, None, None, None)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_due_urls_most_overdue_first(self):
+        self.assertEqual(due_urls(self.db_path, now=T0 + 2 * DAY),
+                         ['https://www.alpha.com/legacy', 'https://www.alpha.com/due'])
+        self.assertEqual(due_urls(self.db_path, limit=1, now=T0 + 2 * DAY), ['https://www.alpha.com/legacy'])
+
+    def test_record_unchanged_updates_only_the_counters(self):
+        url = 'https://www.alpha.com/due'
+        state = load_state(self.conn, 'alpha', url)
+        self.assertIsNone(load_state(self.conn, 'alpha', 'https://www.alpha.com/missing'))
+        values = record_unchanged(self.conn, 'alpha', url, state, 'a')
+        after = load_state(self.conn, 'alpha', url)
+        self.assertEqual((after['CheckCount'], after['ChangeCount'], after['ContentHash']), (2, 0, 'a'))
+        self.assertEqual(after['NextCheck'], values['NextCheck'])
+
+
+if __name__ == '__main__':
+    unittest.main()
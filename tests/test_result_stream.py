@@ -0,0 +1,121 @@
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_stream import ResultStream, encode_line
+
+
+RECORD = {'Domain': 'alpha', 'URL': 'https://www.alpha.com/a', 'Title': 'Headline', 'Content': 'Body text.'}
+
+
+class EncodeLineTest(unittest.TestCase):
+
+    def test_short_record_is_one_line(self):
+        line, truncated = encode_line(RECORD)
+        self.assertFalse(truncated)
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertEqual(json.loads(line), RECORD)
+
+    def test_long_content_is_cut_to_fit(self):
+        # Quotes and non-ASCII text escape or encode to more bytes than characters
+        record = dict(RECORD, Content='“नमस्ते” "quoted" ' * 5000)
+        line, truncated = encode_line(record, max_bytes=4096)
+        self.assertTrue(truncated)
+        self.assertLessEqual(len(line), 4096)
+        decoded = json.loads(line)
+        self.assertTrue(decoded['Truncated'])
+        self.assertTrue(record['Content'].startswith(decoded['Content']))
+        self.assertGreater(len(decoded['Content']), 0)
+
+    def test_falls_back_to_domain_and_url_then_gives_up(self):
+        record = dict(RECORD, Title='x' * 1000)
+        line, truncated = encode_line(record, max_bytes=200)
+        self.assertTrue(truncated)
+        self.assertEqual(json.loads(line), {'Domain': 'alpha', 'URL': RECORD['URL'], 'Truncated': True})
+        self.assertEqual(encode_line(dict(record, URL='https://www.alpha.com/' + 'x' * 500), max_bytes=200),
+                         (None, True))
+
+
+class ResultStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def listen(self):
+        path = os.path.join(self.tmp.name, 'consumer.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        self.addCleanup(server.close)
+        return server, 'unix:' + path
+
+    def test_file_target_appends_lines_and_counts(self):
+        path = os.path.join(self.tmp.name, 'articles.ndjson')
+        stream = ResultStream(path, max_line_bytes=200)
+        stream.publish(RECORD)
+        stream.publish(dict(RECORD, Content='x' * 1000))
+        stream.publish(dict(RECORD, URL='https://www.alpha.com/' + 'x' * 500))
+        stream.close()
+
+        with open(path, 'rb') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1]['Truncated'])
+        self.assertEqual((stream.published, stream.truncated, stream.dropped), (2, 1, 1))
+        self.assertIn("2 article(s) streamed", stream.summary())
+
+    def test_publish_blocks_while_the_consumer_is_behind(self):
+        server, target = self.listen()
+        stream = ResultStream(target, buffer=2)
+        consumer, _ = server.accept()
+        self.addCleanup(consumer.close)
+
+        # Far more than the socket buffers plus the queue can hold
+        record = dict(RECORD, Content='x' * (256 * 1024))
+        done = threading.Event()
+
+        def publish_all():
+            for _ in range(20):
+                stream.publish(record)
+            done.set()
+
+        publisher = threading.Thread(target=publish_all, daemon=True)
+        publisher.start()
+        self.assertFalse(done.wait(0.5))
+        self.assertLessEqual(stream.queue.qsize(), 2)
+
+        received = bytearray()
+        consumer.settimeout(5)
+        while received.count(b"\n") < 20:
+            received += consumer.recv(1024 * 1024)
+        self.assertTrue(done.wait(5))
+        stream.close()
+        self.assertEqual(stream.published, 20)
+        self.assertGreater(stream.blocked_seconds, 0.4)
+
+    def test_consumer_gone_stops_publishing(self):
+        server, target = self.listen()
+        stream = ResultStream(target, buffer=1)
+        consumer, _ = server.accept()
+        consumer.close()
+
+        deadline = time.monotonic() + 5
+        while stream.publish(dict(RECORD, Content='x' * 65536)):
+            self.assertLess(time.monotonic(), deadline)
+        stream.close()
+        self.assertIsNotNone(stream.error)
+        self.assertGreater(stream.dropped, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_metadata import split_published
+
+
+class SplitPublishedTest(unittest.TestCase):
+
+    def test_date_only_values_have_no_time(self):
+        self.assertEqual(split_published("Tue, 04 Nov 2025"), ("November 04, 2025", ""))
+        self.assertEqual(split_published("2025-11-03"), ("November 03, 2025", ""))
+        self.assertEqual(split_published("Thursday, November 6 2025"), ("November 06, 2025", ""))
+
+    def test_time_of_day_is_kept(self):
+        self.assertEqual(split_published("2025-11-06T14:30:00+05:30"), ("November 06, 2025", "02:30 PM IST"))
+        self.assertEqual(split_published("Tue, 04 Nov 2025 09:15:00 +0530"), ("November 04, 2025", "09:15 AM IST"))
+
+    def test_unparseable_value(self):
+        self.assertEqual(split_published("not a date"), ("", ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lxml import html
+
+import template_fingerprint
+from template_fingerprint import (
+    SHIFT_SIMILARITY, claim_relearn, element_signature, fingerprint_similarity, load_fingerprint,
+    release_relearn, save_fingerprint, template_fingerprint as fingerprint,
+)
+
+
+def old_template(headline, paragraphs, build):
+    body = ''.join(f'<p class="para">{text}</p>' for text in paragraphs)
+    return html.fromstring(f'''<html><body class="build-{build}">
+        <header class="site-header"><nav class="menu"><a href="/">Home</a><a href="/india">India</a></nav></header>
+        <article class="story"><h1 class="story-title">{headline}</h1>
+          <div class="byline"><span class="author">Staff</span><time datetime="2025-11-06">6 Nov</time></div>
+          <div class="story-body css-{build}">{body}</div></article>
+        <footer class="site-footer"><ul class="links"><li>About</li><li>Contact</li></ul></footer>
+    </body></html>''')
+
+
+def new_template():
+    return html.fromstring('''<html><body>
+        <div id="__next"><main class="layout"><section class="hero"><h2 class="hero__title">Redesign</h2></section>
+        <div class="grid"><div class="grid__cell"><figure class="media"><img src="a.jpg"/></figure></div></div>
+        </main></div></body></html>''')
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_same_template_matches_across_articles_and_builds(self):
+        a = fingerprint(old_template("First story", ["one", "two", "three"], build=1))
+        b = fingerprint(old_template("Second story", ["four"] * 12, build=2))
+        self.assertGreaterEqual(fingerprint_similarity(a, b), SHIFT_SIMILARITY)
+
+    def test_redesign_falls_below_the_shift_threshold(self):
+        a = fingerprint(old_template("First story", ["one", "two"], build=1))
+        self.assertLess(fingerprint_similarity(a, fingerprint(new_template())), SHIFT_SIMILARITY)
+
+    def test_signature_ignores_class_tokens_with_digits(self):
+        elem = html.fromstring('<div class="story-body css-1x2y card"></div>')
+        self.assertEqual(element_signature(elem), 'div.card.story-body')
+
+    def test_unknown_fingerprint_counts_as_matching(self):
+        self.assertEqual(fingerprint_similarity([], ['body>div']), 1.0)
+        self.assertEqual(load_fingerprint(None), [])
+        self.assertEqual(load_fingerprint('not json'), [])
+
+
+class RelearnLeaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'Create_Tracking_Domains_Database.py')],
+                       cwd=self.tmp.name, check=True, capture_output=True)
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, 'articles.db'))
+        self.conn.execute("INSERT INTO TRACKING_DOMAINS (Domain) VALUES ('alpha')")
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_only_one_run_holds_the_lease(self):
+        self.assertTrue(claim_relearn(self.conn, 'alpha'))
+        self.assertFalse(claim_relearn(self.conn, 'alpha'))
+        release_relearn(self.conn, 'alpha')
+        self.assertTrue(claim_relearn(self.conn, 'alpha'))
+
+    def test_lease_of_a_crashed_run_expires(self):
+        self.assertTrue(claim_relearn(self.conn, 'alpha'))
+        later = template_fingerprint.time.time() + template_fingerprint.RELEARN_LEASE_SECONDS + 1
+        with mock.patch.object(template_fingerprint.time, 'time', return_value=later):
+            self.assertTrue(claim_relearn(self.conn, 'alpha'))
+
+    def test_saving_the_fingerprint_releases_the_lease(self):
+        self.assertTrue(claim_relearn(self.conn, 'alpha'))
+        save_fingerprint(self.conn, 'alpha', ['body>div'])
+        stored = self.conn.execute("SELECT TemplateFingerprint FROM TRACKING_DOMAINS WHERE Domain = 'alpha'").fetchone()[0]
+        self.assertEqual(json.loads(stored), ['body>div'])
+        self.assertTrue(claim_relearn(self.conn, 'alpha'))
+
+    def test_unknown_domain_cannot_be_claimed(self):
+        self.assertFalse(claim_relearn(self.conn, 'beta'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import html
+
+from xpath_evaluator import (
+    candidate_passes, evaluate_candidates, evaluate_xpath, extract_content_with_xpaths,
+    split_xpaths, text_field_passes,
+)
+
+
+PAGE = html.fromstring('''
+<html><head><meta property="article:published_time" content="2025-11-06T14:30:00+05:30"/></head>
+<body>
+  <h1 class="headline">Monsoon session of parliament begins</h1>
+  <span class="byline">Staff Writer</span>
+  <div class="story">''' + '<p>Paragraph with enough words to count towards the content length.</p>' * 50 + '''</div>
+</body></html>''')
+
+
+class EvaluateXpathTest(unittest.TestCase):
+
+    def test_invalid_and_scalar_expressions(self):
+        self.assertEqual(evaluate_xpath(PAGE, '//h1[', {}), [])
+        self.assertEqual(evaluate_xpath(PAGE, ''), [])
+        self.assertEqual(evaluate_xpath(PAGE, 'string(//h1)'), ['Monsoon session of parliament begins'])
+        self.assertEqual(evaluate_xpath(PAGE, 'count(//p)'), [])
+
+    def test_results_are_cached_per_page(self):
+        resolved = {}
+        nodes = evaluate_xpath(PAGE, '//h1', resolved)
+        self.assertIs(evaluate_xpath(PAGE, '//h1', resolved), nodes)
+        self.assertEqual(list(resolved), ['//h1'])
+
+    def test_split_xpaths(self):
+        self.assertEqual(split_xpaths(" //h1 | //h2 || "), ['//h1', '//h2'])
+        self.assertEqual(split_xpaths(None), [])
+
+
+class CandidateTest(unittest.TestCase):
+
+    def test_content_stops_joining_once_decided(self):
+        consumed = []
+
+        def paragraphs():
+            for node in PAGE.xpath('//div[@class="story"]/p'):
+                consumed.append(node)
+                yield node
+
+        self.assertTrue(text_field_passes('content', paragraphs()))
+        self.assertLess(len(consumed), 5)
+
+    def test_author_fails_as_soon_as_it_is_too_long(self):
+        self.assertTrue(text_field_passes('author', PAGE.xpath('//span[@class="byline"]')))
+        self.assertFalse(text_field_passes('author', PAGE.xpath('//p')))
+
+    def test_date_and_time_candidates(self):
+        meta = PAGE.xpath('//meta[@property="article:published_time"]')
+        self.assertTrue(candidate_passes('date', meta))
+        self.assertTrue(candidate_passes('time', meta))
+        self.assertFalse(candidate_passes('date', []))
+
+    def test_first_working_candidate_wins_and_skipped_fields_are_left_out(self):
+        resolved = {}
+        winners = evaluate_candidates(PAGE, {
+            'title': ['//h2', '//h1[@class="headline"]', '//h1'],
+            'content': ['//div[@class="story"]//p'],
+            'date': ['//meta[@property="article:published_time"]/..'],
+            'author': ['//span[@class="byline"]'],
+        }, skip_fields=['date'], resolved=resolved)
+        self.assertEqual(winners, {
+            'title': '//h1[@class="headline"]',
+            'content': '//div[@class="story"]//p',
+            'author': '//span[@class="byline"]',
+        })
+        self.assertNotIn('//h1', resolved)
+
+        author, date, time_text, title, content = extract_content_with_xpaths(
+            PAGE, winners['author'], '//meta[@property="article:published_time"]',
+            '//meta[@property="article:published_time"]', winners['title'], winners['content'], resolved)
+        self.assertEqual((author, date, time_text, title),
+                         ('Staff Writer', 'November 06, 2025', '02:30 PM IST', 'Monsoon session of parliament begins'))
+        self.assertTrue(content.startswith('Paragraph with enough words'))
+
+
+if __name__ == '__main__':
+    unittest.main()
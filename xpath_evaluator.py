@@ -0,0 +1,190 @@
+"""
+XPath candidate evaluation module
+Resolves the stored XPath candidates of every field against one lxml tree.
+Each distinct expression is compiled once and evaluated at most once per page,
+node text is joined lazily and stops as soon as the field's threshold is decided,
+and the winning node sets are reused for the final extraction.
+"""
+
+import re
+from functools import lru_cache
+from dateutil import parser
+from lxml import etree
+from field_validator import check_field, AUTHOR_MAX_LENGTH, TITLE_MIN_LENGTH, CONTENT_MIN_LENGTH
+from published_at import IST
+
+
+def extract_datetime_from_elements(elements, field_name="datetime"):
+    """Extract date/time from elements, checking datetime attribute first."""
+    if not elements:
+        return "", ""
+
+    # Strategy 1: Check datetime/content attribute (most reliable)
+    for elem in elements:
+        if hasattr(elem, 'get'):
+            # Check both 'datetime' (for <time> tags) and 'content' (for <meta> tags)
+            datetime_str = elem.get('datetime') or elem.get('content')
+            if datetime_str:
+                try:
+                    dt = parser.parse(datetime_str)
+                    # Aware values ("Z", "+00:00") are moved to IST so the label matches the time shown
+                    if dt.tzinfo:
+                        dt = dt.astimezone(IST)
+                    return dt.strftime("%B %d, %Y"), dt.strftime("%I:%M %p IST")
+                except:
+                    pass
+
+    # Strategy 2: Parse text content
+    text_content = ' '.join([elem.text_content().strip() for elem in elements if hasattr(elem, 'text_content')])
+    if not text_content.strip():
+        return "", ""
+
+    # Clean text (keywords_to_remove is built-in here)
+    keywords_to_remove = ["updated", "published", "posted", "last updated", "modified"]
+    cleaned_text = text_content
+    for keyword in keywords_to_remove:
+        cleaned_text = re.sub(rf'\b{keyword}\b', "", cleaned_text, flags=re.IGNORECASE)
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+
+    try:
+        dt = parser.parse(cleaned_text, fuzzy=True)
+        if dt.tzinfo:
+            dt = dt.astimezone(IST)
+        return dt.strftime("%B %d, %Y"), dt.strftime("%I:%M %p IST")
+    except:
+        return text_content, ""
+
+
+@lru_cache(maxsize=256)
+def compile_xpath(xpath):
+    return etree.XPath(xpath)
+
+
+def evaluate_xpath(tree, xpath, resolved=None):
+    """
+    Evaluate an XPath against the tree, treating missing or invalid expressions as no match.
+
+    Args:
+        resolved (dict): Optional per-page cache of XPath -> node list, filled on first evaluation
+    """
+    if not xpath:
+        return []
+    if resolved is not None and xpath in resolved:
+        return resolved[xpath]
+
+    try:
+        nodes = compile_xpath(xpath)(tree)
+    except (etree.XPathError, ValueError, TypeError):
+        nodes = []
+
+    # Expressions like string(...) or count(...) return a scalar instead of a node list
+    if not isinstance(nodes, list):
+        nodes = [nodes] if isinstance(nodes, str) and nodes else []
+
+    if resolved is not None:
+        resolved[xpath] = nodes
+    return nodes
+
+
+def node_text(node):
+    """Text of an element, or of an attribute/string result."""
+    return node.text_content().strip() if hasattr(node, 'text_content') else str(node).strip()
+
+
+def joined_text(nodes):
+    return ' '.join([node_text(n) for n in nodes]) if nodes else ""
+
+
+def text_field_passes(field, nodes):
+    """
+    Check the length rules of a text field, joining node text only until the result is decided.
+    Content XPaths like //article//p stop after the first few paragraphs instead of the whole body.
+    """
+    pieces = []
+    joined_length = -1      # length of ' '.join(pieces)
+    stripped_length = -1    # lower bound for the stripped joined length
+    for node in nodes:
+        text = node_text(node)
+        pieces.append(text)
+        joined_length += len(text) + 1
+        if text:
+            stripped_length += len(text) + 1
+
+        if field == 'author' and joined_length > AUTHOR_MAX_LENGTH:
+            return False
+        if field == 'title' and stripped_length >= TITLE_MIN_LENGTH:
+            return True
+        if field == 'content' and stripped_length >= CONTENT_MIN_LENGTH:
+            return True
+
+    return check_field(field, ' '.join(pieces)) is None
+
+
+def candidate_passes(field, nodes):
+    if not nodes:
+        return False
+    if field == 'date':
+        return check_field('date', extract_datetime_from_elements(nodes, "date")[0]) is None
+    if field == 'time':
+        return check_field('time', extract_datetime_from_elements(nodes, "time")[1]) is None
+    return text_field_passes(field, nodes)
+
+
+def split_xpaths(xpaths_str):
+    """Split a pipe-separated TRACKING_DOMAINS column into its candidate XPaths."""
+    return [x.strip() for x in xpaths_str.split("|") if x.strip()] if xpaths_str else []
+
+
+def evaluate_candidates(tree, candidates, skip_fields=(), resolved=None):
+    """
+    Find the first working XPath of every field.
+
+    Args:
+        tree: Parsed lxml tree of the page
+        candidates (dict): Field -> list of candidate XPaths, in priority order
+        skip_fields (iterable): Fields already filled elsewhere (e.g. structured metadata)
+        resolved (dict): Per-page XPath -> node list cache, shared with extract_content_with_xpaths()
+
+    Returns:
+        dict: Field -> winning XPath (fields without a working candidate are absent)
+    """
+    if resolved is None:
+        resolved = {}
+
+    winners = {}
+    for field, xpaths in candidates.items():
+        if field in skip_fields:
+            continue
+        for xpath in xpaths:
+            # Identical expressions across fields (e.g. shared date/time XPath) hit the cache
+            if candidate_passes(field, evaluate_xpath(tree, xpath, resolved)):
+                winners[field] = xpath
+                break
+    return winners
+
+
+def extract_content_with_xpaths(tree, author_xpath, time_xpath, date_xpath, title_xpath, content_xpath, resolved=None):
+    # Node sets already resolved by evaluate_candidates() are reused, not re-queried
+    # Extract author
+    author_text = joined_text(evaluate_xpath(tree, author_xpath, resolved))
+
+    # Extract date and time
+    date_elements = evaluate_xpath(tree, date_xpath, resolved)
+    time_elements = evaluate_xpath(tree, time_xpath, resolved)
+
+    # Check if date and time XPaths are the same
+    if date_xpath == time_xpath:
+        date_cleaned, time_cleaned = extract_datetime_from_elements(date_elements, "datetime")
+    else:
+        date_result = extract_datetime_from_elements(date_elements, "date")
+        time_result = extract_datetime_from_elements(time_elements, "time")
+        date_cleaned = date_result[0] if date_result[0] else ""
+        time_cleaned = time_result[1] if time_result[1] else time_result[0]
+
+    # Extract title - handle both elements and attribute values
+    title_text = joined_text(evaluate_xpath(tree, title_xpath, resolved))
+
+    # Extract content
+    content_text = joined_text(evaluate_xpath(tree, content_xpath, resolved))
+
+    return author_text, date_cleaned, time_cleaned, title_text, content_text
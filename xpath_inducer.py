@@ -0,0 +1,199 @@
+"""
+Local XPath induction
+Finds XPaths for missing fields without the LLM by locating known field text in the page
+and generalizing the matched node into class-based expressions:
+    author  - author names already stored in ARTICLES for the domain (bylines recur across articles)
+    title   - the <title> text (and its parts around ' | ', ' - ' separators)
+    date    - <time datetime> elements and short date-like text
+    time    - the date node, when it also carries a time of day
+    content - the element holding the most paragraph text
+Every candidate expression is validated locally with the same rules as stored candidates;
+the LLM is only asked for the fields induction could not solve.
+"""
+
+import re
+from collections import Counter
+from field_validator import check_field, TITLE_MIN_LENGTH
+from xpath_evaluator import evaluate_xpath, candidate_passes, joined_text, node_text, extract_datetime_from_elements
+
+
+MAX_KNOWN_AUTHORS = 500       # recent ARTICLES rows scanned for author names
+MAX_MATCHES = {'author': 3, 'title': 2, 'date': 3}  # an expression matching more nodes is too loose
+ANCESTOR_LEVELS = 3           # ancestors tried as class anchors
+DATE_TEXT_MAX = 80
+STABLE_NAME = re.compile(r'^[A-Za-z][A-Za-z_-]{2,}$')   # no digits: build hashes and ids change per page
+TITLE_SEPARATORS = re.compile(r'\s+[|\-–—:]\s+')
+DATE_LIKE = re.compile(
+    r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b'
+    r'|\b\d{1,2}\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)'
+    r'|\b\d{4}-\d{2}-\d{2}\b',
+    re.IGNORECASE
+)
+PARSED_DATE = re.compile(r'[A-Z][a-z]+ \d{2}, \d{4}')
+
+
+def normalize(text):
+    return " ".join((text or "").split()).lower()
+
+
+def known_authors(conn, domain):
+    """Distinct valid author names recently stored for the domain."""
+    rows = conn.execute(
+        "SELECT Author FROM ARTICLES WHERE Domain = ? AND Author != '' ORDER BY rowid DESC LIMIT ?",
+        (domain, MAX_KNOWN_AUTHORS)
+    ).fetchall()
+    return list(dict.fromkeys(row[0] for row in rows if check_field('author', row[0]) is None))
+
+
+def title_hints(tree):
+    hints = []
+    for text in tree.xpath("//head/title/text()"):
+        full = " ".join(text.split())
+        hints.append(full)
+        hints.extend(part for part in TITLE_SEPARATORS.split(full) if len(part) >= TITLE_MIN_LENGTH)
+    return hints
+
+
+def stable_classes(elem):
+    return [c for c in (elem.get('class') or '').split() if STABLE_NAME.match(c)]
+
+
+def generalized_xpaths(elem, allow_bare_tag=True):
+    """Expressions selecting elem, most specific attribute anchors first, no positional steps."""
+    tag = elem.tag
+    xpaths = []
+    for attr in ('itemprop', 'rel'):
+        value = elem.get(attr)
+        if value and STABLE_NAME.match(value):
+            xpaths.append(f"//{tag}[@{attr}='{value}']")
+    xpaths.extend(f"//{tag}[contains(@class, '{c}')]" for c in stable_classes(elem))
+
+    ancestor = elem.getparent()
+    for _ in range(ANCESTOR_LEVELS):
+        if ancestor is None or ancestor.tag in ('body', 'html'):
+            break
+        if ancestor.get('id') and STABLE_NAME.match(ancestor.get('id')):
+            xpaths.append(f"//{ancestor.tag}[@id='{ancestor.get('id')}']//{tag}")
+        xpaths.extend(f"//{ancestor.tag}[contains(@class, '{c}')]//{tag}" for c in stable_classes(ancestor))
+        ancestor = ancestor.getparent()
+
+    if allow_bare_tag:
+        xpaths.append(f"//{tag}")
+    return list(dict.fromkeys(xpaths))
+
+
+def text_elements(tree, values):
+    """Elements whose own text is one of values (a short 'By ' style prefix is allowed)."""
+    wanted = {normalize(v) for v in values if v}
+    if not wanted:
+        return []
+    found = []
+    for text in tree.xpath("//body//text()[normalize-space()]"):
+        if text.is_tail:
+            continue
+        t = normalize(text)
+        if t in wanted or any(t.endswith(" " + w) and len(t) <= len(w) + 12 for w in wanted):
+            found.append(text.getparent())
+    return found
+
+
+def first_valid(tree, field, elements, resolved, check=None, allow_bare_tag=True):
+    """First generalized expression (over all located elements) that selects the element and validates."""
+    for elem in elements:
+        for xpath in generalized_xpaths(elem, allow_bare_tag):
+            nodes = evaluate_xpath(tree, xpath, resolved)
+            if not any(node is elem for node in nodes):
+                continue
+            if field in MAX_MATCHES and len(nodes) > MAX_MATCHES[field]:
+                continue
+            if candidate_passes(field, nodes) and (check is None or check(nodes)):
+                return xpath
+    return None
+
+
+def induce_text_field(tree, field, values, resolved):
+    wanted = [normalize(v) for v in values]
+    # The expression must give back one of the known values, not just any text of the right length
+    check = lambda nodes: normalize(joined_text(nodes)).endswith(tuple(wanted))
+    return first_valid(tree, field, text_elements(tree, values), resolved, check)
+
+
+def induce_date(tree, resolved):
+    """(date_xpath, has_time) from <time datetime> elements or short date-like text."""
+    elements = tree.xpath("//body//time[@datetime]")
+    for text in tree.xpath("//body//text()[normalize-space()]"):
+        if not text.is_tail and len(text.strip()) <= DATE_TEXT_MAX and DATE_LIKE.search(text):
+            elements.append(text.getparent())
+
+    check = lambda nodes: bool(PARSED_DATE.fullmatch(extract_datetime_from_elements(nodes, "date")[0]))
+    xpath = first_valid(tree, 'date', elements, resolved, check)
+    if not xpath:
+        return None, False
+    nodes = evaluate_xpath(tree, xpath, resolved)
+    carries_time = any(node.get('datetime') and 'T' in node.get('datetime') for node in nodes) or \
+        any(re.search(r'\d{1,2}:\d{2}', node_text(node)) for node in nodes)
+    return xpath, carries_time
+
+
+def induce_content(tree, resolved):
+    """//container//p for the element holding the most paragraph text."""
+    scores = Counter()
+    for p in tree.iter('p'):
+        parent = p.getparent()
+        if parent is not None:
+            scores[parent] += len(" ".join(p.text_content().split()))
+    if not scores:
+        return None
+    container, best = scores.most_common(1)[0]
+
+    for xpath in generalized_xpaths(container, allow_bare_tag=False):
+        xpath = f"{xpath}//p"
+        nodes = evaluate_xpath(tree, xpath, resolved)
+        # Must cover the article body without pulling in much of the rest of the page
+        total = sum(len(" ".join(node_text(n).split())) for n in nodes)
+        if candidate_passes('content', nodes) and best * 0.8 <= total <= best * 1.5:
+            return xpath
+    return None
+
+
+def induce_xpaths(tree, fields, authors=(), resolved=None):
+    """
+    Induce XPaths for the given fields from the page itself.
+
+    Args:
+        tree: Parsed lxml tree of the page
+        fields (iterable): Fields that still need an XPath
+        authors (iterable): Author names known for the domain (see known_authors())
+        resolved (dict): Per-page XPath -> node list cache shared with xpath_evaluator
+
+    Returns:
+        dict: Field -> XPath for the fields induced and validated locally
+    """
+    if resolved is None:
+        resolved = {}
+    fields = set(fields)
+    induced = {}
+
+    if 'title' in fields:
+        xpath = induce_text_field(tree, 'title', title_hints(tree), resolved)
+        if xpath:
+            induced['title'] = xpath
+
+    if 'author' in fields and authors:
+        xpath = induce_text_field(tree, 'author', authors, resolved)
+        if xpath:
+            induced['author'] = xpath
+
+    if fields & {'date', 'time'}:
+        xpath, carries_time = induce_date(tree, resolved)
+        if xpath and 'date' in fields:
+            induced['date'] = xpath
+        if xpath and carries_time and 'time' in fields:
+            induced['time'] = xpath
+
+    if 'content' in fields:
+        xpath = induce_content(tree, resolved)
+        if xpath:
+            induced['content'] = xpath
+
+    return induced